@@ -0,0 +1,117 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from config import Config
+from logger_config import setup_logger
+
+# Configuração do logger
+logger = setup_logger()
+
+def _cnpj_key(cnpj):
+    """Normaliza o CNPJ para uso como chave (somente dígitos)"""
+    return re.sub(r'[^\d]', '', str(cnpj))
+
+class AddressCache:
+    """Cache persistente de CNPJ -> endereço do tomador (Rua, Numero, UF, Bairro, CEP, Cidade)
+
+    As entradas expiram após ``Config.ADDRESS_CACHE['TTL_DAYS']`` dias e, ao
+    ultrapassar ``MAX_ENTRIES``, as menos usadas recentemente são descartadas.
+    O arquivo é carregado sob demanda e gravado de forma atômica em ``save``.
+    """
+
+    def __init__(self, path=None, ttl_days=None, max_entries=None):
+        self.path = path or Config.ADDRESS_CACHE['FILE']
+        self.ttl = (ttl_days if ttl_days is not None else Config.ADDRESS_CACHE['TTL_DAYS']) * 86400
+        self.max_entries = max_entries or Config.ADDRESS_CACHE['MAX_ENTRIES']
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = None
+        self._dirty = False
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache de endereços ignorado (arquivo inválido): {str(e)}")
+
+    def get(self, cnpj):
+        """Retorna o endereço em cache ou None (contabilizando acerto/falha)"""
+        if not Config.ADDRESS_CACHE['ENABLED']:
+            return None
+        key = _cnpj_key(cnpj)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is None or now - entry['saved'] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                    self._dirty = True
+                self.misses += 1
+                return None
+            entry['used'] = now
+            self._dirty = True
+            self.hits += 1
+            return dict(entry['address'])
+
+    def put(self, cnpj, address):
+        """Armazena o endereço retornado pelo portal (ignora endereços vazios ou incompletos)"""
+        if not Config.ADDRESS_CACHE['ENABLED'] or not any(address.values()) or None in address.values():
+            return
+        key = _cnpj_key(cnpj)
+        now = time.time()
+        with self._lock:
+            self._load()
+            self._entries[key] = {'address': dict(address), 'saved': now, 'used': now}
+            self._dirty = True
+            if len(self._entries) > self.max_entries:
+                excess = len(self._entries) - self.max_entries
+                for old_key in sorted(self._entries, key=lambda k: self._entries[k]['used'])[:excess]:
+                    del self._entries[old_key]
+
+    def invalidate(self, cnpj):
+        with self._lock:
+            self._load()
+            if self._entries.pop(_cnpj_key(cnpj), None) is not None:
+                self._dirty = True
+
+    def save(self):
+        """Grava o cache em disco se houve alterações"""
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(prefix='.~cache_', suffix='.json', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                logger.warning(f"Não foi possível gravar o cache de endereços: {str(e)}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def log_summary(self):
+        """Escreve no log os acertos e falhas do cache na execução"""
+        total = self.hits + self.misses
+        if total:
+            logger.info(f"Cache de endereços: {self.hits} acertos, {self.misses} falhas "
+                        f"({self.hits / total:.0%} de acerto)")
+
+# Cache global de endereços dos tomadores
+address_cache = AddressCache()
@@ -1,37 +1,71 @@
-from selenium import webdriver
-from selenium.webdriver.support.ui import WebDriverWait, Select
+from selenium.webdriver.support.ui import Select
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
+from selenium.common.exceptions import WebDriverException, ElementNotInteractableException, ElementClickInterceptedException
 import pandas as pd
+import numpy as np
 import time
 import os
 
 # Importações dos novos módulos
 from config import Config
 from logger_config import setup_logger, log_automation_start, log_automation_success, log_automation_error, log_system_info
-from validators import validate_all_inputs, ValidationError
+from validators import validate_competencia, cnpj_digits, ValidationError
+from dataset import Dataset
+from pool import EmissionPool
+from session import headless_mode, open_browser, is_logged_in, release_browser
+from http_backend import HttpBackend, HttpBackendError, conferir_gravacao
+from address_cache import address_cache
+from journal import StatusJournal, journal_path_for, write_excel_atomic
+from control import AutomationCancelled, bind, checkpoint, mark_submitted, shielded, was_submitted
+from waits import (wait_clickable, wait_present, wait_frame, wait_document_ready, wait_value_settled, wait_stale,
+                   wait_stats)
+from locators import CAMPOS_ENDERECO, FRAME_EMISSAO, ElementCache, locate, locator
+from timing import tracer
+from pacing import pacer
+from pipeline import NotePipeline
+from records import StatusArray, montar_registros
+from retry import (NovaTentativa, RetryQueue, FALHA_REJEICAO, FALHA_SESSAO, FALHA_TIMEOUT, classificar_falha,
+                   deve_tentar_novamente, retry_stats)
 
 # Configuração do logger
 logger = setup_logger()
 
-def initialize_driver():
-    """Inicializa o driver do Chrome com configurações otimizadas"""
+# Status gravado quando a nota é emitida com sucesso
+STATUS_EMITIDA = 'Nota Emitida'
+
+# Formulário preenchido sem gravar (Config.GRAVAR_NOTAS desligado): a linha continua pendente
+STATUS_SIMULADA = 'Simulada'
+
+# Falha depois de a nota ser enviada ao portal: pode ter sido gravada, não é emitida de novo
+STATUS_VERIFICAR = 'Verificar no portal: {}'
+
+# Modos de execução aceitos (ver selecionar_pendentes)
+MODOS_EXECUCAO = ('todos', 'retomar', 'erros')
+
+# Políticas para CNPJs repetidos na planilha (ver agrupar_duplicados)
+POLITICAS_DUPLICADOS = ('sinalizar', 'somar', 'emitir')
+STATUS_DUPLICADO = 'Duplicado (linha {})'
+STATUS_AGRUPADO = 'Agrupado na linha {}'
+
+# Código de atividade selecionado no formulário da nota
+CODIGO_ATIVIDADE = "00802- 3.97"
+
+def initialize_driver(url=None, worker_id=0, headless=None):
+    """Inicializa o driver do Chrome com configurações otimizadas
+
+    ``url`` permite apontar para um portal local de testes em vez do portal real.
+    Com ``Config.SESSION['KEEP_ALIVE']`` o navegador de uma execução anterior é
+    reaproveitado, mantendo a página atual (e a sessão do portal). ``headless``
+    (None = ``Config.HEADLESS['ENABLED']``) vale só para esta sessão.
+    """
     try:
-        chrome_options = Options()
-        chrome_options.add_argument(f'user-agent={Config.USER_AGENT}')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.get(Config.URL_LOGIN)
-        driver.maximize_window()
+        driver, reaproveitado = open_browser(worker_id, headless)
+        if not reaproveitado:
+            driver.get(url or Config.URL_LOGIN)
+            if not headless_mode(headless):
+                driver.maximize_window()
         
         logger.info("Driver do Chrome inicializado com sucesso")
         return driver
@@ -46,26 +80,19 @@ def login(driver):
         logger.info("Iniciando processo de login...")
         
         # Clica no botão "Área do Prestador"
-        bt_area_do_prestador = WebDriverWait(driver, Config.TIMEOUTS['LOGIN']).until(
-            EC.presence_of_element_located((By.XPATH, '//*[@id="login"]/div[2]/a[2]'))
+        bt_area_do_prestador = wait_clickable(
+            driver, locator('login:area_prestador'), Config.TIMEOUTS['LOGIN'], 'login:area_prestador'
         )
-        time.sleep(Config.TIMEOUTS['WAIT'])
         bt_area_do_prestador.click()
         logger.info("Botão 'Área do Prestador' clicado")
 
         # Preenche usuário
-        cp_usuario = WebDriverWait(driver, Config.TIMEOUTS['ELEMENT']).until(
-            EC.presence_of_element_located((By.XPATH, '//*[@id="usuario"]'))
-        )
-        time.sleep(Config.TIMEOUTS['WAIT'])
+        cp_usuario = wait_clickable(driver, locator('login:usuario'), step='login:usuario')
         cp_usuario.send_keys(Config.USUARIO)
         logger.info("Usuário preenchido")
 
         # Preenche senha
-        cp_senha = WebDriverWait(driver, Config.TIMEOUTS['ELEMENT']).until(
-            EC.presence_of_element_located((By.XPATH, '//*[@id="senha"]'))
-        )
-        time.sleep(Config.TIMEOUTS['WAIT'])
+        cp_senha = wait_clickable(driver, locator('login:senha'), step='login:senha')
         cp_senha.send_keys(Config.SENHA)
         logger.info("Senha preenchida")
 
@@ -82,7 +109,6 @@ def copy_field_value(driver, element):
     try:
         # Seleciona todo o texto
         driver.execute_script("arguments[0].select();", element)
-        time.sleep(0.5)
         
         # Copia usando JavaScript
         driver.execute_script("arguments[0].setAttribute('data-copied', arguments[0].value);", element)
@@ -116,9 +142,7 @@ def copy_and_paste_between_fields(driver, source_element, target_element, field_
         
         # Cola no campo destino
         target_element.clear()
-        time.sleep(0.2)
         target_element.send_keys(source_value)
-        time.sleep(0.2)
         
         # Verifica se foi colado corretamente
         final_value = target_element.get_attribute('value')
@@ -128,7 +152,6 @@ def copy_and_paste_between_fields(driver, source_element, target_element, field_
         if source_value != final_value:
             logger.warning(f"Campo {field_name} não foi colado corretamente! Tentando com JavaScript...")
             driver.execute_script("arguments[0].value = arguments[1];", target_element, source_value)
-            time.sleep(0.2)
             final_value = target_element.get_attribute('value')
             logger.info(f"Valor após JavaScript no campo {field_name}: '{final_value}'")
         
@@ -138,176 +161,711 @@ def copy_and_paste_between_fields(driver, source_element, target_element, field_
         logger.error(f"Erro no copy/paste do campo {field_name}: {str(e)}")
         return False
 
-def emissao(driver, excel_path, competencia, progress_callback, status_callback):
-    """Função principal de emissão de notas fiscais"""
+# Lê todos os campos de origem, escreve nos destinos e dispara os eventos do portal
+_MIRROR_SCRIPT = """
+var pares = arguments[0];
+var resultado = {};
+for (var nome in pares) {
+    var origem = document.getElementById(pares[nome][0]);
+    var destino = document.getElementById(pares[nome][1]);
+    if (!origem || !destino) { resultado[nome] = null; continue; }
+    var valor = origem.value;
+    destino.focus();
+    destino.value = valor;
+    destino.dispatchEvent(new Event('input', {bubbles: true}));
+    destino.dispatchEvent(new Event('change', {bubbles: true}));
+    destino.blur();
+    resultado[nome] = valor;
+}
+return resultado;
+"""
+
+# Lê os valores atuais dos campos de destino
+_READ_VALUES_SCRIPT = """
+var ids = arguments[0];
+var resultado = {};
+for (var nome in ids) {
+    var campo = document.getElementById(ids[nome]);
+    resultado[nome] = campo ? campo.value : null;
+}
+return resultado;
+"""
+
+# Escreve valores conhecidos nos campos e dispara os eventos do portal
+_FILL_SCRIPT = """
+var valores = arguments[0];
+for (var id in valores) {
+    var campo = document.getElementById(id);
+    if (!campo) { continue; }
+    campo.focus();
+    campo.value = valores[id];
+    campo.dispatchEvent(new Event('input', {bubbles: true}));
+    campo.dispatchEvent(new Event('change', {bubbles: true}));
+    campo.blur();
+}
+"""
+
+def fill_fields(driver, values):
+    """Preenche vários campos ({id: valor}) em um único execute_script
+
+    Os valores são conferidos em uma segunda chamada e os campos divergentes
+    são preenchidos novamente por digitação. Retorna True se todos conferem.
+    """
     try:
-        # Validação de entradas
-        logger.info("Iniciando validação de entradas...")
-        df, competencia_formatada = validate_all_inputs(excel_path, competencia)
-        
-        # Adiciona coluna de status se não existir
-        if 'STATUS' not in df.columns:
-            df['STATUS'] = ""
+        driver.execute_script(_FILL_SCRIPT, values)
+        final = driver.execute_script(_READ_VALUES_SCRIPT, {field_id: field_id for field_id in values})
+    except Exception as e:
+        logger.error(f"Erro ao preencher campos {', '.join(values)}: {str(e)}")
+        final = {}
+
+    ok = True
+    for field_id, value in values.items():
+        if final.get(field_id) == value:
+            continue
+        logger.warning(f"Campo {field_id} não foi preenchido corretamente! Tentando por digitação...")
+        try:
+            element = wait_present(driver, (By.ID, field_id), 10)
+            element.clear()
+            element.send_keys(value)
+            ok = element.get_attribute('value') == value and ok
+        except Exception as e:
+            logger.error(f"Erro ao digitar no campo {field_id}: {str(e)}")
+            ok = False
+    return ok
+
+def mirror_fields(driver, field_map):
+    """Copia vários campos de uma vez em um único execute_script
+
+    ``field_map`` mapeia o nome do campo para o par (id_origem, id_destino).
+    A verificação é feita em uma segunda chamada; os campos que não ficaram
+    com o valor esperado são preenchidos novamente por digitação.
+    Retorna os valores copiados ({nome: valor}).
+    """
+    try:
+        expected = driver.execute_script(_MIRROR_SCRIPT, field_map)
+        final = driver.execute_script(
+            _READ_VALUES_SCRIPT, {name: target for name, (_, target) in field_map.items()}
+        )
+    except Exception as e:
+        logger.error(f"Erro ao espelhar campos {', '.join(field_map)}: {str(e)}")
+        expected, final = {}, {}
+
+    for name, (source_id, target_id) in field_map.items():
+        if name in expected and expected[name] is not None and final.get(name) == expected[name]:
+            logger.info(f"Campo {name} espelhado: '{expected[name]}'")
+            continue
+
+        # Fallback: digitação campo a campo
+        logger.warning(f"Campo {name} não foi espelhado corretamente! Tentando por digitação...")
+        try:
+            source_element = wait_present(driver, (By.ID, source_id), 10)
+            target_element = wait_present(driver, (By.ID, target_id), 10)
+        except Exception as e:
+            logger.error(f"Campo {name} não encontrado: {str(e)}")
+            expected[name] = None
+            continue
+        copy_and_paste_between_fields(driver, source_element, target_element, name)
+        expected[name] = target_element.get_attribute('value')
+    return expected
+
+def verificar_endereco_cache(driver, cnpj, endereco):
+    """Confere o endereço usado do cache com o preenchido pelo portal
+
+    Chamado depois dos demais campos, quando o preenchimento automático do
+    tomador já teve tempo de terminar. Se o endereço mudou, os campos do
+    serviço são refeitos a partir do portal e o cache é atualizado.
+    """
+    ids = {name: source_id for name, (source_id, _) in CAMPOS_ENDERECO.items()}
+    portal = driver.execute_script(_READ_VALUES_SCRIPT, ids)
+    if not any(portal.values()):
+        cp_rua_tomador = wait_present(driver, (By.ID, ids['Rua']), 10)
+        wait_value_settled(driver, cp_rua_tomador, 10, 'autofill:verificacao')
+        portal = driver.execute_script(_READ_VALUES_SCRIPT, ids)
+
+    if portal != endereco:
+        logger.warning(f"Endereço em cache desatualizado para {cnpj}; usando o endereço do portal")
+        address_cache.put(cnpj, mirror_fields(driver, CAMPOS_ENDERECO))
+
+def montar_nota(cnpj, valor, competencia_formatada):
+    """Monta os valores do formulário de uma nota, já formatados para o portal
+
+    As chaves são os nomes do registro de elementos (locators.py); cada backend
+    os traduz para o campo da página.
+    """
+    return {
+        'form:documento': cnpj,
+        'form:descricao': f'REFERENTE AOS SERVIÇOS PRESTADOS {competencia_formatada}/2025.',
+        'form:codigo': CODIGO_ATIVIDADE,
+        'form:valor': '{:.2f}'.format(valor),
+    }
+
+_FRAME_ID_SCRIPT = "return window.frameElement ? window.frameElement.id : null;"
+
+_PAGE_TEXT_SCRIPT = "return document.body ? document.body.innerText : '';"
+
+def clicar(driver, element):
+    """Clica no elemento, recorrendo ao clique via JavaScript se ele não puder ser clicado
+
+    Necessário para o botão de imagem quando as imagens estão bloqueadas
+    (modo headless): sem a imagem ele pode ficar sem tamanho na página.
+    """
+    try:
+        element.click()
+    except (ElementNotInteractableException, ElementClickInterceptedException):
+        driver.execute_script("arguments[0].click();", element)
+
+def _digitar(*textos):
+    """Ação para ElementCache.use: clica no campo e digita os textos"""
+    def action(element):
+        element.click()
+        element.send_keys(*textos)
+    return action
+
+def _selecionar(valor):
+    """Ação para ElementCache.use: seleciona a opção ``valor`` do campo"""
+    def action(element):
+        element.click()
+        Select(element).select_by_value(valor)
+    return action
+
+def navegar_formulario(driver, estado=None):
+    """Abre o formulário pelo menu do portal, entrando no iframe da emissão
+
+    Guarda em ``estado`` o endereço da página de entrada do iframe, usado por
+    ``reabrir_formulario`` nas notas seguintes.
+    """
+    driver.switch_to.default_content()
+    with tracer.span('navegacao:menu'):
+        # Acessando botão lançamento
+        bt_lançamento = wait_clickable(
+            driver, locator('menu:lancamento'), Config.TIMEOUTS['PAGE_LOAD'], 'menu:lancamento'
+        )
+        bt_lançamento.click()
+        logger.info("Botão 'Lançamento' clicado")
+
+        # Acessando botão fiscal
+        bt_nota_fiscal = wait_clickable(
+            driver, locator('menu:nota_fiscal'), Config.TIMEOUTS['LOGIN'], 'menu:nota_fiscal'
+        )
+        bt_nota_fiscal.click()
+        logger.info("Botão 'Nota Fiscal' clicado")
+
+    with tracer.span('navegacao:iframe'):
+        wait_frame(driver, locator('frame:emissao'), 10, 'frame:conteudo_window') # iframe da emissão
+        bt_gerar_notas = wait_present(driver, locator('form:gerar_notas'), 10, 'form:gerar_notas')
+        if estado is not None:
+            estado['url_entrada'] = driver.execute_script("return window.location.href;")
+        driver.execute_script("arguments[0].scrollIntoView(true);", bt_gerar_notas)
+        # Botão gerar notas
+        clicar(driver, bt_gerar_notas)
+
+def reabrir_formulario(driver, estado):
+    """Abre um novo formulário sem sair do iframe da emissão (caminho rápido)
+
+    Se a página atual do iframe já mostra o botão de gerar notas ele é clicado;
+    caso contrário o iframe volta para a página de entrada guardada. Retorna
+    False quando o estado da página não é o esperado (ex.: sessão expirada),
+    para que a nota siga pela navegação completa.
+    """
+    if not estado.get('url_entrada'):
+        return False
+    timeout = Config.TIMEOUTS['REABRIR']
+    try:
+        with tracer.span('navegacao:reabrir'):
+            if driver.execute_script(_FRAME_ID_SCRIPT) != FRAME_EMISSAO:
+                return False
+            botao = locate(driver, 'form:gerar_notas')
+            if botao is None:
+                driver.execute_script("window.location.replace(arguments[0]);", estado['url_entrada'])
+                wait_document_ready(driver, timeout, 'reabrir:entrada')
+                botao = wait_present(driver, locator('form:gerar_notas'), timeout, 'reabrir:gerar_notas')
+            clicar(driver, botao)
+            wait_clickable(driver, locator('form:documento'), timeout, 'reabrir:documento')
+        return True
+    except AutomationCancelled:
+        raise
+    except WebDriverException as e:
+        logger.info(f"Formulário não reaberto no iframe, navegando pelo menu: {e.__class__.__name__}")
+        return False
+
+def abrir_formulario(driver, estado=None):
+    """Abre o formulário da nota, reaproveitando o iframe quando possível"""
+    if estado is not None and estado.get('no_iframe') and Config.MANTER_IFRAME:
+        if reabrir_formulario(driver, estado):
+            return
+        estado['no_iframe'] = False
+    navegar_formulario(driver, estado)
+    if estado is not None:
+        estado['no_iframe'] = True
+
+def emitir_nota(driver, nota, estado=None):
+    """Abre o formulário e preenche a nota fiscal de uma empresa
+
+    ``estado`` (dict mantido pelo SeleniumBackend entre as notas) permite
+    continuar dentro do iframe da emissão em vez de navegar pelo menu a cada
+    nota; sem ele, cada nota faz a navegação completa.
+    """
+    try:
+        abrir_formulario(driver, estado)
+
+        # Elementos deste formulário: localizados uma vez (os fixos em lote) e reaproveitados
+        campos = ElementCache(driver)
+
+        with tracer.span('tomador:cnpj'):
+            # Campo de inserção de CNPJ
+            campos.use('form:documento', _digitar(nota['form:documento'], Keys.TAB), 10, True, 'form:documento')
+            campos.prefetch('form:descricao', 'form:codigo', 'form:valor', 'form:gravar')
+
+        endereco = address_cache.get(nota['form:documento'])
+        if endereco:
+            # Endereço já conhecido: preenche os campos do serviço sem esperar o portal
+            with tracer.span('endereco:cache'):
+                fill_fields(driver, {target_id: endereco[name] for name, (_, target_id) in CAMPOS_ENDERECO.items()})
+        else:
+            # Aguarda o portal terminar o preenchimento automático do endereço do tomador
+            with tracer.span('tomador:autofill'):
+                cp_rua_tomador = campos.get('form:rua_tomador', 10)
+                wait_value_settled(driver, cp_rua_tomador, 10, 'autofill:tomador')
+
+            # Endereço do tomador copiado para os campos do serviço (Rua, Numero, UF, Bairro, CEP, Cidade)
+            with tracer.span('endereco:copia'):
+                address_cache.put(nota['form:documento'], mirror_fields(driver, CAMPOS_ENDERECO))
+
+        with tracer.span('formulario:campos'):
+            # Campo descrição
+            campos.use('form:descricao', _digitar(nota['form:descricao']), 10)
+
+            # Selecionando código de atividade
+            campos.use('form:codigo', _selecionar(nota['form:codigo']), 10)
+
+            # Preenchendo valor
+            campos.use('form:valor', lambda cp_valor: cp_valor.send_keys(nota['form:valor']), 10)
+
+        # Confere o endereço vindo do cache com o preenchido pelo portal
+        if endereco:
+            verificar_endereco_cache(driver, nota['form:documento'], endereco)
+
+        # Último ponto de cancelamento: até aqui a nota não foi gravada
+        checkpoint()
+        cp_gravar_dados = None
+        if Config.GRAVAR_NOTAS:
+            cp_gravar_dados = campos.get('form:gravar', 10, clickable=True, step='form:gravar')
+
+        # Depois de gravar a nota, a finalização não pode ser interrompida
+        with shielded(), tracer.span('formulario:gravacao'):
+            # Gravando dados
+            if cp_gravar_dados is not None:
+                mark_submitted()
+                cp_gravar_dados.click()
+
+                # O iframe só recarregou com a página de resultado quando o botão
+                # do formulário antigo sai do DOM; antes disso o readyState ainda
+                # é o da página anterior
+                wait_stale(driver, cp_gravar_dados, step='form:envio')
+                wait_document_ready(driver, step='form:resultado')
+                conferir_gravacao(driver.execute_script(_PAGE_TEXT_SCRIPT))
+
+            if estado is None or not Config.MANTER_IFRAME:
+                # Voltar para o documento principal
+                driver.switch_to.default_content()
+
+            # Aguarda a página estabilizar antes da próxima nota
+            wait_document_ready(driver, step='form:finalizacao')
+    except Exception:
+        # Garante que a próxima nota faça a navegação completa a partir do documento principal
+        if estado is not None:
+            estado['no_iframe'] = False
+        try:
+            driver.switch_to.default_content()
+        except Exception:
+            pass
+        raise
+
+class SeleniumBackend:
+    """Backend de emissão que preenche o formulário pelo navegador"""
+
+    nome = 'selenium'
+
+    def __init__(self, driver, worker_id=0, url=None, headless=None):
+        self.driver = driver
+        self.worker_id = worker_id
+        self.url = url
+        self.headless = headless
+        # Posição da navegação entre as notas (ver abrir_formulario)
+        self.estado = {}
+
+    def emitir(self, nota):
+        emitir_nota(self.driver, nota, self.estado)
+
+    def keepalive(self):
+        """Faz uma requisição ao portal, sem navegar, para manter a sessão ativa"""
+        self.driver.execute_script("fetch(window.location.href, {credentials: 'same-origin'});")
+
+    def sessao_ativa(self):
+        """Confere se o menu do portal continua disponível (sessão logada)"""
+        self.estado['no_iframe'] = False
+        self.driver.switch_to.default_content()
+        return is_logged_in(self.driver)
+
+    def reconectar(self):
+        """Refaz o login; se o navegador se perdeu, abre uma nova sessão"""
+        self.estado = {}
+        try:
+            if self.sessao_ativa():
+                return
+            self.driver.get(self.url or Config.URL_LOGIN)
+            with tracer.span('login'):
+                login(self.driver)
+        except WebDriverException as e:
+            logger.warning(f"Navegador indisponível, abrindo nova sessão: {str(e)}")
+            try:
+                release_browser(self.driver)
+            except Exception:
+                pass
+            self.driver = iniciar_sessao(self.worker_id, self.url, self.headless)
+
+    def close(self):
+        release_browser(self.driver)
+
+def abrir_backend(worker_id=0, url=None, backend=None, headless=None):
+    """Abre uma sessão de emissão logada no backend configurado
+
+    O backend HTTP é tentado primeiro quando selecionado; se o login direto
+    ou a abertura do formulário da nota falhar, a emissão continua pelo
+    navegador (Selenium), sem janela conforme ``headless``.
+    """
+    backend = backend or Config.BACKEND
+    if backend == 'http':
+        http_backend = HttpBackend(CAMPOS_ENDERECO, url)
+        try:
+            return http_backend.login()
+        except HttpBackendError as e:
+            http_backend.close()
+            logger.warning(f"Backend HTTP indisponível, usando o navegador: {str(e)}")
+    elif backend != 'selenium':
+        raise ValueError(f"Backend de emissão inválido: {backend}")
+
+    return SeleniumBackend(iniciar_sessao(worker_id, url, headless), worker_id, url, headless)
+
+def _sessao_perdida(backend):
+    """Confere, quando o backend permite, se a sessão do portal se perdeu"""
+    sessao_ativa = getattr(backend, 'sessao_ativa', None)
+    if sessao_ativa is None:
+        return False
+    try:
+        return not sessao_ativa()
+    except AutomationCancelled:
+        raise
+    except Exception:
+        return True
+
+def _reconectar(backend):
+    """Refaz o login do backend após a perda da sessão"""
+    reconectar = getattr(backend, 'reconectar', None)
+    if reconectar is None:
+        return
+    try:
+        logger.info("Sessão do portal perdida, refazendo o login...")
+        reconectar()
+    except AutomationCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao refazer o login: {str(e)}")
+
+def processar_empresa(backend, cnpj, razao, valor, competencia_formatada, tentativa=1, nota=None):
+    """Processa a emissão de uma empresa e retorna o status para a planilha
+
+    Falhas recuperáveis (timeout, elemento obsoleto, sessão perdida) levantam
+    NovaTentativa enquanto houver tentativas (``Config.RETRY``); a sessão é
+    refeita antes quando se perdeu. Uma falha depois do envio da nota (exceto
+    a rejeição explícita do portal) nunca é repetida: a linha fica com
+    STATUS_VERIFICAR para conferência manual. ``nota`` é o payload já montado (pipeline).
+    Antes de cada nota é aplicado o ritmo adaptativo (ver pacing.AdaptivePacer).
+    """
+    inicio = None
+    mark_submitted(False)
+    try:
+        # Recuo após falhas/lentidão e limite global de notas por minuto
+        pacer.aguardar()
+
+        # Log do início da automação para esta empresa
+        log_automation_start(razao, cnpj)
+
+        inicio = time.perf_counter()
+        with tracer.span('nota'):
+            backend.emitir(nota or montar_nota(cnpj, valor, competencia_formatada))
+        pacer.nota(time.perf_counter() - inicio, True)
+        tracer.count_note()
+        if tentativa > 1:
+            retry_stats.recuperada()
+
+        if not Config.GRAVAR_NOTAS:
+            logger.info(f'Nota da empresa: {razao} preenchida sem gravar (simulação)')
+            return STATUS_SIMULADA
+
+        # Log de sucesso
+        log_automation_success(razao, cnpj)
+        logger.info(f'Nota da empresa: {razao} emitida com sucesso')
+        return STATUS_EMITIDA
+
+    except AutomationCancelled:
+        # Nota abandonada antes de gravar: o status da linha não é alterado
+        logger.warning(f"Emissão da empresa {razao} interrompida pelo cancelamento")
+        raise
+
+    except Exception as e:
+        classe = classificar_falha(e)
+        if classe == FALHA_TIMEOUT and _sessao_perdida(backend):
+            classe = FALHA_SESSAO
+        retry_stats.falha(classe)
+        if inicio is not None:
+            pacer.nota(time.perf_counter() - inicio, False)
+
+        # Log de erro para esta empresa
+        log_automation_error(razao, cnpj, str(e))
+        logger.error(f"Erro ({classe}) ao processar empresa {razao}, tentativa {tentativa}: {str(e)}")
+
+        if classe == FALHA_SESSAO:
+            _reconectar(backend)
+        if was_submitted() and classe != FALHA_REJEICAO:
+            # A nota pode ter sido gravada: emitir de novo arriscaria uma nota duplicada
+            logger.warning(f"Nota da empresa {razao} enviada sem confirmação; conferir no portal")
+            retry_stats.esgotada(classe)
+            return STATUS_VERIFICAR.format(str(e)[:50])
+        if deve_tentar_novamente(classe, tentativa):
+            logger.info(f"Nova tentativa da empresa {razao} agendada para o final da execução")
+            raise NovaTentativa(classe, e)
+        retry_stats.esgotada(classe)
+        return f'Erro: {str(e)[:50]}'
+
+def salvar_status(df, excel_path, dataset=None, statuses=None):
+    """Grava a coluna STATUS na planilha de forma atômica
+
+    Os status da execução (``statuses``) são aplicados ao DataFrame aqui. Em
+    caso de falha (ex.: planilha aberta no Excel) os resultados continuam
+    disponíveis no diário de status e podem ser aplicados depois.
+    """
+    try:
+        with tracer.span('status:planilha'):
+            if statuses is not None:
+                statuses.merge(df)
+            write_excel_atomic(df, excel_path)
+        if dataset is not None:
+            dataset.mark_saved()
+    except Exception as e:
+        logger.error(f"Erro ao gravar planilha (status mantido em {journal_path_for(excel_path)}): {str(e)}")
+
+def selecionar_pendentes(df, excel_path, modo=None, competencia=None):
+    """Filtra as linhas a processar conforme o modo de execução
+
+    - ``todos``: processa todas as linhas da planilha
+    - ``retomar``: pula as linhas já marcadas como 'Nota Emitida' ou a
+      conferir no portal (STATUS_VERIFICAR)
+    - ``erros``: processa somente as linhas com status de erro
+
+    Nos modos ``retomar`` e ``erros`` os status do diário registrados para a
+    mesma ``competencia`` são aplicados antes do filtro, cobrindo execuções
+    interrompidas antes de a planilha ser gravada. Só contam os status cuja
+    coluna COMPETENCIA é a da execução: uma nota emitida no mês anterior não
+    impede a emissão do mês atual.
+    """
+    modo = modo or Config.RESUME_MODE
+    if modo not in MODOS_EXECUCAO:
+        raise ValidationError(f"Modo de execução inválido: {modo}. Use: {', '.join(MODOS_EXECUCAO)}")
+
+    if modo == 'todos':
+        return df
+
+    applied = StatusJournal(excel_path, competencia).apply(df)
+    if applied:
+        logger.info(f"{applied} status recuperados do diário de execução")
+
+    status = df['STATUS'].fillna('').astype(str)
+    if 'COMPETENCIA' in df.columns:
+        da_competencia = df['COMPETENCIA'].fillna('').astype(str).eq(competencia or '')
+    else:
+        da_competencia = pd.Series(False, index=df.index)
+    outra_competencia = status.ne('') & ~da_competencia
+    if outra_competencia.any():
+        logger.info(f"{int(outra_competencia.sum())} status de outra competência ignorados")
+    status = status.where(da_competencia, '')
+
+    if modo == 'retomar':
+        a_verificar = status.str.startswith(STATUS_VERIFICAR.format(''))
+        if a_verificar.any():
+            logger.warning(f"{int(a_verificar.sum())} linhas a conferir no portal não serão reprocessadas")
+        pendentes = df[(status != STATUS_EMITIDA) & ~a_verificar]
+    else:
+        pendentes = df[status.str.startswith('Erro')]
+
+    logger.info(f"Modo '{modo}': {len(pendentes)} de {len(df)} linhas pendentes")
+    return pendentes
+
+def agrupar_duplicados(df, pendentes, politica=None):
+    """Aplica a política de CNPJs repetidos às linhas pendentes
+
+    Os grupos são formados sobre a planilha inteira, para que uma repetição
+    nunca seja emitida de novo em uma execução posterior (modos ``retomar`` e
+    ``erros``):
+
+    - ``sinalizar``: só a primeira ocorrência é emitida; as demais recebem o
+      status 'Duplicado (linha N)'
+    - ``somar``: a primeira ocorrência é emitida com a soma dos valores do
+      grupo; as demais recebem 'Agrupado na linha N'
+    - ``emitir``: todas as linhas são emitidas
+
+    Retorna ``(linhas_a_emitir, {indice: status})``.
+    """
+    politica = politica or Config.DUPLICADOS
+    if politica not in POLITICAS_DUPLICADOS:
+        raise ValidationError(f"Política de duplicados inválida: {politica}. Use: {', '.join(POLITICAS_DUPLICADOS)}")
+    if politica == 'emitir' or pendentes.empty:
+        return pendentes, {}
+
+    chave = cnpj_digits(df['CNPJ']).set_axis(df.index)
+    repetida = chave.duplicated(keep='first')
+    if not repetida.any():
+        return pendentes, {}
+
+    linhas = pd.Series(np.arange(1, len(df) + 1), index=df.index)
+    primeira_linha = linhas.groupby(chave).transform('first')
+    repetida_pendente = repetida.reindex(pendentes.index).to_numpy()
+
+    modelo = STATUS_DUPLICADO if politica == 'sinalizar' else STATUS_AGRUPADO
+    marcadas = {index: modelo.format(primeira_linha[index]) for index in pendentes.index[repetida_pendente]}
+    emitir = pendentes[~repetida_pendente]
+
+    if politica == 'somar':
+        soma = pd.to_numeric(df['VALOR'], errors='coerce').groupby(chave).transform('sum')
+        em_grupo = chave.map(chave.value_counts()).gt(1).reindex(emitir.index).to_numpy()
+        valores = emitir['VALOR'].astype(object)
+        valores[em_grupo] = soma.reindex(emitir.index)[em_grupo]
+        emitir = emitir.assign(VALOR=valores)
+
+    logger.warning(f"{len(marcadas)} linhas com CNPJ repetido não serão emitidas (política '{politica}')")
+    return emitir, marcadas
+
+def registrar_status(df, statuses, journal, index, status, row_callback=None):
+    """Guarda o status de uma linha (aplicado à planilha só na gravação) e registra no diário"""
+    with tracer.span('status:registro'):
+        statuses[index] = status
+        journal.record(index, df.at[index, 'CNPJ'], status)
+    if row_callback:
+        row_callback.emit(index, status)
+
+def preparar_dados(excel_path, competencia, dataset=None):
+    """Valida as entradas e prepara o DataFrame com a coluna de status
+
+    Se a planilha já foi carregada (``dataset``, ex.: pela pré-visualização da
+    UI) e não mudou em disco, o DataFrame validado é reaproveitado sem nova
+    leitura do arquivo.
+    """
+    # Validação de entradas
+    logger.info("Iniciando validação de entradas...")
+    if dataset is not None and dataset.path != excel_path:
+        # Pré-visualização de outra planilha: os status seriam gravados no arquivo errado
+        raise ValidationError(f"Planilha carregada ({dataset.path}) difere da selecionada ({excel_path})")
+    dataset = dataset or Dataset(excel_path)
+    df = dataset.validated_df()
+    competencia_formatada = validate_competencia(competencia)
+
+    # Adiciona as colunas de status (e da competência a que se refere) se não existirem
+    for column in ('STATUS', 'COMPETENCIA'):
+        if column not in df.columns:
+            df[column] = ""
+        elif df[column].dtype != object:
+            # Coluna vazia lida como numérica não aceita texto
+            df[column] = df[column].astype(object)
+
+    return df, competencia_formatada
+
+def emissao(backend, excel_path, competencia, progress_callback, status_callback, modo=None, dataset=None,
+            row_callback=None, control=None):
+    """Função principal de emissão de notas fiscais
+
+    ``backend`` é uma sessão aberta por ``abrir_backend``; um driver do
+    Selenium também é aceito diretamente. ``control`` (RunControl) permite
+    pausar e cancelar a execução entre as etapas.
+    """
+    if not hasattr(backend, 'emitir'):
+        backend = SeleniumBackend(backend)
+    try:
+        df, competencia_formatada = preparar_dados(excel_path, competencia, dataset)
+        pendentes = selecionar_pendentes(df, excel_path, modo, competencia_formatada)
+        pendentes, marcadas = agrupar_duplicados(df, pendentes)
         
-        # Prepara dados para processamento
-        cnpj_list = df['CNPJ'].astype(str)
-        razao_social_list = df['RAZAO SOCIAL'].astype(str)
-        valor_list = df['VALOR']
+        # Prepara dados para processamento (só os campos da emissão, uma vez)
+        registros = montar_registros(pendentes)
+        del pendentes
         
-        total_items = len(cnpj_list)
+        total_items = len(registros)
         logger.info(f"Total de itens para processar: {total_items}")
         
         # Inicia o processamento
-        for index, (cnpj, razao, valor) in enumerate(zip(cnpj_list, razao_social_list, valor_list)):
-            try:
+        journal = StatusJournal(excel_path, competencia_formatada)
+        statuses = StatusArray(df.index, competencia_formatada)
+        retentativas = RetryQueue()
+        processadas = 0
+
+        # Estágio de preparação: monta a nota da próxima linha enquanto a atual é enviada
+        def preparar(item):
+            (index, cnpj, razao, valor), tentativa = item
+            return montar_nota(cnpj, valor, competencia_formatada)
+
+        # Estágio de envio (thread do navegador)
+        def enviar(item, nota):
+            nonlocal processadas
+            row, tentativa = item
+            index, cnpj, razao, valor = row
+
+            # Pausa/cancelamento entre notas (a sessão é mantida ativa na pausa)
+            if control:
+                control.wait_if_paused(getattr(backend, 'keepalive', None))
+
+            if tentativa > 1:
+                if status_callback:
+                    status_callback.emit(f"Nova tentativa ({tentativa}): {razao}")
+            else:
                 # Atualiza progresso
-                progress = int((index + 1) / total_items * 100)
+                processadas += 1
                 if progress_callback:
-                    progress_callback.emit(progress)
+                    progress_callback.emit(int(processadas / total_items * 100))
                 if status_callback:
                     status_callback.emit(f"Processando: {razao}")
-                
-                # Log do início da automação para esta empresa
-                log_automation_start(razao, cnpj)
-
-                # Acessando botão lançamento
-                bt_lançamento = WebDriverWait(driver, Config.TIMEOUTS['PAGE_LOAD']).until(
-                    EC.presence_of_element_located((By.XPATH, '//*[@id="menu"]/a[2]'))
-                )
-                time.sleep(Config.TIMEOUTS['WAIT'])
-                bt_lançamento.click()
-                logger.info("Botão 'Lançamento' clicado")
-
-                # Acessando botão fiscal
-                bt_nota_fiscal = WebDriverWait(driver, Config.TIMEOUTS['LOGIN']).until(
-                    EC.presence_of_element_located((By.XPATH, '//*[@id="menu"]/div[2]/a[2]'))
-                )
-                time.sleep(Config.TIMEOUTS['WAIT'])
-                bt_nota_fiscal.click()
-                logger.info("Botão 'Nota Fiscal' clicado")
-
-                WebDriverWait(driver, 10).until(EC.frame_to_be_available_and_switch_to_it((By.ID, "conteudo_window"))) # iframe da emissão
-                bt_gerar_notas = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.XPATH, "//img[@src='../images/entrar_nfe.gif']")))
-                driver.execute_script("arguments[0].scrollIntoView(true);", bt_gerar_notas)
-                # Botão gerar notas
-                bt_gerar_notas.click()
-
-                # Campo de inserção de CNPJ
-                bt_documento = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "Documento")))
-                bt_documento.click()
-                bt_documento.send_keys(cnpj)
-                bt_documento.send_keys(Keys.TAB)
-                time.sleep(0.5)
-
-                # Campo de inserção de Rua - Copy/Paste
-                cp_rua_tomador = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "RuaTomador")))
-                cp_rua_servico = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "RuaServico")))
-                copy_and_paste_between_fields(driver, cp_rua_tomador, cp_rua_servico, "Rua")
-                time.sleep(0.5)
-
-                # Campo numero - Copy/Paste
-                numero_tomador = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "NumeroTomador")))
-                numero_servico = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "NumeroServico")))
-                copy_and_paste_between_fields(driver, numero_tomador, numero_servico, "Numero")
-                time.sleep(0.5)
-
-                # Campo UF - Copy/Paste
-                cp_uf_tomador = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "UFTomador")))
-                cp_uf_servico = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "UFServico")))
-                copy_and_paste_between_fields(driver, cp_uf_tomador, cp_uf_servico, "UF")
-                time.sleep(0.5)
-
-                # Campo bairro - Copy/Paste
-                bairro_tomador = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "BairroTomador")))
-                bairro_servico = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "BairroServico")))
-                copy_and_paste_between_fields(driver, bairro_tomador, bairro_servico, "Bairro")
-                time.sleep(0.5)
-
-                # Campo CEP - Copy/Paste
-                cep_tomador = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "CEPTomador")))
-                cep_servico = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "CEPServico")))
-                
-                # Clica no campo CEP do tomador para garantir que está ativo
-                cep_tomador.click()
-                time.sleep(0.5)
-                
-                # Tenta copiar o valor usando JavaScript
-                cep_value = driver.execute_script("return arguments[0].value;", cep_tomador)
-                logger.info(f"CEP copiado via JavaScript: '{cep_value}'")
-                
-                # Cola no campo destino
-                cep_servico.clear()
-                time.sleep(0.2)
-                cep_servico.send_keys(cep_value)
-                time.sleep(0.2)
-                
-                # Verifica se foi colado corretamente
-                final_cep = cep_servico.get_attribute('value')
-                logger.info(f"CEP final no campo serviço: '{final_cep}'")
-                
-                if cep_value != final_cep:
-                    logger.warning(f"CEP não foi colado corretamente! Esperado: '{cep_value}', Obtido: '{final_cep}'")
-                    # Tenta novamente com JavaScript
-                    driver.execute_script("arguments[0].value = arguments[1];", cep_servico, cep_value)
-                    time.sleep(0.2)
-                    final_cep = cep_servico.get_attribute('value')
-                    logger.info(f"CEP após segunda tentativa: '{final_cep}'")
-                
-                time.sleep(0.5)
-
-                # Campo Cidade - Copy/Paste
-                cidade_tomador = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "CidadeTomador")))
-                cidade_servico = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "CidadeServico")))
-                copy_and_paste_between_fields(driver, cidade_tomador, cidade_servico, "Cidade")
-                time.sleep(0.5)
-
-                # Campo descrição
-                cp_descricao = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "descricao")))
-                cp_descricao.click()
-                descricao = f'REFERENTE AOS SERVIÇOS PRESTADOS {competencia_formatada}/2025.'
-                cp_descricao.send_keys(descricao)
-
-                # Selecionando código de atividade
-                selecionar_codigo = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "Codigo")))
-                selecionar_codigo.click()
-                select_obj = Select(selecionar_codigo)
-                select_obj.select_by_value("00802- 3.97")
-
-                # Preenchendo valor
-                cp_valor = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "Valor")))
-                valor_formatado = '{:.2f}'.format(valor)
-                cp_valor.send_keys(valor_formatado)
-
-                # Gravando dados
-                #cp_gravar_dados = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "gravar")))
-                #cp_gravar_dados.click()
-
-                # Voltar para o iframe
-                driver.switch_to.default_content()
 
-                # Atualizando status na planilha
-                df.loc[df['CNPJ'] == cnpj, 'STATUS'] = 'Nota Emitida'
-                df.to_excel(excel_path, index=False)
-                time.sleep(5)
+            if isinstance(nota, Exception):
+                logger.error(f"Erro ao preparar a nota da empresa {razao}: {str(nota)}")
+                return f'Erro: {str(nota)[:50]}'
+            try:
+                return processar_empresa(backend, cnpj, razao, valor, competencia_formatada, tentativa, nota)
+            except NovaTentativa as e:
+                retentativas.push(row, tentativa + 1, e.classe, e.erro)
+                return None
+
+        # Estágio de finalização: status na planilha e no diário (diário a cada linha, planilha ao final)
+        def finalizar(item, status):
+            registro, _ = item
+            registrar_status(df, statuses, journal, registro.index, status, row_callback)
 
-                # Log de sucesso
-                log_automation_success(razao, cnpj)
-                logger.info(f'Nota da empresa: {razao} emitida com sucesso')
+        try:
+            # CNPJs repetidos marcados antes da emissão
+            for index, status in marcadas.items():
+                registrar_status(df, statuses, journal, index, status, row_callback)
 
-            except Exception as e:
-                # Log de erro para esta empresa
-                log_automation_error(razao, cnpj, str(e))
-                logger.error(f"Erro ao processar empresa {razao}: {str(e)}")
-                
-                # Atualiza status de erro na planilha
-                df.loc[df['CNPJ'] == cnpj, 'STATUS'] = f'Erro: {str(e)[:50]}'
-                df.to_excel(excel_path, index=False)
-                
-                # Continua com a próxima empresa
-                continue
+            # Novas tentativas ao final, para não atrasar as linhas ainda não processadas
+            NotePipeline(preparar, enviar, finalizar).run(((registro, 1) for registro in registros),
+                                                          retentativas.pop)
+        finally:
+            journal.close()
+            salvar_status(df, excel_path, dataset, statuses)
 
         logger.info("Processamento de todas as empresas concluído")
+        wait_stats.log_summary()
+        return df
         
+    except AutomationCancelled:
+        logger.warning("Processamento cancelado; status das notas concluídas gravado")
+        raise
     except ValidationError as e:
         logger.error(f"Erro de validação: {str(e)}")
         raise
@@ -315,23 +873,124 @@ def emissao(driver, excel_path, competencia, progress_callback, status_callback)
         logger.error(f"Erro geral na automação: {str(e)}")
         raise
 
-def run_automation(excel_path, competencia, progress_callback, status_callback):
-    """Função principal que executa toda a automação"""
-    driver = None
+def iniciar_sessao(worker_id=0, url=None, headless=None):
+    """Abre um navegador logado, pulando o login quando a sessão ainda é válida"""
+    driver = initialize_driver(url, worker_id, headless)
+    try:
+        if is_logged_in(driver):
+            logger.info("Sessão do portal ainda ativa, login ignorado")
+        else:
+            if driver.current_url.rstrip('/') != (url or Config.URL_LOGIN).rstrip('/'):
+                driver.get(url or Config.URL_LOGIN)
+            with tracer.span('login'):
+                login(driver)
+    except Exception:
+        release_browser(driver)
+        raise
+    return driver
+
+def emissao_paralela(excel_path, competencia, progress_callback, status_callback, workers=None,
+                     backend_factory=None, modo=None, dataset=None, row_callback=None, control=None,
+                     headless=None):
+    """Emite as notas distribuindo as linhas entre vários navegadores logados"""
+    try:
+        df, competencia_formatada = preparar_dados(excel_path, competencia, dataset)
+        pendentes = selecionar_pendentes(df, excel_path, modo, competencia_formatada)
+        pendentes, marcadas = agrupar_duplicados(df, pendentes)
+
+        registros = montar_registros(pendentes)
+        del pendentes
+        logger.info(f"Total de itens para processar: {len(registros)}")
+
+        journal = StatusJournal(excel_path, competencia_formatada)
+        statuses = StatusArray(df.index, competencia_formatada)
+        for index, status in marcadas.items():
+            registrar_status(df, statuses, journal, index, status, row_callback)
+
+        def on_result(index, status):
+            # Chamado sob o lock do pool: registra o status da linha processada
+            registrar_status(df, statuses, journal, index, status, row_callback)
+
+        emission_pool = EmissionPool(
+            backend_factory=backend_factory or (lambda worker_id: abrir_backend(worker_id, headless=headless)),
+            process_row=lambda backend, cnpj, razao, valor, tentativa: processar_empresa(
+                backend, cnpj, razao, valor, competencia_formatada, tentativa),
+            workers=workers,
+            progress_callback=progress_callback,
+            status_callback=status_callback,
+            on_result=on_result,
+            control=control,
+        )
+        try:
+            emission_pool.run(registros)
+        finally:
+            journal.close()
+            salvar_status(df, excel_path, dataset, statuses)
+
+        if control and control.cancelled:
+            raise AutomationCancelled("Automação cancelada pelo usuário")
+
+        logger.info("Processamento de todas as empresas concluído")
+        wait_stats.log_summary()
+        return df
+
+    except AutomationCancelled:
+        logger.warning("Processamento cancelado; status das notas concluídas gravado")
+        raise
+    except ValidationError as e:
+        logger.error(f"Erro de validação: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Erro geral na automação: {str(e)}")
+        raise
+
+def run_automation(excel_path, competencia, progress_callback, status_callback, workers=None, modo=None,
+                   dataset=None, row_callback=None, control=None, backend=None, backend_factory=None,
+                   headless=None):
+    """Função principal que executa toda a automação
+
+    Retorna o DataFrame com a coluna STATUS (None se cancelada). ``backend`` e
+    ``backend_factory`` permitem reaproveitar sessões já abertas entre várias
+    planilhas (ver cli.py); nesse caso quem as abriu é responsável por fechá-las.
+    ``headless`` escolhe o modo sem janela dos navegadores abertos nesta execução
+    (None = ``Config.HEADLESS['ENABLED']``).
+    """
+    own_backend = backend is None
+    workers = workers or Config.PARALLEL_WORKERS
+    bind(control)
     try:
         # Log do início da sessão
         log_system_info()
+        wait_stats.reset()
+        address_cache.reset_stats()
+        retry_stats.reset()
+        pacer.reset()
+        tracer.start_run()
+
+        # Modo paralelo: cada worker do pool abre e fecha a própria sessão
+        if workers > 1:
+            df = emissao_paralela(excel_path, competencia, progress_callback, status_callback, workers,
+                                  backend_factory=backend_factory, modo=modo, dataset=dataset,
+                                  row_callback=row_callback, control=control, headless=headless)
+            logger.info("Automação concluída com sucesso!")
+            return df
         
-        # Inicializa o driver
-        driver = initialize_driver()
-        
-        # Realiza login
-        login(driver)
+        # Abre a sessão de emissão (navegador ou HTTP) já logada
+        if backend is None:
+            backend = abrir_backend(headless=headless)
         
         # Executa a emissão
-        emissao(driver, excel_path, competencia, progress_callback, status_callback)
+        df = emissao(backend, excel_path, competencia, progress_callback, status_callback, modo, dataset,
+                     row_callback, control)
         
         logger.info("Automação concluída com sucesso!")
+        return df
+        
+    except AutomationCancelled:
+        logger.warning("Automação cancelada pelo usuário")
+        if status_callback:
+            status_callback.emit("Automação cancelada")
+        return None
         
     except ValidationError as e:
         logger.error(f"Erro de validação: {str(e)}")
@@ -346,13 +1005,24 @@ def run_automation(excel_path, competencia, progress_callback, status_callback):
         raise
         
     finally:
-        # Sempre fecha o driver
-        if driver:
+        # Persiste o cache de endereços e reporta acertos/falhas
+        address_cache.save()
+        address_cache.log_summary()
+
+        # Falhas por classe e relatório de desempenho por etapa (Config.METRICS)
+        retry_stats.log_summary()
+        pacer.log_summary()
+        tracer.finish_run(wait_stats.summary(), retry_stats.summary())
+
+        # Sempre fecha a sessão de emissão aberta aqui
+        if backend and own_backend:
             try:
-                driver.quit()
-                logger.info("Driver do Chrome fechado")
+                backend.close()
             except Exception as e:
                 logger.warning(f"Erro ao fechar driver: {str(e)}")
 
 if __name__ == "__main__":
-    run_automation('G:\\Drives compartilhados\\BANCO DE DADOS T.I\\Automacoes\\automacoes-VANIA\\automacao-LANCAMENTO NF VINHEDO\\Dados.xlsx', '01/2025', None, None)
+    # Execução pela linha de comando (ver cli.py)
+    import sys
+    from cli import main
+    sys.exit(main())
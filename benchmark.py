@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import pandas as pd
+import back
+from config import Config
+from logger_config import setup_logger
+from mock_portal import MENSAGEM_REJEICAO, MockPortal
+from records import StatusArray, montar_registros
+
+# Configuração do logger
+logger = setup_logger()
+
+# Medição da automação contra o portal simulado (mock_portal.py), por modo de
+# execução: notas por minuto, tempo de inicialização da sessão e memória.
+# Uso: python benchmark.py --linhas 50 --modos http selenium_headless pool
+#      python benchmark.py --modos --memoria-linhas 100000   (só a memória das linhas)
+#      python benchmark.py --modos --inicializacao            (só o tempo de abertura)
+
+# Modos de execução medidos: backend, navegador sem janela e quantidade de workers
+MODOS = {
+    'selenium': {'backend': 'selenium', 'headless': False, 'workers': 1},
+    'selenium_headless': {'backend': 'selenium', 'headless': True, 'workers': 1},
+    'pool': {'backend': 'selenium', 'headless': True, 'workers': None},
+    'http': {'backend': 'http', 'headless': True, 'workers': 1},
+}
+
+_PESOS_DV1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+_PESOS_DV2 = [6] + _PESOS_DV1
+
+def _digito(digitos, pesos):
+    resto = sum(d * p for d, p in zip(digitos, pesos)) % 11
+    return 0 if resto < 2 else 11 - resto
+
+def gerar_cnpjs(quantidade, seed=0):
+    """Gera CNPJs válidos e distintos"""
+    rnd = random.Random(seed)
+    cnpjs = []
+    while len(cnpjs) < quantidade:
+        # Primeiro dígito diferente de zero: a planilha guarda o CNPJ como número
+        base = [rnd.randint(1, 9)] + [rnd.randint(0, 9) for _ in range(7)] + [0, 0, 0, 1]
+        base.append(_digito(base, _PESOS_DV1))
+        base.append(_digito(base, _PESOS_DV2))
+        cnpj = ''.join(map(str, base))
+        if cnpj not in cnpjs and len(set(cnpj)) > 1:
+            cnpjs.append(cnpj)
+    return cnpjs
+
+def gerar_planilha(path, linhas, seed=0):
+    """Grava uma planilha de teste com ``linhas`` empresas"""
+    cnpjs = gerar_cnpjs(linhas, seed)
+    pd.DataFrame({
+        'CNPJ': cnpjs,
+        'RAZAO SOCIAL': [f'EMPRESA TESTE {n + 1}' for n in range(linhas)],
+        'VALOR': [round(100 + n * 1.5, 2) for n in range(linhas)],
+    }).to_excel(path, index=False)
+
+class MemorySampler:
+    """Pico de memória: heap Python (tracemalloc) e, com psutil, RSS do processo e dos navegadores"""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak_rss = None
+        self._stop = threading.Event()
+        self._thread = None
+        try:
+            import psutil
+            self._process = psutil.Process()
+        except ImportError:
+            self._process = None
+
+    def _rss(self):
+        total = self._process.memory_info().rss
+        for child in self._process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except Exception:
+                pass
+        return total
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.peak_rss = max(self.peak_rss or 0, self._rss())
+            except Exception:
+                pass
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        if self._process is not None:
+            self._thread = threading.Thread(target=self._run, name='benchmark-memoria', daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.peak_python = tracemalloc.get_traced_memory()[1]
+        return False
+
+    def result(self):
+        return {
+            'pico_python_mb': round(self.peak_python / 1024 ** 2, 1),
+            'pico_rss_total_mb': round(self.peak_rss / 1024 ** 2, 1) if self.peak_rss else None,
+        }
+
+def medir_modo(nome, planilha, portal, workers):
+    """Executa a automação em um modo e retorna as métricas"""
+    modo = MODOS[nome]
+    Config.BACKEND = modo['backend']
+    Config.HEADLESS['ENABLED'] = modo['headless']
+    workers = modo['workers'] or workers
+
+    aberturas = []
+
+    def abrir(worker_id=0):
+        inicio = time.perf_counter()
+        backend = back.abrir_backend(worker_id, portal.url)
+        aberturas.append(time.perf_counter() - inicio)
+        return backend
+
+    notas_antes = portal.stats()['notas']
+    with MemorySampler() as memoria:
+        inicio = time.perf_counter()
+        if workers > 1:
+            df = back.run_automation(planilha, '01/2025', None, None, workers, 'todos', backend_factory=abrir)
+        else:
+            backend = abrir()
+            try:
+                df = back.run_automation(planilha, '01/2025', None, None, 1, 'todos', backend=backend)
+            finally:
+                backend.close()
+        total = time.perf_counter() - inicio
+
+    inicializacao = max(aberturas) if aberturas else 0.0
+    emissao = max(total - inicializacao, 1e-9)
+    emitidas = int((df['STATUS'] == back.STATUS_EMITIDA).sum())
+    return {
+        'modo': nome,
+        'workers': workers,
+        'linhas': int(len(df)),
+        'emitidas': emitidas,
+        'gravadas_no_portal': portal.stats()['notas'] - notas_antes,
+        'inicializacao_s': round(inicializacao, 2),
+        'tempo_total_s': round(total, 2),
+        'notas_por_minuto': round(emitidas / emissao * 60, 1),
+        **memoria.result(),
+    }
+
+def medir_memoria_linhas(pasta, linhas):
+    """Pico de memória da preparação das linhas, sem portal: leitura e validação da
+    planilha, registros da emissão e status aplicados na gravação"""
+    planilha = os.path.join(pasta, 'memoria.xlsx')
+    gerar_planilha(planilha, linhas, seed=1)
+    with MemorySampler() as memoria:
+        inicio = time.perf_counter()
+        df, _ = back.preparar_dados(planilha, '01/2025')
+        carregada = tracemalloc.get_traced_memory()[0]
+        registros = montar_registros(df)
+        statuses = StatusArray(df.index)
+        for registro in registros:
+            statuses[registro.index] = back.STATUS_EMITIDA
+        emissao = tracemalloc.get_traced_memory()[0] - carregada
+        statuses.merge(df)
+        total = time.perf_counter() - inicio
+    return {
+        'modo': 'memoria_linhas',
+        'linhas': linhas,
+        'registros_e_status_mb': round(emissao / 1024 ** 2, 1),
+        'bytes_por_linha': round(emissao / linhas),
+        'tempo_total_s': round(total, 2),
+        **memoria.result(),
+    }
+
+# Módulos cujo tempo de importação é medido: a interface deve abrir sem carregar a automação
+MODULOS_INICIALIZACAO = ('ui', 'back')
+
+def medir_inicializacao(repeticoes=3):
+    """Tempo de importação (s) de cada módulo em um processo novo, melhor de ``repeticoes``"""
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    script = "import time; t = time.perf_counter(); import {}; print(time.perf_counter() - t)"
+    tempos = {}
+    for modulo in MODULOS_INICIALIZACAO:
+        medidas = []
+        for _ in range(repeticoes):
+            saida = subprocess.run([sys.executable, '-c', script.format(modulo)], cwd=pasta,
+                                   capture_output=True, text=True, check=True)
+            medidas.append(float(saida.stdout.strip().splitlines()[-1]))
+        tempos[f'importar_{modulo}_s'] = round(min(medidas), 3)
+    return {'modo': 'inicializacao', **tempos}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da automação contra o portal simulado")
+    parser.add_argument('--modos', nargs='*', choices=list(MODOS), default=list(MODOS))
+    parser.add_argument('--linhas', type=int, default=20, help="Empresas na planilha de teste")
+    parser.add_argument('--workers', type=int, default=3, help="Workers do modo 'pool'")
+    parser.add_argument('--latencia', type=float, default=0.05, help="Atraso (s) de cada resposta do portal")
+    parser.add_argument('--atraso-tomador', type=float, default=0.3, help="Atraso (s) do preenchimento do tomador")
+    parser.add_argument('--falha-gravar', type=float, default=0.0, help="Probabilidade de rejeição da nota")
+    parser.add_argument('--cache', action='store_true', help="Usa o cache de endereços (desativado por padrão)")
+    parser.add_argument('--memoria-linhas', type=int, default=0, metavar='N',
+                        help="Mede também a memória da preparação de uma planilha com N linhas")
+    parser.add_argument('--inicializacao', action='store_true',
+                        help="Mede também o tempo de importação da interface e da automação")
+    parser.add_argument('--saida', metavar='ARQUIVO', help="Grava os resultados em JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    # O portal é simulado: as notas podem ser gravadas e a recusa tem texto conhecido
+    Config.GRAVAR_NOTAS = True
+    Config.HTTP['REJEICAO_MARKER'] = MENSAGEM_REJEICAO
+    Config.ADDRESS_CACHE['ENABLED'] = args.cache
+    Config.USUARIO = Config.USUARIO or 'benchmark'
+    Config.SENHA = Config.SENHA or 'benchmark'
+
+    pasta = tempfile.mkdtemp(prefix='nfe_benchmark_')
+    modelo = os.path.join(pasta, 'modelo.xlsx')
+    gerar_planilha(modelo, args.linhas)
+
+    resultados = []
+    if args.inicializacao:
+        logger.info("Benchmark: tempo de inicialização")
+        resultados.append(medir_inicializacao())
+    if args.memoria_linhas:
+        logger.info(f"Benchmark: memória da preparação de {args.memoria_linhas} linhas")
+        resultados.append(medir_memoria_linhas(pasta, args.memoria_linhas))
+
+    with MockPortal(latencia=args.latencia, atraso_tomador=args.atraso_tomador,
+                    falha_gravar=args.falha_gravar, seed=0) as portal:
+        for nome in args.modos:
+            planilha = os.path.join(pasta, f'{nome}.xlsx')
+            shutil.copy(modelo, planilha)
+            logger.info(f"Benchmark: modo '{nome}' com {args.linhas} linhas")
+            try:
+                resultados.append(medir_modo(nome, planilha, portal, args.workers))
+            except Exception as e:
+                logger.error(f"Benchmark: modo '{nome}' falhou: {str(e)}")
+                resultados.append({'modo': nome, 'erro': str(e)})
+    shutil.rmtree(pasta, ignore_errors=True)
+
+    texto = json.dumps(resultados, ensure_ascii=False, indent=2)
+    print(texto)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import back
+from config import Config
+from logger_config import setup_logger
+
+# Configuração do logger
+logger = setup_logger()
+
+# Códigos de saída
+SAIDA_OK = 0
+SAIDA_ERROS_NAS_NOTAS = 1
+SAIDA_FALHA = 2
+SAIDA_CANCELADA = 130
+
+def expandir_arquivos(entradas):
+    """Expande arquivos, pastas e padrões glob na lista de planilhas, sem repetição"""
+    arquivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            candidatos = sorted(glob.glob(os.path.join(entrada, '*.xls*')))
+        elif glob.has_magic(entrada):
+            candidatos = sorted(glob.glob(entrada, recursive=True))
+        else:
+            candidatos = [entrada]
+        for caminho in candidatos:
+            # Ignora os arquivos temporários do Excel (~$planilha.xlsx)
+            if os.path.basename(caminho).startswith('~$'):
+                continue
+            caminho = os.path.abspath(caminho)
+            if caminho not in arquivos:
+                arquivos.append(caminho)
+    return arquivos
+
+class _SessaoCompartilhada:
+    """Sessão de emissão reaproveitada entre planilhas: ``close`` não a encerra"""
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def __getattr__(self, name):
+        return getattr(self._backend, name)
+
+    def close(self):
+        pass
+
+class SessionCache:
+    """Mantém as sessões (uma por worker) abertas durante todo o lote"""
+
+    def __init__(self, opener):
+        self.opener = opener
+        self.backends = {}
+
+    def get(self, worker_id=0):
+        if worker_id not in self.backends:
+            self.backends[worker_id] = self.opener(worker_id)
+        return _SessaoCompartilhada(self.backends[worker_id])
+
+    def close(self):
+        for backend in self.backends.values():
+            try:
+                backend.close()
+            except Exception as e:
+                logger.warning(f"Erro ao encerrar sessão: {str(e)}")
+        self.backends.clear()
+
+def resumo_planilha(df):
+    """Contagem de notas emitidas, simuladas e com erro na planilha processada"""
+    status = df['STATUS'].astype(str)
+    return {
+        'linhas': int(len(df)),
+        'emitidas': int((status == back.STATUS_EMITIDA).sum()),
+        'simuladas': int((status == back.STATUS_SIMULADA).sum()),
+        'erros': int(status.str.startswith('Erro').sum()),
+        'a_verificar': int(status.str.startswith(back.STATUS_VERIFICAR.format('')).sum()),
+    }
+
+def processar_lote(arquivos, competencia, workers=None, modo=None):
+    """Processa as planilhas em sequência reaproveitando as sessões do portal
+
+    Retorna ``(codigo_saida, resumo)``; o resumo tem um item por planilha.
+    """
+    workers = workers or Config.PARALLEL_WORKERS
+    sessoes = SessionCache(lambda worker_id: back.abrir_backend(worker_id))
+    itens = []
+    codigo = SAIDA_OK
+    inicio = time.perf_counter()
+    try:
+        for posicao, arquivo in enumerate(arquivos):
+            logger.info(f"Planilha {posicao + 1}/{len(arquivos)}: {arquivo}")
+            item = {'arquivo': arquivo, 'situacao': 'ok'}
+            inicio_arquivo = time.perf_counter()
+            try:
+                if workers > 1:
+                    df = back.run_automation(arquivo, competencia, None, None, workers, modo,
+                                             backend_factory=sessoes.get)
+                else:
+                    df = back.run_automation(arquivo, competencia, None, None, workers, modo,
+                                             backend=sessoes.get())
+                if df is None:
+                    item['situacao'] = 'cancelada'
+                    codigo = max(codigo, SAIDA_FALHA)
+                    itens.append(item)
+                    break
+                item.update(resumo_planilha(df))
+                if item['erros'] or item['a_verificar']:
+                    item['situacao'] = 'erros'
+                    codigo = max(codigo, SAIDA_ERROS_NAS_NOTAS)
+            except KeyboardInterrupt:
+                item['situacao'] = 'cancelada'
+                codigo = SAIDA_CANCELADA
+                itens.append(item)
+                itens.extend({'arquivo': restante, 'situacao': 'nao_processada'}
+                             for restante in arquivos[posicao + 1:])
+                logger.warning("Lote interrompido pelo usuário")
+                break
+            except Exception as e:
+                item['situacao'] = 'falha'
+                item['erro'] = str(e)
+                codigo = max(codigo, SAIDA_FALHA)
+            item['duracao_s'] = round(time.perf_counter() - inicio_arquivo, 1)
+            itens.append(item)
+    finally:
+        sessoes.close()
+
+    resumo = {
+        'competencia': competencia,
+        'gravar_notas': Config.GRAVAR_NOTAS,
+        'codigo_saida': codigo,
+        'duracao_s': round(time.perf_counter() - inicio, 1),
+        'planilhas': itens,
+    }
+    return codigo, resumo
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Automação de lançamento de NF - Vinhedo: processa uma ou mais planilhas em lote")
+    parser.add_argument('arquivos', nargs='+',
+                        help="Planilhas Excel, pastas ou padrões (ex.: 'clientes/*.xlsx')")
+    parser.add_argument('-c', '--competencia', required=True, help="Competência das notas (ex.: 01/2025)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Navegadores emitindo em paralelo (padrão: NFE_WORKERS)")
+    parser.add_argument('-m', '--modo', choices=back.MODOS_EXECUCAO, default=None,
+                        help="Modo de execução (padrão: NFE_MODO)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Apenas preenche os formulários, sem gravar as notas")
+    parser.add_argument('--headless', action='store_true', help="Executa o navegador sem janela (perfil leve)")
+    parser.add_argument('--resumo', metavar='ARQUIVO',
+                        help="Grava o resumo em JSON neste arquivo (além da saída padrão)")
+    return parser
+
+def main(argv=None):
+    """Ponto de entrada da linha de comando; retorna o código de saída
+
+    0 = todas as notas emitidas, 1 = há notas com erro ou a conferir no portal, 2 = alguma planilha
+    não pôde ser processada, 130 = interrompido. O resumo em JSON é escrito
+    na saída padrão (o log vai para a saída de erro).
+    """
+    args = build_parser().parse_args(argv)
+    if args.dry_run:
+        Config.GRAVAR_NOTAS = False
+    if args.headless:
+        Config.HEADLESS['ENABLED'] = True
+
+    arquivos = expandir_arquivos(args.arquivos)
+    if not arquivos:
+        logger.error("Nenhuma planilha encontrada")
+        codigo, resumo = SAIDA_FALHA, {'competencia': args.competencia, 'codigo_saida': SAIDA_FALHA,
+                                       'planilhas': []}
+    else:
+        codigo, resumo = processar_lote(arquivos, args.competencia, args.workers, args.modo)
+
+    texto = json.dumps(resumo, ensure_ascii=False, indent=2)
+    print(texto)
+    if args.resumo:
+        with open(args.resumo, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    return codigo
+
+if __name__ == "__main__":
+    sys.exit(main())
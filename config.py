@@ -0,0 +1,164 @@
+import os
+from dotenv import load_dotenv
+
+# Carrega as variáveis do arquivo .env
+load_dotenv()
+
+class Config:
+    """Configurações centralizadas do sistema"""
+
+    # URL do portal NFE Vinhedo (NFE_URL permite apontar para o portal simulado, ver mock_portal.py)
+    URL_LOGIN = os.getenv('NFE_URL', 'http://www.nfevinhedo.com.br')
+
+    # User agent utilizado pelo navegador
+    USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+    # Credenciais (lidas do arquivo .env)
+    USUARIO = os.getenv('NFE_USUARIO')
+    SENHA = os.getenv('NFE_SENHA')
+
+    # Timeouts em segundos
+    TIMEOUTS = {
+        'LOGIN': 60,        # Timeout para login
+        'ELEMENT': 15,      # Timeout para elementos
+        'PAGE_LOAD': 180,   # Timeout para carregamento de página
+        'CLICK': 10,        # Timeout para cliques
+        'WAIT': 1,          # Tempo de espera padrão
+        'POLL': 0.1,        # Intervalo de verificação das esperas por condição
+        'SETTLE': 0.3,      # Tempo que um campo deve ficar inalterado para ser considerado estável
+        'REABRIR': 5        # Timeout para reabrir o formulário dentro do iframe
+    }
+
+    # Colunas obrigatórias na planilha
+    REQUIRED_COLUMNS = ['CNPJ', 'RAZAO SOCIAL', 'VALOR']
+
+    # Configuração de logging
+    LOGGING = {
+        'level': 'INFO',
+        'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        'file': 'automacao_nfe.log',
+        'dir': os.getenv('NFE_LOG_DIR', os.path.dirname(os.path.abspath(__file__))),   # Pasta do arquivo de log
+        'async': os.getenv('NFE_LOG_ASYNC', '1') == '1',   # Escrita em segundo plano (fila + listener)
+        'json': os.getenv('NFE_LOG_JSON', '0') == '1',     # Arquivo em JSON lines em vez de texto
+        'rotation': os.getenv('NFE_LOG_ROTACAO', 'tamanho'),   # 'tamanho', 'diaria' ou 'nenhuma'
+        'max_bytes': 5 * 1024 * 1024,   # Tamanho máximo do arquivo na rotação por tamanho
+        'backup_count': 5,              # Arquivos antigos mantidos na rotação
+    }
+
+    # Quantidade de navegadores emitindo notas em paralelo (1 = modo sequencial)
+    PARALLEL_WORKERS = int(os.getenv('NFE_WORKERS', '1'))
+
+    # Modo de execução padrão: 'todos', 'retomar' (pula notas emitidas) ou 'erros'
+    RESUME_MODE = os.getenv('NFE_MODO', 'todos')
+
+    # Reaproveitamento do navegador entre execuções
+    SESSION = {
+        'KEEP_ALIVE': os.getenv('NFE_MANTER_NAVEGADOR', '0') == '1',   # Mantém o Chrome aberto e logado
+        'DEBUG_PORT': int(os.getenv('NFE_DEBUG_PORT', '9222')),        # Porta de depuração (somada ao nº do worker)
+        'PROFILE_DIR': os.path.join(os.path.dirname(os.path.abspath(__file__)), '.chrome_profile'),
+        'DRIVER_CACHE': os.path.join(os.path.dirname(os.path.abspath(__file__)), '.chromedriver_cache.json'),
+    }
+
+    # Grava a nota no portal (clica em "gravar"); desativado = apenas preenche o formulário
+    GRAVAR_NOTAS = os.getenv('NFE_GRAVAR', '0') == '1'
+
+    # Backend de emissão: 'selenium' (navegador) ou 'http' (envio direto do formulário)
+    BACKEND = os.getenv('NFE_BACKEND', 'selenium')
+
+    # Backend HTTP: caminhos das páginas do portal (relativos a URL_LOGIN)
+    HTTP = {
+        'LOGIN_PATH': os.getenv('NFE_HTTP_LOGIN', '/'),
+        'FORM_PATH': os.getenv('NFE_HTTP_FORM', '/nfe/emissao.php'),
+        'TOMADOR_PATH': os.getenv('NFE_HTTP_TOMADOR', '/nfe/tomador.php'),
+        # Textos da página após a gravação (HTTP e navegador). Sem a confirmação nem a recusa a
+        # linha fica 'Verificar no portal'; a recusa vazia nunca é reconhecida (nada é reenviado)
+        'SUCCESS_MARKER': os.getenv('NFE_HTTP_SUCESSO', 'Nota gravada'),
+        'REJEICAO_MARKER': os.getenv('NFE_HTTP_REJEICAO', ''),
+        'TIMEOUT': 30,
+        'POOL_SIZE': 10,
+    }
+
+    # Cache local de endereços dos tomadores (CNPJ -> endereço)
+    ADDRESS_CACHE = {
+        'ENABLED': os.getenv('NFE_CACHE_ENDERECOS', '1') == '1',
+        'FILE': os.path.join(os.path.dirname(os.path.abspath(__file__)), '.enderecos_cache.json'),
+        'TTL_DAYS': 30,
+        'MAX_ENTRIES': 5000,
+    }
+
+    # Planilha compartilhada entre UI e automação
+    DATASET = {
+        'HASH': False,   # Compara também o hash do conteúdo para detectar alterações
+    }
+
+    # Controle de execução (pausar/cancelar)
+    CONTROL = {
+        'KEEPALIVE': 60,         # Intervalo (s) das requisições que mantêm a sessão ativa durante a pausa
+        'CANCEL_TIMEOUT': 30,    # Tempo máximo (s) para a automação parar após o cancelamento
+        'PREWARM_TIMEOUT': 5,    # Tempo máximo (s) que a saída aguarda o navegador preaquecido fechar
+    }
+
+    # Instrumentação por etapa e relatório de desempenho da execução
+    METRICS = {
+        'ENABLED': os.getenv('NFE_METRICAS', '0') == '1',
+        'DIR': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metricas'),   # Eventos (.jsonl) e resumos (.json)
+    }
+
+    # Mantém o navegador dentro do iframe da emissão entre as notas (sem navegar pelo menu)
+    MANTER_IFRAME = os.getenv('NFE_MANTER_IFRAME', '1') == '1'
+
+    # Novas tentativas das notas com falha recuperável (timeout, elemento obsoleto, sessão perdida)
+    RETRY = {
+        'ENABLED': os.getenv('NFE_RETENTATIVAS', '1') == '1',
+        'MAX_TENTATIVAS': int(os.getenv('NFE_MAX_TENTATIVAS', '3')),   # Tentativas por nota, incluindo a primeira
+        'BACKOFF': 2,        # Espera (s) antes da segunda tentativa; dobra a cada nova tentativa
+        'BACKOFF_MAX': 30,   # Espera máxima (s) entre tentativas
+    }
+
+    # Navegador sem janela (headless) e com carregamento leve, para execução em servidor
+    HEADLESS = {
+        'ENABLED': os.getenv('NFE_HEADLESS', '0') == '1',
+        'WINDOW_SIZE': (1366, 900),       # Tamanho fixo da janela (largura, altura)
+        'BLOCK_IMAGES': True,             # Não baixa imagens
+        'BLOCKED_URLS': [                 # Recursos não usados pela automação (fontes, mídia, analytics)
+            '*.woff', '*.woff2', '*.ttf', '*.otf', '*.mp4', '*.webm', '*.mp3',
+            '*google-analytics.com*', '*googletagmanager.com*',
+        ],
+        'PAGE_LOAD_STRATEGY': 'eager',    # Não espera imagens e subrecursos ao carregar a página
+    }
+
+    # CNPJ repetido na planilha: 'sinalizar' (emite só a primeira linha), 'somar' (uma nota com a soma
+    # dos valores) ou 'emitir' (emite todas as linhas)
+    DUPLICADOS = os.getenv('NFE_DUPLICADOS', 'sinalizar')
+
+    # Pipeline da emissão sequencial: preparo da próxima nota e registro do status fora da thread do navegador
+    PIPELINE = {
+        'ENABLED': os.getenv('NFE_PIPELINE', '1') == '1',
+        'QUEUE_SIZE': 8,   # Notas preparadas/aguardando registro em cada fila
+    }
+
+    # Ritmo adaptativo: timeouts pelo p95 observado de cada etapa, recuo após falhas/lentidão
+    # e limite global de notas por minuto (0 = sem limite) para todo o pool
+    ADAPTIVE = {
+        'ENABLED': os.getenv('NFE_ADAPTATIVO', '1') == '1',
+        'MAX_NOTAS_MIN': int(os.getenv('NFE_MAX_NOTAS_MIN', '0')),
+        'JANELA': 50,              # Amostras mais recentes consideradas por etapa
+        'MIN_AMOSTRAS': 5,         # Amostras antes de ajustar os timeouts da etapa
+        'FATOR_TIMEOUT': 3,        # Timeout = p95 da etapa x fator
+        'TIMEOUT_MIN': 2,          # Timeout mínimo (s) de uma etapa ajustada
+        'TIMEOUT_MIN_FATOR': 0.25, # Timeout mínimo = Config.TIMEOUTS da etapa x fator
+        'TIMEOUT_MAX_FATOR': 2,    # Timeout máximo = Config.TIMEOUTS da etapa x fator
+        'LIMITE_LENTIDAO': 2.0,    # Nota acima de p50 x limite é considerada lenta
+        'ATRASO_BASE': 0.5,        # Espera mínima (s) entre notas durante o recuo
+        'FATOR_ATRASO': 0.25,      # Espera do recuo proporcional ao p50 da nota
+        'ATRASO_MAX': 10,          # Espera máxima (s) entre notas
+        'NIVEL_MAX': 4,            # Níveis de recuo (cada nível dobra espera e timeouts)
+        # Etapas após o envio da nota (não idempotentes): sempre com o timeout padrão
+        'ETAPAS_FIXAS': ('http:gravar', 'form:envio', 'form:resultado', 'form:finalizacao'),
+    }
+
+    # Interface: navegador aberto e logado em segundo plano enquanto a planilha é escolhida
+    UI = {
+        'PREAQUECER_NAVEGADOR': os.getenv('NFE_PREAQUECER', '1') == '1',
+    }
@@ -0,0 +1,99 @@
+import threading
+from contextlib import contextmanager
+from config import Config
+from logger_config import setup_logger
+
+# Configuração do logger
+logger = setup_logger()
+
+# Controle associado à thread atual (ver bind)
+_local = threading.local()
+
+class AutomationCancelled(Exception):
+    """Levantada nos pontos de verificação quando a automação é cancelada"""
+    pass
+
+class RunControl:
+    """Canal de controle cooperativo da automação: cancelar, pausar e continuar
+
+    A automação consulta o controle entre as etapas. O cancelamento é
+    atendido no próximo ponto de verificação (inclusive dentro das esperas
+    pelo portal); a pausa só tem efeito entre uma nota e outra, mantendo a
+    sessão do portal ativa enquanto aguarda.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def cancel(self):
+        logger.info("Cancelamento solicitado")
+        self._cancelled.set()
+        # Libera quem estiver aguardando na pausa
+        self._running.set()
+
+    def pause(self):
+        logger.info("Pausa solicitada")
+        self._running.clear()
+
+    def resume(self):
+        logger.info("Automação retomada")
+        self._running.set()
+
+    def check(self):
+        """Levanta AutomationCancelled se o cancelamento foi solicitado"""
+        if self._cancelled.is_set() and not getattr(_local, 'shielded', False):
+            raise AutomationCancelled("Automação cancelada pelo usuário")
+
+    def wait_if_paused(self, keepalive=None):
+        """Bloqueia enquanto pausado, chamando ``keepalive`` periodicamente"""
+        while not self._running.wait(timeout=Config.CONTROL['KEEPALIVE']):
+            if keepalive:
+                try:
+                    keepalive()
+                except Exception as e:
+                    logger.warning(f"Erro ao manter a sessão ativa durante a pausa: {str(e)}")
+        self.check()
+
+def bind(control):
+    """Associa o controle à thread atual, para os pontos de verificação internos"""
+    _local.control = control
+
+def current():
+    return getattr(_local, 'control', None)
+
+def checkpoint():
+    """Ponto de verificação: levanta AutomationCancelled se a execução foi cancelada"""
+    control = current()
+    if control is not None:
+        control.check()
+
+def mark_submitted(value=True):
+    """Marca que a nota da thread atual já foi enviada ao portal (ver back.processar_empresa)
+
+    Depois do envio uma falha não indica que a nota deixou de ser gravada, então
+    ela não pode ser emitida de novo.
+    """
+    _local.submitted = value
+
+def was_submitted():
+    return getattr(_local, 'submitted', False)
+
+@contextmanager
+def shielded():
+    """Impede o cancelamento dentro do bloco (ex.: após gravar a nota no portal)"""
+    previous = getattr(_local, 'shielded', False)
+    _local.shielded = True
+    try:
+        yield
+    finally:
+        _local.shielded = previous
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import threading
+from config import Config
+from logger_config import setup_logger
+from validators import ValidationError, validate_excel_file, validate_excel_structure, validate_data_types
+
+# Configuração do logger
+logger = setup_logger()
+
+class Dataset:
+    """Planilha lida e validada uma única vez, compartilhada entre a UI e a automação
+
+    O arquivo é relido apenas quando muda em disco (data de modificação e
+    tamanho, e opcionalmente o hash do conteúdo com ``Config.DATASET['HASH']``).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.df = None
+        self.report = None
+        self.error = None
+        self._signature = None
+        self._lock = threading.RLock()
+
+    def _file_signature(self):
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if Config.DATASET['HASH']:
+            digest = hashlib.sha1()
+            with open(self.path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            signature += (digest.hexdigest(),)
+        return signature
+
+    def is_stale(self):
+        """Indica se o arquivo mudou desde a última leitura"""
+        try:
+            return self._signature != self._file_signature()
+        except OSError:
+            return True
+
+    def load(self):
+        """Lê e valida a planilha
+
+        Erros de leitura são levantados; erros de conteúdo ficam em ``error``
+        para que a pré-visualização ainda mostre os dados.
+        """
+        with self._lock:
+            signature = self._file_signature() if os.path.exists(self.path) else None
+            df = validate_excel_file(self.path)
+            self.df, self.report, self.error = df, None, None
+            try:
+                validate_excel_structure(df)
+                self.report = validate_data_types(df)
+            except ValidationError as e:
+                self.error = e
+            self._signature = signature
+            logger.info(f"Planilha carregada: {self.path} ({len(df)} linhas)")
+            return self
+
+    def ensure_loaded(self):
+        """Carrega a planilha se ainda não foi lida ou se mudou em disco"""
+        with self._lock:
+            if self.df is None or self.is_stale():
+                self.load()
+            return self
+
+    def validated_df(self):
+        """Retorna o DataFrame validado, levantando o erro de validação se houver"""
+        with self._lock:
+            self.ensure_loaded()
+            if self.error is not None:
+                raise self.error
+            return self.df
+
+    def mark_saved(self):
+        """Atualiza a assinatura após a própria automação gravar a planilha"""
+        with self._lock:
+            try:
+                self._signature = self._file_signature()
+            except OSError:
+                self._signature = None
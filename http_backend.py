@@ -0,0 +1,237 @@
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+from control import checkpoint, mark_submitted
+from address_cache import address_cache
+from pacing import pacer
+from locators import element_id
+from logger_config import setup_logger
+
+# Configuração do logger
+logger = setup_logger()
+
+class HttpBackendError(Exception):
+    """Erro de comunicação ou página inesperada no backend HTTP"""
+    pass
+
+class HttpSessionExpired(HttpBackendError):
+    """O portal devolveu a página de login: a sessão expirou"""
+    pass
+
+class NotaRejeitada(HttpBackendError):
+    """O portal recusou a gravação de forma explícita: a nota não foi gravada (também usada pelo navegador)"""
+    pass
+
+class NotaNaoConfirmada(HttpBackendError):
+    """A página após a gravação não trouxe a confirmação nem a recusa: a nota pode ter sido gravada"""
+    pass
+
+def conferir_gravacao(texto):
+    """Confere o texto da página devolvida pela gravação (HTTP e navegador)
+
+    Só a mensagem de recusa configurada (``Config.HTTP['REJEICAO_MARKER']``)
+    indica que a nota não foi gravada; sem ela e sem a confirmação, o resultado
+    é incerto e a nota não pode ser enviada de novo.
+    """
+    rejeicao = Config.HTTP['REJEICAO_MARKER']
+    if rejeicao and rejeicao in texto:
+        raise NotaRejeitada("Portal recusou a gravação da nota")
+    if Config.HTTP['SUCCESS_MARKER'] not in texto:
+        raise NotaNaoConfirmada("Portal não confirmou a gravação da nota")
+
+class _FormParser(HTMLParser):
+    """Extrai os formulários de uma página: ação, método e campos com valores"""
+
+    def __init__(self):
+        super().__init__()
+        self.forms = []
+        self._form = None
+        self._select = None
+        self._textarea = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'form':
+            self._form = {'action': attrs.get('action', ''), 'method': attrs.get('method', 'get').lower(),
+                          'id': attrs.get('id'), 'fields': {}, 'ids': {}}
+            self.forms.append(self._form)
+            return
+        if self._form is None:
+            return
+
+        name = attrs.get('name') or attrs.get('id')
+        if tag == 'input' and name:
+            input_type = attrs.get('type', 'text').lower()
+            if input_type in ('checkbox', 'radio') and 'checked' not in attrs:
+                return
+            if input_type in ('submit', 'button', 'image', 'reset'):
+                return
+            self._add(name, attrs.get('id'), attrs.get('value', ''))
+        elif tag == 'select' and name:
+            self._select = name
+            self._add(name, attrs.get('id'), '')
+        elif tag == 'option' and self._select:
+            if 'selected' in attrs or not self._form['fields'][self._select]:
+                self._form['fields'][self._select] = attrs.get('value', '')
+        elif tag == 'textarea' and name:
+            self._textarea = name
+            self._add(name, attrs.get('id'), '')
+
+    def handle_endtag(self, tag):
+        if tag == 'form':
+            self._form = None
+        elif tag == 'select':
+            self._select = None
+        elif tag == 'textarea':
+            self._textarea = None
+
+    def handle_data(self, data):
+        if self._form is not None and self._textarea:
+            self._form['fields'][self._textarea] += data
+
+    def _add(self, name, element_id, value):
+        self._form['fields'][name] = value
+        if element_id:
+            self._form['ids'][element_id] = name
+
+def parse_forms(html):
+    """Retorna a lista de formulários encontrados no HTML"""
+    parser = _FormParser()
+    parser.feed(html)
+    return parser.forms
+
+def find_form(forms, field_id):
+    """Retorna o primeiro formulário que contém o campo com o id informado"""
+    for form in forms:
+        if field_id in form['ids'] or field_id in form['fields']:
+            return form
+    raise HttpBackendError(f"Formulário com o campo '{field_id}' não encontrado")
+
+def set_field(form, field_id, value):
+    """Define o valor de um campo do formulário pelo id (ou nome)"""
+    name = form['ids'].get(field_id, field_id)
+    form['fields'][name] = value
+
+class HttpBackend:
+    """Backend de emissão que envia o formulário da NF direto por HTTP
+
+    Reproduz o fluxo do navegador sobre uma ``requests.Session`` com pool de
+    conexões: login, abertura do formulário (cookies e campos ocultos), consulta
+    do endereço do tomador e envio do formulário preenchido.
+    """
+
+    nome = 'http'
+
+    def __init__(self, field_map, base_url=None):
+        self.field_map = field_map
+        self.base_url = base_url or Config.URL_LOGIN
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = Config.USER_AGENT
+        adapter = HTTPAdapter(pool_connections=Config.HTTP['POOL_SIZE'], pool_maxsize=Config.HTTP['POOL_SIZE'])
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _url(self, path):
+        return urljoin(self.base_url.rstrip('/') + '/', path.lstrip('/'))
+
+    def _request(self, method, url, step=None, **kwargs):
+        # Timeout ajustado à latência observada da rota (ver pacing.AdaptivePacer)
+        step = step or f"http:{method}:{urlparse(url).path}"
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=pacer.timeout(step, Config.HTTP['TIMEOUT']),
+                                            **kwargs)
+            response.raise_for_status()
+            pacer.observar(step, time.perf_counter() - start)
+            return response
+        except requests.RequestException as e:
+            raise HttpBackendError(f"Erro na requisição {method.upper()} {url}: {str(e)}") from e
+
+    def _submit(self, page_url, form, **kwargs):
+        """Envia o formulário usando a ação e o método declarados na página"""
+        action = urljoin(page_url, form['action'] or page_url)
+        if form['method'] == 'post':
+            return self._request('post', action, data=form['fields'], **kwargs)
+        return self._request('get', action, params=form['fields'], **kwargs)
+
+    def login(self):
+        """Realiza o login no portal e valida o menu do prestador e o formulário da nota
+
+        A abertura do formulário é testada já no login para que um endereço
+        errado (``Config.HTTP['FORM_PATH']``) faça ``abrir_backend`` usar o
+        navegador, em vez de cada nota falhar depois.
+        """
+        logger.info("Iniciando login via HTTP...")
+        url = self._url(Config.HTTP['LOGIN_PATH'])
+        page = self._request('get', url)
+        form = find_form(parse_forms(page.text), element_id('login:usuario'))
+        set_field(form, element_id('login:usuario'), Config.USUARIO)
+        set_field(form, element_id('login:senha'), Config.SENHA)
+        response = self._submit(page.url, form)
+        if f'id="{element_id("menu:prestador")}"' not in response.text:
+            raise HttpBackendError("Login via HTTP não confirmado (menu do prestador ausente)")
+        find_form(parse_forms(self._request('get', self._url(Config.HTTP['FORM_PATH'])).text),
+                  element_id('form:documento'))
+        logger.info("Login via HTTP realizado com sucesso")
+        return self
+
+    def consultar_tomador(self, cnpj):
+        """Consulta o endereço do tomador, como o preenchimento automático do portal"""
+        response = self._request('get', self._url(Config.HTTP['TOMADOR_PATH']), params={element_id('form:documento'): cnpj})
+        try:
+            data = response.json()
+            values = {source_id: data.get(source_id, '') for source_id, _ in self.field_map.values()}
+        except ValueError:
+            # Resposta em HTML: lê os campos *Tomador da página retornada
+            fields = {}
+            for form in parse_forms(response.text):
+                fields.update({element_id: form['fields'][name] for element_id, name in form['ids'].items()})
+            values = {source_id: fields.get(source_id, '') for source_id, _ in self.field_map.values()}
+        return {name: values[source_id] for name, (source_id, _) in self.field_map.items()}
+
+    def emitir(self, nota):
+        """Preenche e envia o formulário da nota (campos já formatados em ``nota``)"""
+        form_url = self._url(Config.HTTP['FORM_PATH'])
+        page = self._request('get', form_url)
+        forms = parse_forms(page.text)
+        if any(element_id('login:usuario') in form['ids'] for form in forms):
+            raise HttpSessionExpired("Sessão do portal expirada (formulário de login retornado)")
+        form = find_form(forms, element_id('form:documento'))
+
+        cnpj = nota['form:documento']
+        endereco = address_cache.get(cnpj)
+        if not endereco:
+            endereco = self.consultar_tomador(cnpj)
+            address_cache.put(cnpj, endereco)
+        for name, (source_id, target_id) in self.field_map.items():
+            set_field(form, source_id, endereco[name])
+            set_field(form, target_id, endereco[name])
+
+        for nome, value in nota.items():
+            set_field(form, element_id(nome), value)
+
+        # Último ponto de cancelamento antes de gravar a nota
+        checkpoint()
+        if not Config.GRAVAR_NOTAS:
+            logger.info(f"Formulário HTTP preenchido para {cnpj} (gravação desativada)")
+            return
+
+        set_field(form, element_id('form:gravar'), 'Gravar')
+        mark_submitted()
+        response = self._submit(page.url, form, step='http:gravar')
+        conferir_gravacao(response.text)
+
+    def keepalive(self):
+        """Mantém a sessão do portal ativa durante uma pausa"""
+        self._request('get', self.base_url)
+
+    def reconectar(self):
+        """Refaz o login após a sessão do portal expirar"""
+        self.session.cookies.clear()
+        self.login()
+
+    def close(self):
+        self.session.close()
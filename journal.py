@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from logger_config import setup_logger
+
+# Configuração do logger
+logger = setup_logger()
+
+def journal_path_for(excel_path):
+    """Retorna o caminho do diário de status associado a uma planilha"""
+    return os.path.splitext(excel_path)[0] + '_status.jsonl'
+
+class StatusJournal:
+    """Diário de status append-only (JSON lines) gravado a cada linha processada
+
+    Cada resultado é acrescentado ao final do arquivo e sincronizado em disco,
+    então o custo por linha é constante e um processo interrompido perde no
+    máximo o registro em andamento. A coluna STATUS da planilha é escrita
+    apenas no final (ou sob demanda) por ``write_excel_atomic``.
+
+    Cada registro leva a competência da execução; ``load`` e ``apply`` só
+    consideram os registros da mesma competência, para que o diário de um mês
+    não marque as linhas do mês seguinte como já emitidas.
+    """
+
+    def __init__(self, excel_path, competencia=None, path=None):
+        self.excel_path = excel_path
+        self.competencia = competencia
+        self.path = path or journal_path_for(excel_path)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def open(self):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def record(self, index, cnpj, status):
+        """Acrescenta o resultado de uma linha ao diário"""
+        entry = {
+            'ts': datetime.now().isoformat(timespec='seconds'),
+            'row': int(index),
+            'cnpj': str(cnpj),
+            'status': status,
+            'competencia': self.competencia,
+        }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            self.open()
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def load(self):
+        """Lê o diário e retorna {linha: (cnpj, status)} da competência, prevalecendo o último registro"""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Última linha truncada por uma interrupção
+                    continue
+                if entry.get('competencia') != self.competencia:
+                    # Registro de outra competência (ou de versão sem competência)
+                    continue
+                entries[entry['row']] = (entry['cnpj'], entry['status'])
+        return entries
+
+    def apply(self, df):
+        """Aplica os status do diário nas colunas STATUS e COMPETENCIA do DataFrame
+
+        Só aplica registros cujo CNPJ ainda corresponde à linha, para não
+        misturar resultados caso a planilha tenha sido editada.
+        """
+        for column in ('STATUS', 'COMPETENCIA'):
+            if column not in df.columns:
+                df[column] = ""
+        applied = 0
+        for index, (cnpj, status) in self.load().items():
+            if index in df.index and str(df.at[index, 'CNPJ']) == cnpj:
+                df.at[index, 'STATUS'] = status
+                df.at[index, 'COMPETENCIA'] = self.competencia
+                applied += 1
+        return applied
+
+def write_excel_atomic(df, excel_path):
+    """Grava a planilha em um arquivo temporário e o substitui atomicamente"""
+    directory = os.path.dirname(os.path.abspath(excel_path))
+    extension = os.path.splitext(excel_path)[1] or '.xlsx'
+    fd, tmp_path = tempfile.mkstemp(prefix='.~nfe_', suffix=extension, dir=directory)
+    os.close(fd)
+    try:
+        df.to_excel(tmp_path, index=False)
+        os.replace(tmp_path, excel_path)
+        logger.info(f"Planilha atualizada: {excel_path}")
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,144 @@
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.common.by import By
+from waits import wait_clickable, wait_present, warn_fallback
+
+# Registro central dos elementos do portal NFE Vinhedo. Cada nome tem seus
+# localizadores em ordem de preferência: ID/CSS primeiro (mais rápidos) e o
+# XPath original como alternativa. Se o portal mudar o layout, só este arquivo
+# precisa ser atualizado: o backend HTTP usa os mesmos ids (ver element_id)
+# como nomes dos campos enviados.
+
+# iframe onde o formulário da nota é aberto
+FRAME_EMISSAO = 'conteudo_window'
+
+LOCATORS = {
+    # Página de login
+    'login:area_prestador': ((By.CSS_SELECTOR, '#login > div:nth-of-type(2) > a:nth-of-type(2)'),
+                             (By.XPATH, '//*[@id="login"]/div[2]/a[2]')),
+    'login:usuario': ((By.ID, 'usuario'),),
+    'login:senha': ((By.ID, 'senha'),),
+
+    # Menu do prestador (só existe com o usuário logado)
+    'menu:prestador': ((By.ID, 'menu'),),
+    'menu:lancamento': ((By.CSS_SELECTOR, '#menu > a:nth-of-type(2)'),
+                        (By.XPATH, '//*[@id="menu"]/a[2]')),
+    'menu:nota_fiscal': ((By.CSS_SELECTOR, '#menu > div:nth-of-type(2) > a:nth-of-type(2)'),
+                         (By.XPATH, '//*[@id="menu"]/div[2]/a[2]')),
+    'frame:emissao': ((By.ID, FRAME_EMISSAO),),
+
+    # Página de entrada do iframe e formulário da nota
+    'form:gerar_notas': ((By.CSS_SELECTOR, "img[src$='entrar_nfe.gif']"),
+                         (By.XPATH, "//img[@src='../images/entrar_nfe.gif']")),
+    'form:documento': ((By.ID, 'Documento'),),
+    'form:rua_tomador': ((By.ID, 'RuaTomador'),),
+    'form:descricao': ((By.ID, 'descricao'),),
+    'form:codigo': ((By.ID, 'Codigo'),),
+    'form:valor': ((By.ID, 'Valor'),),
+    'form:gravar': ((By.ID, 'gravar'),),
+}
+
+# Campos de endereço do tomador espelhados nos campos do serviço: nome -> (id origem, id destino)
+CAMPOS_ENDERECO = {
+    'Rua': ('RuaTomador', 'RuaServico'),
+    'Numero': ('NumeroTomador', 'NumeroServico'),
+    'UF': ('UFTomador', 'UFServico'),
+    'Bairro': ('BairroTomador', 'BairroServico'),
+    'CEP': ('CEPTomador', 'CEPServico'),
+    'Cidade': ('CidadeTomador', 'CidadeServico'),
+}
+
+# Localiza vários elementos em um único execute_script, tentando os localizadores em ordem;
+# retorna {nome: [elemento, posição do localizador usado]} (elemento null se não encontrado)
+_LOCATE_SCRIPT = """
+var pedidos = arguments[0];
+var resultado = {};
+for (var nome in pedidos) {
+    var opcoes = pedidos[nome];
+    var elemento = null;
+    var posicao = -1;
+    for (var i = 0; i < opcoes.length && !elemento; i++) {
+        var by = opcoes[i][0], valor = opcoes[i][1];
+        if (by === 'id') {
+            elemento = document.getElementById(valor);
+        } else if (by === 'css selector') {
+            elemento = document.querySelector(valor);
+        } else if (by === 'xpath') {
+            elemento = document.evaluate(valor, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE,
+                                         null).singleNodeValue;
+        }
+        posicao = i;
+    }
+    resultado[nome] = [elemento, elemento ? posicao : -1];
+}
+return resultado;
+"""
+
+def locator(nome):
+    """Localizadores do elemento ``nome``, em ordem de preferência"""
+    return LOCATORS[nome]
+
+def element_id(nome):
+    """Id do elemento ``nome`` no portal (nome do campo no formulário enviado por HTTP)"""
+    for by, valor in LOCATORS[nome]:
+        if by == By.ID:
+            return valor
+    raise KeyError(f"Elemento sem localizador por id: {nome}")
+
+def locate_many(driver, nomes):
+    """Localiza vários elementos do documento atual em uma única chamada: {nome: elemento ou None}"""
+    encontrados = driver.execute_script(_LOCATE_SCRIPT, {nome: [list(l) for l in LOCATORS[nome]] for nome in nomes})
+    elementos = {}
+    for nome in nomes:
+        elemento, posicao = encontrados.get(nome) or (None, -1)
+        if elemento is not None and posicao > 0:
+            warn_fallback(LOCATORS[nome], posicao)
+        elementos[nome] = elemento
+    return elementos
+
+def locate(driver, nome):
+    """Localiza um elemento sem esperar; None se não estiver na página"""
+    return locate_many(driver, (nome,))[nome]
+
+class ElementCache:
+    """Handles dos elementos de uma instância do formulário
+
+    ``prefetch`` localiza vários elementos em um único execute_script; ``get``
+    devolve o handle em cache ou aguarda o elemento. Um handle obsoleto (a
+    página o recriou) é descartado e localizado de novo por ``use``. Criar um
+    cache novo a cada formulário aberto.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._handles = {}
+
+    def prefetch(self, *nomes):
+        """Guarda os elementos já presentes na página; retorna os nomes não encontrados"""
+        faltando = []
+        for nome, elemento in locate_many(self.driver, nomes).items():
+            if elemento is None:
+                faltando.append(nome)
+            else:
+                self._handles[nome] = elemento
+        return faltando
+
+    def get(self, nome, timeout=None, clickable=False, step=None):
+        """Handle do elemento; sem cache (ou não clicável quando ``clickable``) aguarda o elemento"""
+        elemento = self._handles.get(nome)
+        if elemento is not None:
+            try:
+                if not clickable or (elemento.is_displayed() and elemento.is_enabled()):
+                    return elemento
+            except StaleElementReferenceException:
+                del self._handles[nome]
+        wait = wait_clickable if clickable else wait_present
+        elemento = self._handles[nome] = wait(self.driver, LOCATORS[nome], timeout, step or nome)
+        return elemento
+
+    def use(self, nome, action, timeout=None, clickable=False, step=None):
+        """Executa ``action(elemento)``; se o handle estiver obsoleto, localiza de novo e repete uma vez"""
+        try:
+            return action(self.get(nome, timeout, clickable, step))
+        except StaleElementReferenceException:
+            self._handles.pop(nome, None)
+            return action(self.get(nome, timeout, clickable, step))
@@ -1,10 +1,51 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
 from datetime import datetime
 from config import Config
 
+# Listeners que escrevem os registros enfileirados (modo assíncrono)
+_listeners = []
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como um objeto JSON por linha"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def _file_handler():
+    """Cria o handler de arquivo conforme a rotação configurada"""
+    os.makedirs(Config.LOGGING['dir'], exist_ok=True)
+    log_file = os.path.join(Config.LOGGING['dir'], Config.LOGGING['file'])
+    rotation = Config.LOGGING['rotation']
+    if rotation == 'tamanho':
+        return logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=Config.LOGGING['max_bytes'], backupCount=Config.LOGGING['backup_count'],
+            encoding='utf-8')
+    if rotation == 'diaria':
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file, when='midnight', backupCount=Config.LOGGING['backup_count'], encoding='utf-8')
+    return logging.FileHandler(log_file, encoding='utf-8')
+
 def setup_logger(name='automacao_nfe'):
-    """Configura e retorna o logger do sistema"""
+    """Configura e retorna o logger do sistema
+
+    No modo assíncrono (``Config.LOGGING['async']``) o logger apenas enfileira
+    os registros; a escrita no arquivo e no console é feita por um
+    ``QueueListener`` em segundo plano, sem bloquear a emissão.
+    """
     
     # Cria o logger
     logger = logging.getLogger(name)
@@ -18,40 +59,57 @@ def setup_logger(name='automacao_nfe'):
     formatter = logging.Formatter(Config.LOGGING['format'])
     
     # Handler para arquivo
-    log_file = os.path.join(os.path.dirname(__file__), Config.LOGGING['file'])
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    file_handler = _file_handler()
     file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(JsonFormatter() if Config.LOGGING['json'] else formatter)
     
     # Handler para console
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
     
-    # Adiciona os handlers ao logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    if Config.LOGGING['async']:
+        # Fila sem limite: registrar nunca bloqueia a thread da automação
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        listener = logging.handlers.QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True)
+        listener.start()
+        if not _listeners:
+            atexit.register(stop_logging)
+        _listeners.append(listener)
+    else:
+        # Adiciona os handlers ao logger
+        logger.addHandler(file_handler)
+        logger.addHandler(console_handler)
     
     return logger
 
+def stop_logging():
+    """Descarrega a fila de logs, encerra os listeners e fecha os arquivos (chamado na saída do programa)"""
+    while _listeners:
+        listener = _listeners.pop()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+# Configuração do logger
+logger = setup_logger()
+
 def log_automation_start(empresa, cnpj):
     """Log do início da automação para uma empresa"""
-    logger = setup_logger()
     logger.info(f"Iniciando automação para empresa: {empresa} (CNPJ: {cnpj})")
 
 def log_automation_success(empresa, cnpj):
     """Log de sucesso da automação"""
-    logger = setup_logger()
     logger.info(f"Automação concluída com sucesso para: {empresa} (CNPJ: {cnpj})")
 
 def log_automation_error(empresa, cnpj, error):
     """Log de erro na automação"""
-    logger = setup_logger()
     logger.error(f"Erro na automação para {empresa} (CNPJ: {cnpj}): {str(error)}")
 
 def log_system_info():
     """Log de informações do sistema"""
-    logger = setup_logger()
     logger.info("=" * 50)
     logger.info("INÍCIO DA SESSÃO DE AUTOMAÇÃO")
     logger.info(f"Data/Hora: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
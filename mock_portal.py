@@ -0,0 +1,293 @@
+import argparse
+import base64
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from config import Config
+
+# Portal NFE Vinhedo simulado, com o mesmo DOM usado pela automação (login, menu,
+# iframe conteudo_window e formulário da nota). Serve para testar e medir a
+# automação sem emitir notas reais. Uso: python mock_portal.py --porta 8765
+
+# GIF transparente 1x1 usado no botão de gerar notas
+_GIF = base64.b64decode('R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7')
+
+_PAGINA_LOGIN = """<html><head><meta charset="utf-8"><title>NFE Vinhedo (simulado)</title></head><body>
+<div id="login">
+  <div><h1>NFE Vinhedo</h1></div>
+  <div>
+    <a href="#">Contribuinte</a>
+    <a href="#" onclick="document.getElementById('acesso').style.display='block'; return false;">Área do Prestador</a>
+  </div>
+  <form id="acesso" method="post" action="/login" style="display:none">
+    <input id="usuario" name="usuario" type="text">
+    <input id="senha" name="senha" type="password" onblur="if (this.value) { this.form.submit(); }">
+  </form>
+</div>
+</body></html>"""
+
+_PAGINA_PRINCIPAL = """<html><head><meta charset="utf-8"><title>NFE Vinhedo (simulado)</title></head><body>
+<div id="menu">
+  <a href="/principal">Início</a>
+  <a href="#" onclick="document.getElementById('sub_lancamento').style.display='block'; return false;">Lançamento</a>
+  <div id="sub_inicio" style="display:none"></div>
+  <div id="sub_lancamento" style="display:none">
+    <a href="#">Recibos</a>
+    <a href="#" onclick="abrirNota(); return false;">Nota Fiscal</a>
+  </div>
+</div>
+<div id="conteudo"></div>
+<script>
+function abrirNota() {
+  document.getElementById('conteudo').innerHTML =
+    '<iframe id="conteudo_window" name="conteudo_window" src="/nfe/entrada.php" width="100%" height="700"></iframe>';
+}
+</script>
+</body></html>"""
+
+_PAGINA_ENTRADA = """<html><head><meta charset="utf-8"></head><body>
+{mensagem}
+<a href="emissao.php"><img src='../images/entrar_nfe.gif' width="120" height="40" alt="Gerar nota"></a>
+</body></html>"""
+
+_CAMPOS_ENDERECO = ('Rua', 'Numero', 'UF', 'Bairro', 'CEP', 'Cidade')
+
+# Mensagens da página após a gravação (fixas: não dependem de Config.HTTP)
+MENSAGEM_SUCESSO = 'Nota gravada com sucesso.'
+MENSAGEM_REJEICAO = 'Erro: nota não aceita pelo portal.'
+
+_PAGINA_EMISSAO = """<html><head><meta charset="utf-8"></head><body>
+<form method="post" action="emissao.php">
+  <input id="Documento" name="Documento" type="text" onchange="consultar(this.value)">
+  {tomador}
+  {servico}
+  <textarea id="descricao" name="descricao"></textarea>
+  <select id="Codigo" name="Codigo">
+    <option value="">Selecione</option>
+    <option value="00802- 3.97">00802- 3.97</option>
+  </select>
+  <input id="Valor" name="Valor" type="text">
+  <input id="gravar" name="gravar" type="submit" value="Gravar">
+</form>
+<script>
+function consultar(documento) {{
+  fetch('tomador.php?Documento=' + encodeURIComponent(documento))
+    .then(function (r) {{ return r.ok ? r.json() : {{}}; }})
+    .then(function (dados) {{
+      for (var id in dados) {{
+        var campo = document.getElementById(id);
+        if (campo) {{ campo.value = dados[id]; }}
+      }}
+    }});
+}}
+</script>
+</body></html>""".format(
+    tomador='\n  '.join(f'<input id="{c}Tomador" name="{c}Tomador" type="text">' for c in _CAMPOS_ENDERECO),
+    servico='\n  '.join(f'<input id="{c}Servico" name="{c}Servico" type="text">' for c in _CAMPOS_ENDERECO),
+)
+
+def endereco_simulado(cnpj):
+    """Endereço determinístico do tomador a partir do CNPJ"""
+    digitos = ''.join(ch for ch in str(cnpj) if ch.isdigit()) or '0'
+    return {
+        'RuaTomador': f'Rua Simulada {digitos[-4:]}',
+        'NumeroTomador': str(int(digitos[-3:]) + 1),
+        'UFTomador': 'SP',
+        'BairroTomador': 'Centro',
+        'CEPTomador': '13280-000',
+        'CidadeTomador': 'Vinhedo',
+    }
+
+class MockPortal:
+    """Servidor HTTP local que imita o portal, com latência e falhas configuráveis
+
+    - ``latencia``: atraso (s) de cada resposta
+    - ``atraso_tomador``: atraso (s) do preenchimento automático do tomador
+    - ``falha_tomador``: probabilidade de a consulta do tomador falhar
+    - ``falha_gravar``: probabilidade de o portal rejeitar a gravação
+    - ``falha_resposta``: probabilidade de a nota ser gravada e a resposta ser um erro 502
+    - ``expirar_apos``: encerra a sessão após N notas gravadas (0 = nunca)
+    """
+
+    def __init__(self, porta=0, latencia=0.0, atraso_tomador=0.2, falha_tomador=0.0, falha_gravar=0.0,
+                 expirar_apos=0, seed=None, falha_resposta=0.0):
+        self.latencia = latencia
+        self.atraso_tomador = atraso_tomador
+        self.falha_tomador = falha_tomador
+        self.falha_gravar = falha_gravar
+        self.falha_resposta = falha_resposta
+        self.expirar_apos = expirar_apos
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sessoes = {}
+        self.notas = []
+        self.rejeicoes = 0
+        self.logins = 0
+        self._server = ThreadingHTTPServer(('127.0.0.1', porta), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def start(self):
+        """Inicia o servidor em segundo plano e retorna a URL"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-portal', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {'notas': len(self.notas), 'rejeicoes': self.rejeicoes, 'logins': self.logins}
+
+    def _sortear(self, probabilidade):
+        with self._lock:
+            return probabilidade > 0 and self._random.random() < probabilidade
+
+    def _nova_sessao(self):
+        token = secrets.token_hex(8)
+        with self._lock:
+            self._sessoes[token] = 0
+            self.logins += 1
+        return token
+
+    def _sessao_valida(self, token):
+        with self._lock:
+            return token in self._sessoes
+
+    def _gravar(self, token, campos):
+        """Registra a nota; retorna False se o portal a rejeitar"""
+        obrigatorios = ('Documento', 'RuaServico', 'CidadeServico', 'Codigo', 'Valor')
+        if any(not campos.get(campo) for campo in obrigatorios) or self._sortear(self.falha_gravar):
+            with self._lock:
+                self.rejeicoes += 1
+            return False
+        with self._lock:
+            self.notas.append(campos)
+            self._sessoes[token] = self._sessoes.get(token, 0) + 1
+            if self.expirar_apos and self._sessoes[token] >= self.expirar_apos:
+                del self._sessoes[token]
+        return True
+
+    def _handler_class(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def log_message(self, format, *args):
+                pass
+
+            def _token(self):
+                for cookie in self.headers.get('Cookie', '').split(';'):
+                    name, _, value = cookie.strip().partition('=')
+                    if name == 'PHPSESSID':
+                        return value
+                return None
+
+            def _send(self, body, status=200, content_type='text/html; charset=utf-8', headers=None):
+                if portal.latencia:
+                    time.sleep(portal.latencia)
+                data = body if isinstance(body, bytes) else body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _form(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                dados = parse_qs(self.rfile.read(length).decode('utf-8'), keep_blank_values=True)
+                return {name: values[-1] for name, values in dados.items()}
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/images/entrar_nfe.gif':
+                    return self._send(_GIF, content_type='image/gif')
+                if url.path in ('/', '/index.php'):
+                    pagina = _PAGINA_PRINCIPAL if portal._sessao_valida(self._token()) else _PAGINA_LOGIN
+                    return self._send(pagina)
+                if not portal._sessao_valida(self._token()):
+                    # Sessão ausente ou expirada: o portal devolve a página de login
+                    return self._send(_PAGINA_LOGIN)
+                if url.path == '/principal':
+                    return self._send(_PAGINA_PRINCIPAL)
+                if url.path == '/nfe/entrada.php':
+                    return self._send(_PAGINA_ENTRADA.format(mensagem=''))
+                if url.path == Config.HTTP['FORM_PATH']:
+                    return self._send(_PAGINA_EMISSAO)
+                if url.path == Config.HTTP['TOMADOR_PATH']:
+                    if portal.atraso_tomador:
+                        time.sleep(portal.atraso_tomador)
+                    if portal._sortear(portal.falha_tomador):
+                        return self._send('{}', status=500, content_type='application/json')
+                    documento = parse_qs(url.query).get('Documento', [''])[0]
+                    return self._send(json.dumps(endereco_simulado(documento)), content_type='application/json')
+                self._send('Página não encontrada', status=404)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                campos = self._form()
+                if url.path == '/login':
+                    if not campos.get('usuario') or not campos.get('senha'):
+                        return self._send(_PAGINA_LOGIN)
+                    token = portal._nova_sessao()
+                    return self._send('', status=303, headers={
+                        'Location': '/principal', 'Set-Cookie': f'PHPSESSID={token}; Path=/'})
+                if url.path == Config.HTTP['FORM_PATH']:
+                    token = self._token()
+                    if not portal._sessao_valida(token):
+                        return self._send(_PAGINA_LOGIN)
+                    if not portal._gravar(token, campos):
+                        return self._send(_PAGINA_ENTRADA.format(mensagem=f"<p>{MENSAGEM_REJEICAO}</p>"))
+                    if portal._sortear(portal.falha_resposta):
+                        # Nota gravada, mas a resposta se perde (ex.: proxy do portal)
+                        return self._send('Bad Gateway', status=502)
+                    return self._send(_PAGINA_ENTRADA.format(mensagem=f"<p>{MENSAGEM_SUCESSO}</p>"))
+                self._send('Página não encontrada', status=404)
+
+        return Handler
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Portal NFE Vinhedo simulado para testes locais")
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--latencia', type=float, default=0.0, help="Atraso (s) de cada resposta")
+    parser.add_argument('--atraso-tomador', type=float, default=0.2, help="Atraso (s) do preenchimento do tomador")
+    parser.add_argument('--falha-tomador', type=float, default=0.0, help="Probabilidade de falha na consulta do tomador")
+    parser.add_argument('--falha-gravar', type=float, default=0.0, help="Probabilidade de rejeição da nota")
+    parser.add_argument('--expirar-apos', type=int, default=0, help="Expira a sessão após N notas (0 = nunca)")
+    parser.add_argument('--falha-resposta', type=float, default=0.0,
+                        help="Probabilidade de a nota ser gravada e a resposta ser um erro 502")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    portal = MockPortal(args.porta, args.latencia, args.atraso_tomador, args.falha_tomador, args.falha_gravar,
+                        args.expirar_apos, args.seed, args.falha_resposta)
+    print(f"Portal simulado em {portal.url} (Ctrl+C para encerrar)")
+    try:
+        portal._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        portal._server.server_close()
+        print(json.dumps(portal.stats()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import deque
+from config import Config
+from control import checkpoint
+from logger_config import setup_logger
+from timing import _percentile
+
+# Configuração do logger
+logger = setup_logger()
+
+class AdaptivePacer:
+    """Ajusta timeouts e ritmo da emissão à latência observada do portal
+
+    - Mantém uma janela móvel das durações de cada etapa (esperas do navegador,
+      requisições HTTP) e das notas completas
+    - ``timeout(etapa, padrao)``: p95 da etapa vezes ``FATOR_TIMEOUT``, limitado
+      a ``[padrao * TIMEOUT_MIN_FATOR, padrao * TIMEOUT_MAX_FATOR]``; sem
+      amostras suficientes usa o ``padrao`` (``Config.TIMEOUTS``). As etapas
+      posteriores ao envio da nota (``ETAPAS_FIXAS``) nunca têm o timeout
+      reduzido: cortá-las faria uma nota gravada parecer uma falha
+    - Falhas e notas lentas (acima de ``LIMITE_LENTIDAO`` vezes o p50) sobem o
+      nível de recuo, que aumenta timeouts e a espera entre notas; notas
+      normais o reduzem
+    - ``aguardar()`` aplica a espera de recuo e o limite global de notas por
+      minuto, compartilhado pelos workers do pool
+
+    Parâmetros em ``Config.ADAPTIVE``; desativado, só o limite global é aplicado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._janelas = {}
+        self._nivel = 0
+        self._proxima_vaga = 0.0
+        self._recuos = 0
+        self._espera_total = 0.0
+
+    def reset(self):
+        """Reinicia o perfil de latência, o recuo e o limite de vazão (início de cada execução)"""
+        with self._lock:
+            self._janelas = {}
+            self._nivel = 0
+            self._proxima_vaga = 0.0
+            self._recuos = 0
+            self._espera_total = 0.0
+
+    def _janela(self, etapa):
+        janela = self._janelas.get(etapa)
+        if janela is None:
+            janela = self._janelas[etapa] = deque(maxlen=Config.ADAPTIVE['JANELA'])
+        return janela
+
+    def _quantil(self, etapa, percent):
+        """Percentil da etapa, ou None sem amostras suficientes (chamar com o lock)"""
+        janela = self._janelas.get(etapa)
+        if not janela or len(janela) < Config.ADAPTIVE['MIN_AMOSTRAS']:
+            return None
+        return _percentile(sorted(janela), percent)
+
+    def observar(self, etapa, duracao):
+        """Registra a duração de uma etapa"""
+        if not Config.ADAPTIVE['ENABLED']:
+            return
+        with self._lock:
+            self._janela(etapa).append(duracao)
+
+    def timeout(self, etapa, padrao):
+        """Timeout (s) da etapa a partir do p95 observado e do nível de recuo"""
+        cfg = Config.ADAPTIVE
+        if not cfg['ENABLED'] or etapa in cfg['ETAPAS_FIXAS']:
+            return padrao
+        with self._lock:
+            p95 = self._quantil(etapa, 95)
+            nivel = self._nivel
+        if p95 is None:
+            return padrao
+        minimo = max(cfg['TIMEOUT_MIN'], padrao * cfg['TIMEOUT_MIN_FATOR'])
+        sugerido = max(minimo, p95 * cfg['FATOR_TIMEOUT']) * 2 ** nivel
+        return min(sugerido, padrao * cfg['TIMEOUT_MAX_FATOR'])
+
+    def nota(self, duracao, ok):
+        """Registra o resultado de uma nota e ajusta o nível de recuo"""
+        if not Config.ADAPTIVE['ENABLED']:
+            return
+        cfg = Config.ADAPTIVE
+        with self._lock:
+            p50 = self._quantil('nota', 50)
+            lenta = p50 is not None and duracao > p50 * cfg['LIMITE_LENTIDAO']
+            if ok:
+                self._janela('nota').append(duracao)
+            anterior = self._nivel
+            if not ok or lenta:
+                self._nivel = min(self._nivel + 1, cfg['NIVEL_MAX'])
+            else:
+                self._nivel = max(self._nivel - 1, 0)
+            if self._nivel > anterior:
+                self._recuos += 1
+            nivel = self._nivel
+        if nivel > anterior:
+            motivo = 'falha' if not ok else f'nota lenta ({duracao:.1f}s, p50 {p50:.1f}s)'
+            logger.info(f"Ritmo adaptativo: recuo nível {nivel} por {motivo}")
+        elif nivel < anterior and nivel == 0:
+            logger.info("Ritmo adaptativo: portal normalizado, recuo desfeito")
+
+    def intervalo(self):
+        """Espera (s) antes da próxima nota de cada sessão, conforme o nível de recuo"""
+        if not Config.ADAPTIVE['ENABLED']:
+            return 0.0
+        cfg = Config.ADAPTIVE
+        with self._lock:
+            if self._nivel == 0:
+                return 0.0
+            base = max(cfg['ATRASO_BASE'], (self._quantil('nota', 50) or 0.0) * cfg['FATOR_ATRASO'])
+            return min(cfg['ATRASO_MAX'], base * 2 ** (self._nivel - 1))
+
+    def aguardar(self):
+        """Espera o recuo e a vaga no limite global de notas por minuto (respeita o cancelamento)"""
+        espera = self.intervalo()
+        limite = Config.ADAPTIVE['MAX_NOTAS_MIN']
+        agora = time.monotonic()
+        with self._lock:
+            inicio = agora + espera
+            if limite:
+                # Reserva a próxima vaga: as sessões do pool ficam espaçadas de 60/limite segundos
+                inicio = max(inicio, self._proxima_vaga)
+                self._proxima_vaga = inicio + 60 / limite
+            if inicio > agora:
+                self._espera_total += inicio - agora
+        while True:
+            checkpoint()
+            restante = inicio - time.monotonic()
+            if restante <= 0:
+                return
+            time.sleep(min(restante, 0.2))
+
+    def summary(self):
+        """Retorna {'nivel', 'recuos', 'espera_s', 'etapas': {etapa: {'p50_s', 'p95_s'}}}"""
+        with self._lock:
+            etapas = {
+                etapa: {'p50_s': round(_percentile(sorted(janela), 50), 3),
+                        'p95_s': round(_percentile(sorted(janela), 95), 3)}
+                for etapa, janela in self._janelas.items() if janela
+            }
+            return {
+                'nivel': self._nivel,
+                'recuos': self._recuos,
+                'espera_s': round(self._espera_total, 3),
+                'etapas': etapas,
+            }
+
+    def log_summary(self):
+        """Escreve no log o recuo aplicado na execução"""
+        summary = self.summary()
+        if summary['recuos'] or summary['espera_s']:
+            logger.info(f"Ritmo adaptativo: {summary['recuos']} recuos, "
+                        f"{summary['espera_s']:.1f}s de espera entre notas")
+
+# Controle de ritmo global, compartilhado pelas sessões
+pacer = AdaptivePacer()
@@ -0,0 +1,124 @@
+import queue
+import threading
+from config import Config
+from logger_config import setup_logger
+
+# Configuração do logger
+logger = setup_logger()
+
+# Marca o fim de uma fila do pipeline
+_FIM = object()
+
+class NotePipeline:
+    """Pipeline de emissão em três estágios ligados por filas limitadas
+
+    - ``prepare(item)``: monta o payload da nota (thread de preparação, à frente
+      do navegador); uma exceção é repassada ao envio no lugar do payload
+    - ``submit(item, payload)``: envia a nota (thread atual, a do navegador) e
+      retorna o resultado, ou None quando não há nada a finalizar
+    - ``finalize(item, resultado)``: registra status e diário (thread de finalização)
+
+    Assim o navegador não espera o trabalho do lado Python. As filas limitadas
+    (``Config.PIPELINE['QUEUE_SIZE']``) evitam preparar a planilha inteira de
+    uma vez. Com ``Config.PIPELINE['ENABLED']`` desligado os estágios rodam em
+    sequência na thread atual.
+    """
+
+    def __init__(self, prepare, submit, finalize, queue_size=None):
+        self.prepare = prepare
+        self.submit = submit
+        self.finalize = finalize
+        size = queue_size or Config.PIPELINE['QUEUE_SIZE']
+        self._prontas = queue.Queue(maxsize=size)
+        self._resultados = queue.Queue(maxsize=size)
+        self._stop = threading.Event()
+        self._errors = []
+
+    def _put(self, fila, item):
+        """Coloca na fila sem travar se o pipeline for interrompido"""
+        while not self._stop.is_set():
+            try:
+                fila.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _prepare(self, item):
+        try:
+            return self.prepare(item)
+        except Exception as e:
+            return e
+
+    def _produce(self, items):
+        try:
+            for item in items:
+                if not self._put(self._prontas, (item, self._prepare(item))):
+                    return
+        except Exception as e:
+            self._errors.append(e)
+        finally:
+            self._put(self._prontas, _FIM)
+
+    def _consume(self):
+        while True:
+            entry = self._resultados.get()
+            if entry is _FIM:
+                return
+            try:
+                self.finalize(*entry)
+            except Exception as e:
+                logger.error(f"Erro ao finalizar a linha {entry[0]}: {str(e)}")
+                self._errors.append(e)
+
+    def _submit(self, item, payload):
+        result = self.submit(item, payload)
+        if result is not None:
+            self._resultados.put((item, result))
+
+    def run(self, items, extra=None):
+        """Processa ``items`` e, depois deles, o que ``extra()`` devolver até retornar None
+
+        ``extra`` é usado para as novas tentativas, preparadas na própria thread
+        do navegador já que chegam uma a uma.
+        """
+        if not Config.PIPELINE['ENABLED']:
+            return self._run_inline(items, extra)
+
+        producer = threading.Thread(target=self._produce, args=(items,), name='nfe-preparo', daemon=True)
+        finalizer = threading.Thread(target=self._consume, name='nfe-finalizacao', daemon=True)
+        producer.start()
+        finalizer.start()
+        try:
+            while True:
+                entry = self._prontas.get()
+                if entry is _FIM:
+                    break
+                self._submit(*entry)
+            while extra is not None:
+                item = extra()
+                if item is None:
+                    break
+                self._submit(item, self._prepare(item))
+        finally:
+            # Tudo o que já foi enviado é finalizado antes de retornar (inclusive no cancelamento)
+            self._stop.set()
+            self._resultados.put(_FIM)
+            finalizer.join()
+            producer.join(timeout=1)
+        if self._errors:
+            raise self._errors[0]
+
+    def _run_inline(self, items, extra=None):
+        def process(item):
+            result = self.submit(item, self._prepare(item))
+            if result is not None:
+                self.finalize(item, result)
+
+        for item in items:
+            process(item)
+        while extra is not None:
+            item = extra()
+            if item is None:
+                break
+            process(item)
@@ -0,0 +1,142 @@
+import queue
+import threading
+from config import Config
+from control import AutomationCancelled, bind
+from retry import NovaTentativa, RetryQueue
+from logger_config import setup_logger
+
+# Configuração do logger
+logger = setup_logger()
+
+class EmissionPool:
+    """Pool de sessões logadas (navegador ou HTTP) que emitem notas em paralelo
+
+    Cada worker abre a própria sessão através de ``backend_factory(worker_id)`` e
+    consome índices de linha de uma fila compartilhada, de modo que a carga
+    fica balanceada mesmo quando algumas notas demoram mais que outras. As
+    linhas com falha recuperável vão para uma fila de novas tentativas,
+    consumida depois que as linhas ainda não tentadas acabam.
+    """
+
+    def __init__(self, backend_factory, process_row, workers=None,
+                 progress_callback=None, status_callback=None, on_result=None, control=None):
+        self.backend_factory = backend_factory
+        self.process_row = process_row
+        self.workers = max(1, workers or Config.PARALLEL_WORKERS)
+        self.progress_callback = progress_callback
+        self.status_callback = status_callback
+        self.on_result = on_result
+        self.control = control
+        self._lock = threading.Lock()
+        self._done = 0
+        self._total = 0
+        self.retries = RetryQueue()
+
+    def run(self, rows):
+        """Processa as linhas ``(indice, cnpj, razao, valor)`` e retorna {indice: status}"""
+        rows = list(rows)
+        self._total = len(rows)
+        self._done = 0
+        results = {}
+        if not rows:
+            return results
+
+        fila = queue.Queue()
+        for row in rows:
+            fila.put(row)
+
+        workers = min(self.workers, len(rows))
+        logger.info(f"Iniciando pool com {workers} sessões para {len(rows)} itens")
+
+        threads = [
+            threading.Thread(target=self._worker, args=(n + 1, fila, results),
+                             name=f"nfe-worker-{n + 1}", daemon=True)
+            for n in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Linhas que sobraram na fila (todas as sessões falharam ao iniciar)
+        while not (self.control and self.control.cancelled):
+            try:
+                index, cnpj, razao, _ = fila.get_nowait()
+            except queue.Empty:
+                break
+            self._record(0, index, razao, 'Erro: nenhuma sessão disponível', results)
+        if not (self.control and self.control.cancelled):
+            for (index, cnpj, razao, _), erro in self.retries.drain():
+                self._record(0, index, razao, f'Erro: {erro[:50]}', results)
+
+        logger.info("Pool de emissão finalizado")
+        return results
+
+    def _worker(self, worker_id, fila, results):
+        """Loop de um worker: abre a sessão e consome a fila até esvaziar"""
+        bind(self.control)
+        try:
+            backend = self.backend_factory(worker_id)
+        except Exception as e:
+            logger.error(f"[Worker {worker_id}] Erro ao iniciar sessão: {str(e)}")
+            return
+
+        try:
+            while True:
+                # Pausa/cancelamento entre notas (a sessão é mantida ativa na pausa)
+                if self.control:
+                    self.control.wait_if_paused(getattr(backend, 'keepalive', None))
+                item = self._next(fila)
+                if item is None:
+                    break
+                row, tentativa = item
+                index, cnpj, razao, valor = row
+
+                if self.status_callback:
+                    if tentativa > 1:
+                        self.status_callback.emit(f"[Worker {worker_id}] Nova tentativa ({tentativa}): {razao}")
+                    else:
+                        self.status_callback.emit(f"[Worker {worker_id}] Processando: {razao}")
+
+                try:
+                    status = self.process_row(backend, cnpj, razao, valor, tentativa)
+                except NovaTentativa as e:
+                    self.retries.push(row, tentativa + 1, e.classe, e.erro)
+                    continue
+                except AutomationCancelled:
+                    raise
+                except Exception as e:
+                    # Falha inesperada fica registrada só nesta linha; o worker segue com a fila
+                    logger.error(f"[Worker {worker_id}] Erro inesperado na empresa {razao}: {str(e)}")
+                    status = f'Erro: {str(e)[:50]}'
+                self._record(worker_id, index, razao, status, results)
+        except AutomationCancelled:
+            logger.info(f"[Worker {worker_id}] Cancelado")
+        finally:
+            try:
+                backend.close()
+                logger.info(f"[Worker {worker_id}] Sessão encerrada")
+            except Exception as e:
+                logger.warning(f"[Worker {worker_id}] Erro ao encerrar sessão: {str(e)}")
+
+    def _next(self, fila):
+        """Próxima linha ``(row, tentativa)``: primeiro as não tentadas, depois as novas tentativas"""
+        try:
+            return fila.get_nowait(), 1
+        except queue.Empty:
+            return self.retries.pop()
+
+    def _record(self, worker_id, index, razao, status, results):
+        """Registra o resultado de uma linha e atualiza o progresso global"""
+        with self._lock:
+            results[index] = status
+            self._done += 1
+            progress = int(self._done / self._total * 100)
+            if self.on_result:
+                try:
+                    self.on_result(index, status)
+                except Exception as e:
+                    # Ex.: falha ao gravar o diário; o status continua em ``results`` e o worker segue
+                    logger.error(f"[Worker {worker_id}] Erro ao registrar o status da empresa {razao}: {str(e)}")
+        if self.progress_callback:
+            self.progress_callback.emit(progress)
@@ -0,0 +1,66 @@
+import numpy as np
+
+class NoteRecord:
+    """Linha da planilha a emitir, só com os campos usados na emissão
+
+    Aceita desempacotamento como a tupla ``(indice, cnpj, razao, valor)``
+    usada pelo pipeline, pelo pool e pela fila de novas tentativas.
+    """
+
+    __slots__ = ('index', 'cnpj', 'razao', 'valor')
+
+    def __init__(self, index, cnpj, razao, valor):
+        self.index = index
+        self.cnpj = cnpj
+        self.razao = razao
+        self.valor = valor
+
+    def __iter__(self):
+        return iter((self.index, self.cnpj, self.razao, self.valor))
+
+    def __repr__(self):
+        return f"NoteRecord({self.index!r}, {self.cnpj!r}, {self.razao!r}, {self.valor!r})"
+
+def montar_registros(pendentes):
+    """Converte as linhas pendentes em NoteRecord em uma única passagem, sem cópias das colunas"""
+    return [
+        NoteRecord(index, str(cnpj), str(razao), valor)
+        for index, cnpj, razao, valor in zip(
+            pendentes.index, pendentes['CNPJ'], pendentes['RAZAO SOCIAL'], pendentes['VALOR'])
+    ]
+
+class StatusArray:
+    """Status das linhas processadas na execução, aplicados ao DataFrame só na gravação
+
+    Guarda uma referência por linha da planilha (None = status não alterado);
+    a posição vem do índice do DataFrame (``RangeIndex`` na leitura do Excel,
+    sem tabela auxiliar). Com ``competencia`` a coluna COMPETENCIA das linhas
+    registradas também é preenchida.
+    """
+
+    def __init__(self, index, competencia=None):
+        self._index = index
+        self.competencia = competencia
+        self._status = np.full(len(index), None, dtype=object)
+
+    def __setitem__(self, index, status):
+        self._status[self._index.get_loc(index)] = status
+
+    def __getitem__(self, index):
+        return self._status[self._index.get_loc(index)]
+
+    def _registrados(self):
+        return np.not_equal(self._status, None)
+
+    def __len__(self):
+        """Quantidade de linhas com status registrado"""
+        return int(np.count_nonzero(self._registrados()))
+
+    def merge(self, df):
+        """Aplica os status registrados na coluna STATUS e retorna quantos foram aplicados"""
+        mask = self._registrados()
+        if mask.any():
+            df.loc[mask, 'STATUS'] = self._status[mask]
+            if self.competencia is not None:
+                df.loc[mask, 'COMPETENCIA'] = self.competencia
+        return int(mask.sum())
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import deque
+import requests
+from selenium.common.exceptions import (
+    ElementClickInterceptedException, ElementNotInteractableException, InvalidSessionIdException,
+    NoSuchFrameException, NoSuchWindowException, StaleElementReferenceException, TimeoutException,
+    WebDriverException,
+)
+from config import Config
+from control import checkpoint
+from http_backend import HttpBackendError, HttpSessionExpired, NotaRejeitada
+from logger_config import setup_logger
+
+# Configuração do logger
+logger = setup_logger()
+
+# Classes de falha
+FALHA_TIMEOUT = 'timeout'
+FALHA_ELEMENTO = 'elemento_obsoleto'
+FALHA_SESSAO = 'sessao_perdida'
+FALHA_REJEICAO = 'rejeicao_portal'
+FALHA_OUTRA = 'outra'
+
+# Falhas que valem uma nova tentativa
+FALHAS_RECUPERAVEIS = (FALHA_TIMEOUT, FALHA_ELEMENTO, FALHA_SESSAO)
+
+# Trechos das mensagens do chromedriver quando o navegador/sessão se perdeu
+_MENSAGENS_SESSAO = ('invalid session id', 'session deleted', 'disconnected', 'chrome not reachable',
+                     'no such window', 'target window already closed')
+
+class NovaTentativa(Exception):
+    """Levantada quando a linha falhou de forma recuperável e deve ser reprocessada"""
+
+    def __init__(self, classe, erro):
+        super().__init__(str(erro))
+        self.classe = classe
+        self.erro = erro
+
+def classificar_falha(exc):
+    """Classifica a exceção de uma emissão (ver FALHA_*)"""
+    if isinstance(exc, (InvalidSessionIdException, NoSuchWindowException, HttpSessionExpired)):
+        return FALHA_SESSAO
+    if isinstance(exc, (StaleElementReferenceException, ElementClickInterceptedException,
+                        ElementNotInteractableException, NoSuchFrameException)):
+        return FALHA_ELEMENTO
+    if isinstance(exc, TimeoutException):
+        return FALHA_TIMEOUT
+    if isinstance(exc, NotaRejeitada):
+        return FALHA_REJEICAO
+    if isinstance(exc, HttpBackendError):
+        if isinstance(exc.__cause__, requests.Timeout):
+            return FALHA_TIMEOUT
+        if isinstance(exc.__cause__, requests.ConnectionError):
+            return FALHA_SESSAO
+        # Erro HTTP (ex.: 502) ou página inesperada: não é uma recusa explícita do portal
+        return FALHA_OUTRA
+    if isinstance(exc, WebDriverException) and any(m in str(exc).lower() for m in _MENSAGENS_SESSAO):
+        return FALHA_SESSAO
+    return FALHA_OUTRA
+
+def deve_tentar_novamente(classe, tentativa):
+    """Indica se a falha da ``tentativa`` (1 = primeira) deve ser reprocessada"""
+    return (Config.RETRY['ENABLED'] and classe in FALHAS_RECUPERAVEIS
+            and tentativa < Config.RETRY['MAX_TENTATIVAS'])
+
+def backoff(tentativa):
+    """Espera (s) antes da ``tentativa``: exponencial e limitada"""
+    return min(Config.RETRY['BACKOFF_MAX'], Config.RETRY['BACKOFF'] * 2 ** (tentativa - 2))
+
+class RetryStats:
+    """Contagem das falhas por classe e do resultado das novas tentativas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._falhas = {}
+            self._esgotadas = {}
+            self._recuperadas = 0
+
+    def falha(self, classe):
+        with self._lock:
+            self._falhas[classe] = self._falhas.get(classe, 0) + 1
+
+    def esgotada(self, classe):
+        with self._lock:
+            self._esgotadas[classe] = self._esgotadas.get(classe, 0) + 1
+
+    def recuperada(self):
+        with self._lock:
+            self._recuperadas += 1
+
+    def summary(self):
+        """Retorna {'falhas': {classe: qtd}, 'sem_sucesso': {classe: qtd}, 'recuperadas': qtd}"""
+        with self._lock:
+            return {
+                'falhas': dict(self._falhas),
+                'sem_sucesso': dict(self._esgotadas),
+                'recuperadas': self._recuperadas,
+            }
+
+    def log_summary(self):
+        """Escreve no log as falhas por classe"""
+        summary = self.summary()
+        if not summary['falhas']:
+            return
+        logger.info(f"Falhas por classe (notas recuperadas em nova tentativa: {summary['recuperadas']}):")
+        for classe, count in sorted(summary['falhas'].items(), key=lambda item: -item[1]):
+            logger.info(f"  {classe}: {count} falhas / {summary['sem_sucesso'].get(classe, 0)} sem sucesso")
+
+# Estatísticas globais de falhas da execução
+retry_stats = RetryStats()
+
+class RetryQueue:
+    """Fila das linhas a reprocessar, consumida depois das linhas ainda não tentadas
+
+    Cada item só é liberado após o backoff da sua tentativa; a espera respeita
+    o cancelamento. Pode ser compartilhada entre os workers do pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = deque()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def push(self, row, tentativa, classe, erro):
+        """Agenda a ``tentativa`` da linha ``row`` após o backoff"""
+        with self._lock:
+            self._items.append((time.monotonic() + backoff(tentativa), row, tentativa, classe, str(erro)))
+
+    def pop(self):
+        """Retorna ``(row, tentativa)`` aguardando o backoff, ou None se a fila estiver vazia"""
+        with self._lock:
+            if not self._items:
+                return None
+            due, row, tentativa, _, _ = self._items.popleft()
+        while True:
+            checkpoint()
+            remaining = due - time.monotonic()
+            if remaining <= 0:
+                return row, tentativa
+            time.sleep(min(remaining, 0.2))
+
+    def drain(self):
+        """Remove e retorna os itens pendentes como ``(row, erro)``"""
+        with self._lock:
+            items = [(row, erro) for _, row, _, _, erro in self._items]
+            self._items.clear()
+        return items
@@ -0,0 +1,163 @@
+import json
+import os
+import socket
+import urllib.request
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from webdriver_manager.chrome import ChromeDriverManager
+from config import Config
+from locators import locator
+from logger_config import setup_logger
+
+# Configuração do logger
+logger = setup_logger()
+
+# Link do menu que só existe com o usuário logado
+_MENU_LOGADO = locator('menu:lancamento')
+
+def resolve_driver_path(usar_cache=True):
+    """Retorna o caminho do chromedriver, reutilizando o último caminho resolvido
+
+    O ``ChromeDriverManager().install()`` consulta a rede a cada chamada; o
+    caminho obtido fica em cache para que as próximas inicializações (inclusive
+    sem internet) usem o executável já baixado. ``usar_cache=False`` ignora o
+    cache (ex.: o Chrome foi atualizado e o driver salvo ficou incompatível).
+    """
+    cache_file = Config.SESSION['DRIVER_CACHE']
+    if usar_cache:
+        try:
+            with open(cache_file, encoding='utf-8') as f:
+                cached = json.load(f).get('driver_path')
+            if cached and os.path.exists(cached):
+                logger.info(f"Usando chromedriver em cache: {cached}")
+                return cached
+        except (OSError, ValueError):
+            pass
+
+    driver_path = ChromeDriverManager().install()
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'driver_path': driver_path}, f)
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar o cache do chromedriver: {str(e)}")
+    return driver_path
+
+def debug_port_for(worker_id=0):
+    """Porta de depuração remota do navegador de cada worker"""
+    return Config.SESSION['DEBUG_PORT'] + worker_id
+
+def profile_dir_for(worker_id=0):
+    """Perfil do Chrome de cada worker (perfis não podem ser compartilhados)"""
+    base = Config.SESSION['PROFILE_DIR']
+    return f"{base}_{worker_id}" if worker_id else base
+
+def _debug_browser_running(port):
+    """Verifica se há um Chrome escutando na porta de depuração"""
+    try:
+        with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+            pass
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/json/version', timeout=1) as response:
+            return 'Browser' in json.load(response)
+    except (OSError, ValueError):
+        return False
+
+def headless_mode(headless=None):
+    """Modo sem janela da sessão: o informado ou, se None, ``Config.HEADLESS['ENABLED']``"""
+    return Config.HEADLESS['ENABLED'] if headless is None else headless
+
+def _base_options(headless):
+    chrome_options = Options()
+    chrome_options.add_argument(f'user-agent={Config.USER_AGENT}')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    if headless:
+        _headless_options(chrome_options)
+    return chrome_options
+
+def _headless_options(chrome_options):
+    """Perfil leve para servidores: sem janela, sem imagens e com janela de tamanho fixo"""
+    width, height = Config.HEADLESS['WINDOW_SIZE']
+    chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument(f'--window-size={width},{height}')
+    chrome_options.add_argument('--disable-extensions')
+    chrome_options.add_argument('--disable-background-networking')
+    chrome_options.add_argument('--mute-audio')
+    if Config.HEADLESS['BLOCK_IMAGES']:
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+    chrome_options.page_load_strategy = Config.HEADLESS['PAGE_LOAD_STRATEGY']
+
+def _block_resources(driver):
+    """Bloqueia, pelo DevTools, os recursos que a automação não usa"""
+    if not Config.HEADLESS['BLOCKED_URLS']:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': Config.HEADLESS['BLOCKED_URLS']})
+    except Exception as e:
+        logger.warning(f"Não foi possível bloquear recursos no navegador: {str(e)}")
+
+def open_browser(worker_id=0, headless=None):
+    """Abre (ou reaproveita) um navegador e retorna ``(driver, reaproveitado)``
+
+    ``headless`` escolhe o modo sem janela desta sessão (None = configuração).
+    """
+    headless = headless_mode(headless)
+    service = Service(resolve_driver_path())
+    keep_alive = Config.SESSION['KEEP_ALIVE']
+    port = debug_port_for(worker_id)
+
+    # Reconecta a um navegador mantido aberto por uma execução anterior
+    if keep_alive and _debug_browser_running(port):
+        chrome_options = Options()
+        chrome_options.add_experimental_option('debuggerAddress', f'127.0.0.1:{port}')
+        try:
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+            logger.info(f"Reconectado ao navegador existente na porta {port}")
+            return driver, True
+        except Exception as e:
+            logger.warning(f"Não foi possível reconectar na porta {port}: {str(e)}")
+
+    chrome_options = _base_options(headless)
+    if keep_alive:
+        # Perfil persistente e porta de depuração permitem reaproveitar o navegador
+        chrome_options.add_argument(f'--user-data-dir={profile_dir_for(worker_id)}')
+        chrome_options.add_argument(f'--remote-debugging-port={port}')
+        chrome_options.add_experimental_option('detach', True)
+
+    try:
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except SessionNotCreatedException as e:
+        # Driver em cache incompatível com o Chrome instalado: resolve de novo e tenta uma vez
+        logger.warning(f"Chromedriver incompatível, resolvendo novamente: {e.msg}")
+        service = Service(resolve_driver_path(usar_cache=False))
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    if headless:
+        _block_resources(driver)
+        logger.info("Navegador iniciado no modo headless (carregamento leve)")
+    return driver, False
+
+def is_logged_in(driver, timeout=2):
+    """Verifica se a sessão do navegador está viva e logada no portal"""
+    try:
+        driver.switch_to.default_content()
+        WebDriverWait(driver, timeout).until(EC.any_of(*map(EC.presence_of_element_located, _MENU_LOGADO)))
+        return True
+    except Exception:
+        # Timeout (página de login) ou sessão do navegador encerrada
+        return False
+
+def release_browser(driver):
+    """Fecha o navegador, ou apenas desconecta quando a sessão deve ser mantida"""
+    if Config.SESSION['KEEP_ALIVE']:
+        # Encerra só o chromedriver; o Chrome continua aberto e logado
+        driver.service.stop()
+        logger.info("Navegador mantido aberto para a próxima execução")
+    else:
+        driver.quit()
+        logger.info("Driver do Chrome fechado")
@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+
+# Os módulos da automação ficam na raiz do repositório; o log dos testes vai
+# para uma pasta temporária (definido antes de importar config)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('NFE_LOG_DIR', tempfile.mkdtemp(prefix='nfe_testes_'))
+
+import random
+import pandas as pd
+import pytest
+from config import Config
+from mock_portal import MENSAGEM_REJEICAO, MENSAGEM_SUCESSO, MockPortal
+from pacing import pacer
+from retry import retry_stats
+
+_PESOS_DV1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+_PESOS_DV2 = [6] + _PESOS_DV1
+
+def _digito(digitos, pesos):
+    resto = sum(d * p for d, p in zip(digitos, pesos)) % 11
+    return 0 if resto < 2 else 11 - resto
+
+def _gerar_cnpjs(quantidade, seed=0):
+    rnd = random.Random(seed)
+    cnpjs = []
+    while len(cnpjs) < quantidade:
+        # Primeiro dígito diferente de zero: a planilha guarda o CNPJ como número
+        base = [rnd.randint(1, 9)] + [rnd.randint(0, 9) for _ in range(7)] + [0, 0, 0, 1]
+        base.append(_digito(base, _PESOS_DV1))
+        base.append(_digito(base, _PESOS_DV2))
+        cnpj = ''.join(map(str, base))
+        if cnpj not in cnpjs and len(set(cnpj)) > 1:
+            cnpjs.append(cnpj)
+    return cnpjs
+
+@pytest.fixture
+def gerar_cnpjs():
+    """Gera CNPJs válidos e distintos: ``gerar_cnpjs(quantidade, seed=0)``"""
+    return _gerar_cnpjs
+
+@pytest.fixture
+def planilha(tmp_path):
+    """Grava uma planilha de teste com ``linhas`` empresas e retorna o caminho"""
+    def gerar(linhas, nome='clientes.xlsx', seed=0):
+        path = str(tmp_path / nome)
+        pd.DataFrame({
+            'CNPJ': _gerar_cnpjs(linhas, seed),
+            'RAZAO SOCIAL': [f'EMPRESA TESTE {n + 1}' for n in range(linhas)],
+            'VALOR': [round(100 + n * 1.5, 2) for n in range(linhas)],
+        }).to_excel(path, index=False)
+        return path
+    return gerar
+
+@pytest.fixture
+def config(monkeypatch):
+    """Configuração isolada: credenciais de teste, gravação ligada e sem arquivos fora do tmp"""
+    pacer.reset()
+    retry_stats.reset()
+    monkeypatch.setattr(Config, 'USUARIO', 'teste')
+    monkeypatch.setattr(Config, 'SENHA', 'senha')
+    monkeypatch.setattr(Config, 'GRAVAR_NOTAS', True)
+    monkeypatch.setattr(Config, 'DUPLICADOS', 'sinalizar')
+    monkeypatch.setitem(Config.ADDRESS_CACHE, 'ENABLED', False)
+    monkeypatch.setitem(Config.METRICS, 'ENABLED', False)
+    monkeypatch.setitem(Config.RETRY, 'BACKOFF', 0)
+    monkeypatch.setitem(Config.ADAPTIVE, 'MAX_NOTAS_MIN', 0)
+    monkeypatch.setitem(Config.HTTP, 'SUCCESS_MARKER', MENSAGEM_SUCESSO)
+    monkeypatch.setitem(Config.HTTP, 'REJEICAO_MARKER', MENSAGEM_REJEICAO)
+    return Config
+
+@pytest.fixture
+def portal(config):
+    """Portal simulado em uma porta livre, sem atraso no preenchimento do tomador"""
+    with MockPortal(atraso_tomador=0.0, seed=0) as portal:
+        yield portal
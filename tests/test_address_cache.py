@@ -0,0 +1,80 @@
+import pytest
+import address_cache as cache_module
+from address_cache import AddressCache
+
+ENDERECO = {'RuaTomador': 'RUA A', 'NumeroTomador': '10', 'UFTomador': 'SP', 'BairroTomador': 'CENTRO',
+            'CEPTomador': '13280000', 'CidadeTomador': 'VINHEDO'}
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 1_000_000.0
+
+    def time(self):
+        return self.agora
+
+@pytest.fixture
+def relogio(config, monkeypatch):
+    monkeypatch.setitem(config.ADDRESS_CACHE, 'ENABLED', True)
+    relogio = _Relogio()
+    monkeypatch.setattr(cache_module.time, 'time', relogio.time)
+    return relogio
+
+def test_get_normaliza_o_cnpj_e_conta_acertos(relogio, tmp_path):
+    cache = AddressCache(str(tmp_path / 'cache.json'), ttl_days=1, max_entries=10)
+    assert cache.get('11222333000181') is None
+    cache.put('11.222.333/0001-81', ENDERECO)
+
+    endereco = cache.get('11222333000181')
+    assert endereco == ENDERECO and endereco is not ENDERECO
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_entrada_expira_apos_o_ttl(relogio, tmp_path):
+    cache = AddressCache(str(tmp_path / 'cache.json'), ttl_days=1, max_entries=10)
+    cache.put('1', ENDERECO)
+
+    relogio.agora += 86400
+    assert cache.get('1') == ENDERECO
+    relogio.agora += 1
+    assert cache.get('1') is None
+    # A entrada vencida é removida: um novo acerto exige outro put
+    relogio.agora -= 86401
+    assert cache.get('1') is None
+
+def test_descarta_as_menos_usadas_ao_exceder_o_limite(relogio, tmp_path):
+    cache = AddressCache(str(tmp_path / 'cache.json'), ttl_days=1, max_entries=2)
+    cache.put('1', ENDERECO)
+    relogio.agora += 1
+    cache.put('2', ENDERECO)
+    relogio.agora += 1
+    cache.get('1')
+    relogio.agora += 1
+    cache.put('3', ENDERECO)
+
+    assert cache.get('2') is None
+    assert cache.get('1') == cache.get('3') == ENDERECO
+
+def test_ignora_endereco_incompleto(relogio, tmp_path):
+    cache = AddressCache(str(tmp_path / 'cache.json'), ttl_days=1, max_entries=10)
+    cache.put('1', dict.fromkeys(ENDERECO, ''))
+    cache.put('2', dict(ENDERECO, CEPTomador=None))
+    assert cache.get('1') is None and cache.get('2') is None
+
+def test_save_persiste_e_invalidate_remove(relogio, tmp_path):
+    path = str(tmp_path / 'cache.json')
+    cache = AddressCache(path, ttl_days=1, max_entries=10)
+    cache.put('1', ENDERECO)
+    cache.put('2', ENDERECO)
+    cache.invalidate('2')
+    cache.save()
+
+    recarregado = AddressCache(path, ttl_days=1, max_entries=10)
+    assert recarregado.get('1') == ENDERECO
+    assert recarregado.get('2') is None
+    assert [p.name for p in tmp_path.iterdir()] == ['cache.json']
+
+def test_desligado_nao_guarda_nada(config, tmp_path):
+    cache = AddressCache(str(tmp_path / 'cache.json'), ttl_days=1, max_entries=10)
+    cache.put('1', ENDERECO)
+    assert cache.get('1') is None
+    cache.save()
+    assert not (tmp_path / 'cache.json').exists()
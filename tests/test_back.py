@@ -0,0 +1,133 @@
+import pandas as pd
+import pytest
+from selenium.common.exceptions import TimeoutException
+import back
+from control import mark_submitted
+from http_backend import NotaNaoConfirmada, NotaRejeitada
+from journal import StatusJournal
+from retry import NovaTentativa
+
+CNPJ_A = '11222333000181'
+CNPJ_B = '11444777000161'
+
+def _planilha(cnpjs, valores=None, status=None):
+    return pd.DataFrame({
+        'CNPJ': cnpjs,
+        'RAZAO SOCIAL': [f'EMPRESA {n}' for n in range(len(cnpjs))],
+        'VALOR': valores or [100.0] * len(cnpjs),
+        'STATUS': status or [''] * len(cnpjs),
+    })
+
+def test_agrupar_duplicados_sinalizar():
+    df = _planilha([CNPJ_A, CNPJ_B, '11.222.333/0001-81'])
+    emitir, marcadas = back.agrupar_duplicados(df, df, 'sinalizar')
+    assert list(emitir.index) == [0, 1]
+    assert marcadas == {2: back.STATUS_DUPLICADO.format(1)}
+
+def test_agrupar_duplicados_somar():
+    df = _planilha([CNPJ_A, CNPJ_B, CNPJ_A], valores=[100.0, 50.0, 25.5])
+    emitir, marcadas = back.agrupar_duplicados(df, df, 'somar')
+    assert list(emitir['VALOR']) == [125.5, 50.0]
+    assert marcadas == {2: back.STATUS_AGRUPADO.format(1)}
+
+def test_agrupar_duplicados_emitir():
+    df = _planilha([CNPJ_A, CNPJ_A])
+    emitir, marcadas = back.agrupar_duplicados(df, df, 'emitir')
+    assert list(emitir.index) == [0, 1] and marcadas == {}
+
+def test_agrupar_duplicados_usa_a_planilha_inteira_ao_retomar():
+    # A primeira ocorrência já foi emitida: a repetição não pode ser emitida na nova execução
+    df = _planilha([CNPJ_A, CNPJ_B, CNPJ_A], status=[back.STATUS_EMITIDA, '', ''])
+    emitir, marcadas = back.agrupar_duplicados(df, df.iloc[1:], 'sinalizar')
+    assert list(emitir.index) == [1]
+    assert marcadas == {2: back.STATUS_DUPLICADO.format(1)}
+
+def test_selecionar_pendentes_retomar(tmp_path):
+    excel = str(tmp_path / 'clientes.xlsx')
+    df = _planilha([CNPJ_A, CNPJ_B, '3', '4', '5'],
+                   status=[back.STATUS_EMITIDA, back.STATUS_VERIFICAR.format('timeout'), back.STATUS_SIMULADA, '',
+                           back.STATUS_EMITIDA])
+    df['COMPETENCIA'] = ['02/2025', '02/2025', '02/2025', '', '01/2025']
+    with StatusJournal(excel, '01/2025') as journal:
+        journal.record(3, '4', back.STATUS_EMITIDA)
+        journal.record(2, '3', back.STATUS_EMITIDA)
+    with StatusJournal(excel, '02/2025') as journal:
+        journal.record(3, '4', 'Erro: x')
+
+    pendentes = back.selecionar_pendentes(df, excel, 'retomar', '02/2025')
+
+    # Simulada, o erro da competência atual e a nota emitida em 01/2025 voltam a ser processados;
+    # o diário de 01/2025 é ignorado
+    assert list(pendentes.index) == [2, 3, 4]
+    assert df.at[3, 'COMPETENCIA'] == '02/2025'
+
+def test_selecionar_pendentes_ignora_status_sem_competencia(tmp_path):
+    # Planilha de uma versão anterior: o STATUS não diz de qual competência é
+    df = _planilha([CNPJ_A, CNPJ_B], status=[back.STATUS_EMITIDA, 'Erro: x'])
+    excel = str(tmp_path / 'clientes.xlsx')
+    assert list(back.selecionar_pendentes(df, excel, 'retomar', '01/2025').index) == [0, 1]
+    assert back.selecionar_pendentes(df, excel, 'erros', '01/2025').empty
+
+def test_selecionar_pendentes_erros(tmp_path):
+    df = _planilha([CNPJ_A, CNPJ_B], status=['Erro: x', back.STATUS_EMITIDA])
+    df['COMPETENCIA'] = '01/2025'
+    pendentes = back.selecionar_pendentes(df, str(tmp_path / 'clientes.xlsx'), 'erros', '01/2025')
+    assert list(pendentes.index) == [0]
+
+class _Backend:
+    """Backend falso: ``emitir`` executa a ação configurada"""
+
+    nome = 'falso'
+
+    def __init__(self, acao=None):
+        self.acao = acao
+        self.notas = []
+
+    def emitir(self, nota):
+        self.notas.append(nota)
+        if self.acao:
+            self.acao()
+
+    def close(self):
+        pass
+
+def _timeout_apos_envio():
+    mark_submitted()
+    raise TimeoutException('resultado não carregou')
+
+def test_processar_empresa_emitida(config):
+    backend = _Backend()
+    status = back.processar_empresa(backend, CNPJ_A, 'EMPRESA', 10, '01/2025')
+    assert status == back.STATUS_EMITIDA
+    assert backend.notas[0]['form:valor'] == '10.00'
+
+def test_processar_empresa_sem_gravar_e_simulada(config, monkeypatch):
+    monkeypatch.setattr(config, 'GRAVAR_NOTAS', False)
+    assert back.processar_empresa(_Backend(), CNPJ_A, 'EMPRESA', 10, '01/2025') == back.STATUS_SIMULADA
+
+def test_processar_empresa_timeout_antes_do_envio_e_repetido(config):
+    def timeout():
+        raise TimeoutException('campo não apareceu')
+
+    with pytest.raises(NovaTentativa):
+        back.processar_empresa(_Backend(timeout), CNPJ_A, 'EMPRESA', 10, '01/2025')
+
+def test_processar_empresa_falha_apos_o_envio_nunca_e_repetida(config):
+    status = back.processar_empresa(_Backend(_timeout_apos_envio), CNPJ_A, 'EMPRESA', 10, '01/2025')
+    assert status.startswith(back.STATUS_VERIFICAR.format(''))
+
+def test_processar_empresa_recusa_explicita_vira_erro(config):
+    def rejeitar():
+        mark_submitted()
+        raise NotaRejeitada('Portal recusou a gravação da nota')
+
+    status = back.processar_empresa(_Backend(rejeitar), CNPJ_A, 'EMPRESA', 10, '01/2025')
+    assert status.startswith('Erro:')
+
+def test_processar_empresa_sem_confirmacao_fica_a_verificar(config):
+    def sem_confirmacao():
+        mark_submitted()
+        raise NotaNaoConfirmada('Portal não confirmou a gravação da nota')
+
+    status = back.processar_empresa(_Backend(sem_confirmacao), CNPJ_A, 'EMPRESA', 10, '01/2025')
+    assert status.startswith(back.STATUS_VERIFICAR.format(''))
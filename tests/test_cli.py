@@ -0,0 +1,67 @@
+import json
+import os
+import pytest
+import cli
+from mock_portal import MockPortal
+
+@pytest.fixture
+def portal_http(config, portal, monkeypatch):
+    """Lote emitido pelo backend HTTP contra o portal simulado"""
+    monkeypatch.setattr(config, 'BACKEND', 'http')
+    monkeypatch.setattr(config, 'URL_LOGIN', portal.url)
+    return portal
+
+def test_expandir_arquivos_pastas_padroes_e_repeticoes(tmp_path):
+    pasta = tmp_path / 'clientes'
+    pasta.mkdir()
+    for nome in ('b.xlsx', 'a.xls', '~$a.xlsx', 'notas.txt'):
+        (pasta / nome).touch()
+    avulsa = tmp_path / 'avulsa.xlsx'
+    avulsa.touch()
+
+    arquivos = cli.expandir_arquivos([str(pasta), str(pasta / '*.xlsx'), str(avulsa), str(pasta / 'b.xlsx')])
+
+    assert arquivos == [str(pasta / 'a.xls'), str(pasta / 'b.xlsx'), str(avulsa)]
+    assert all(os.path.isabs(arquivo) for arquivo in arquivos)
+
+def test_main_sem_planilhas_sai_com_falha(config, tmp_path, capsys):
+    assert cli.main([str(tmp_path), '-c', '01/2025']) == cli.SAIDA_FALHA
+    assert json.loads(capsys.readouterr().out)['planilhas'] == []
+
+def test_main_emite_o_lote_reaproveitando_a_sessao(portal_http, planilha, tmp_path, capsys):
+    primeira = planilha(2, 'a.xlsx')
+    segunda = planilha(3, 'b.xlsx', seed=1)
+    resumo_path = tmp_path / 'resumo.json'
+
+    codigo = cli.main([str(tmp_path), '-c', '01/2025', '-w', '1', '--resumo', str(resumo_path)])
+
+    assert codigo == cli.SAIDA_OK
+    resumo = json.loads(capsys.readouterr().out)
+    assert json.loads(resumo_path.read_text(encoding='utf-8')) == resumo
+    assert [(item['arquivo'], item['emitidas']) for item in resumo['planilhas']] == [(primeira, 2), (segunda, 3)]
+    assert portal_http.stats()['logins'] == 1 and len(portal_http.notas) == 5
+
+def test_main_com_notas_recusadas_sai_com_erros(config, planilha, monkeypatch, capsys):
+    excel = planilha(2)
+    with MockPortal(atraso_tomador=0.0, falha_gravar=1.0) as portal:
+        monkeypatch.setattr(config, 'BACKEND', 'http')
+        monkeypatch.setattr(config, 'URL_LOGIN', portal.url)
+        codigo = cli.main([excel, '-c', '01/2025', '-w', '1'])
+
+    assert codigo == cli.SAIDA_ERROS_NAS_NOTAS
+    item, = json.loads(capsys.readouterr().out)['planilhas']
+    assert (item['situacao'], item['erros']) == ('erros', 2)
+
+def test_main_planilha_invalida_sai_com_falha_e_segue_o_lote(portal_http, planilha, tmp_path, capsys):
+    (tmp_path / 'a_invalida.xlsx').write_bytes(b'nao e um excel')
+    planilha(1, 'b.xlsx')
+
+    assert cli.main([str(tmp_path), '-c', '01/2025', '-w', '1']) == cli.SAIDA_FALHA
+    situacoes = [item['situacao'] for item in json.loads(capsys.readouterr().out)['planilhas']]
+    assert situacoes == ['falha', 'ok']
+
+def test_main_dry_run_nao_grava(portal_http, planilha, capsys):
+    excel = planilha(2)
+    assert cli.main([excel, '-c', '01/2025', '-w', '1', '--dry-run']) == cli.SAIDA_OK
+    assert json.loads(capsys.readouterr().out)['planilhas'][0]['simuladas'] == 2
+    assert portal_http.notas == []
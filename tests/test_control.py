@@ -0,0 +1,86 @@
+import threading
+import pytest
+from control import (AutomationCancelled, RunControl, bind, checkpoint, mark_submitted, shielded,
+                     was_submitted)
+
+@pytest.fixture
+def control(config, monkeypatch):
+    monkeypatch.setitem(config.CONTROL, 'KEEPALIVE', 0.01)
+    control = RunControl()
+    bind(control)
+    yield control
+    bind(None)
+
+def test_pausa_bloqueia_e_mantem_a_sessao_ate_retomar(control):
+    keepalives = threading.Event()
+    liberada = threading.Event()
+
+    def aguardar():
+        control.wait_if_paused(keepalives.set)
+        liberada.set()
+
+    control.pause()
+    assert control.paused
+    thread = threading.Thread(target=aguardar)
+    thread.start()
+
+    assert keepalives.wait(1)
+    assert not liberada.is_set()
+    control.resume()
+    thread.join(1)
+    assert liberada.is_set() and not control.paused
+
+def test_erro_no_keepalive_nao_interrompe_a_pausa(control):
+    chamadas = []
+
+    def keepalive():
+        chamadas.append(1)
+        if len(chamadas) == 3:
+            control.resume()
+        raise ConnectionError('portal fora do ar')
+
+    control.pause()
+    control.wait_if_paused(keepalive)
+    assert len(chamadas) == 3
+
+def test_cancelar_libera_a_pausa_e_levanta_nos_pontos_de_verificacao(control):
+    erros = []
+
+    def aguardar():
+        try:
+            control.wait_if_paused()
+        except AutomationCancelled as e:
+            erros.append(e)
+
+    control.pause()
+    thread = threading.Thread(target=aguardar)
+    thread.start()
+    control.cancel()
+    thread.join(1)
+
+    assert len(erros) == 1 and control.cancelled
+    with pytest.raises(AutomationCancelled):
+        checkpoint()
+
+def test_shielded_adia_o_cancelamento_ate_o_fim_do_bloco(control):
+    control.cancel()
+    with shielded():
+        checkpoint()
+        with shielded():
+            checkpoint()
+        # O bloco externo continua protegido depois do interno
+        checkpoint()
+    with pytest.raises(AutomationCancelled):
+        checkpoint()
+
+def test_checkpoint_sem_controle_e_envio_por_thread(config):
+    bind(None)
+    checkpoint()
+
+    mark_submitted()
+    outra = []
+    thread = threading.Thread(target=lambda: outra.append(was_submitted()))
+    thread.start()
+    thread.join()
+    assert was_submitted() and outra == [False]
+    mark_submitted(False)
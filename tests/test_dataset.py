@@ -0,0 +1,77 @@
+import os
+import pandas as pd
+import pytest
+import dataset as dataset_module
+from dataset import Dataset
+from journal import write_excel_atomic
+from validators import ValidationError
+
+@pytest.fixture
+def leituras(monkeypatch):
+    """Conta as leituras do arquivo feitas pelo Dataset"""
+    contagem = []
+    ler = dataset_module.validate_excel_file
+
+    def contar(path):
+        contagem.append(path)
+        return ler(path)
+
+    monkeypatch.setattr(dataset_module, 'validate_excel_file', contar)
+    return contagem
+
+def _tocar(path, segundos):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + segundos * 10**9))
+
+def test_planilha_so_e_relida_quando_muda_em_disco(config, planilha, leituras):
+    excel = planilha(3)
+    dataset = Dataset(excel)
+    assert len(dataset.validated_df()) == 3
+    dataset.ensure_loaded()
+    assert len(leituras) == 1 and not dataset.is_stale()
+
+    pd.read_excel(excel).head(2).to_excel(excel, index=False)
+    _tocar(excel, 1)
+    assert dataset.is_stale()
+    assert len(dataset.validated_df()) == 2
+    assert len(leituras) == 2
+
+def test_mark_saved_evita_reler_a_gravacao_da_propria_automacao(config, planilha, leituras):
+    excel = planilha(2)
+    dataset = Dataset(excel).load()
+    df = dataset.df
+    df['STATUS'] = 'Nota Emitida'
+    write_excel_atomic(df, excel)
+    assert dataset.is_stale()
+
+    dataset.mark_saved()
+    assert dataset.validated_df() is df
+    assert len(leituras) == 1
+
+def test_hash_detecta_conteudo_alterado_com_mesma_data_e_tamanho(config, planilha, monkeypatch):
+    monkeypatch.setitem(config.DATASET, 'HASH', True)
+    excel = planilha(2)
+    dataset = Dataset(excel).load()
+    stat = os.stat(excel)
+    with open(excel, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        ultimo = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([ultimo[0] ^ 1]))
+    os.utime(excel, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert dataset.is_stale()
+
+def test_arquivo_removido_fica_desatualizado(config, planilha):
+    excel = planilha(1)
+    dataset = Dataset(excel).load()
+    os.remove(excel)
+    assert dataset.is_stale()
+
+def test_erro_de_conteudo_fica_disponivel_para_a_pre_visualizacao(config, tmp_path):
+    excel = str(tmp_path / 'clientes.xlsx')
+    pd.DataFrame({'CNPJ': ['123'], 'RAZAO SOCIAL': ['A'], 'VALOR': [1.0]}).to_excel(excel, index=False)
+
+    dataset = Dataset(excel).load()
+    assert isinstance(dataset.error, ValidationError) and len(dataset.df) == 1
+    with pytest.raises(ValidationError):
+        dataset.validated_df()
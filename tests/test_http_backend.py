@@ -0,0 +1,153 @@
+import time
+import pandas as pd
+import pytest
+import back
+from http_backend import (HttpBackend, HttpBackendError, HttpSessionExpired, NotaNaoConfirmada, NotaRejeitada,
+                          conferir_gravacao)
+import locators
+from locators import CAMPOS_ENDERECO, element_id
+from mock_portal import MENSAGEM_REJEICAO, MENSAGEM_SUCESSO, MockPortal, endereco_simulado
+
+CNPJ = '11222333000181'
+
+@pytest.fixture
+def backend(portal):
+    backend = HttpBackend(CAMPOS_ENDERECO, portal.url).login()
+    yield backend
+    backend.close()
+
+def _executar(portal, excel, modo='todos', competencia='01/2025'):
+    sessao = HttpBackend(CAMPOS_ENDERECO, portal.url).login()
+    try:
+        return back.run_automation(excel, competencia, None, None, 1, modo, backend=sessao)
+    finally:
+        sessao.close()
+
+def test_login_confere_menu_e_formulario(portal, backend):
+    assert portal.stats()['logins'] == 1
+    assert backend.nome == 'http'
+
+def test_login_falha_com_endereco_do_formulario_errado(portal, config, monkeypatch):
+    # Página existente, mas sem o formulário da nota: o backend não pode ser usado
+    monkeypatch.setitem(config.HTTP, 'FORM_PATH', '/principal')
+    with pytest.raises(HttpBackendError):
+        HttpBackend(CAMPOS_ENDERECO, portal.url).login()
+
+def test_emitir_envia_formulario_com_endereco_do_tomador(portal, backend):
+    backend.emitir(back.montar_nota(CNPJ, 150, '01/2025'))
+
+    assert len(portal.notas) == 1
+    nota = portal.notas[0]
+    endereco = endereco_simulado(CNPJ)
+    assert nota['Documento'] == CNPJ
+    assert nota['Valor'] == '150.00'
+    assert nota['RuaServico'] == nota['RuaTomador'] == endereco['RuaTomador']
+    assert nota['CidadeServico'] == endereco['CidadeTomador']
+
+def test_campos_enviados_vem_do_registro_de_elementos(portal, backend, monkeypatch):
+    # Portal com outro id no campo da descrição: basta atualizar o registro
+    assert element_id('form:descricao') == 'descricao'
+    monkeypatch.setitem(locators.LOCATORS, 'form:descricao', (('id', 'Discriminacao'),))
+    backend.emitir(back.montar_nota(CNPJ, 150, '01/2025'))
+    assert portal.notas[0]['Discriminacao'].startswith('REFERENTE')
+    with pytest.raises(KeyError):
+        element_id('menu:lancamento')
+
+def test_emitir_sem_gravar_nao_envia(portal, backend, config, monkeypatch):
+    monkeypatch.setattr(config, 'GRAVAR_NOTAS', False)
+    backend.emitir(back.montar_nota(CNPJ, 150, '01/2025'))
+    assert portal.notas == []
+
+def test_emitir_recusada_levanta_nota_rejeitada(config):
+    with MockPortal(atraso_tomador=0.0, falha_gravar=1.0) as portal:
+        backend = HttpBackend(CAMPOS_ENDERECO, portal.url).login()
+        with pytest.raises(NotaRejeitada):
+            backend.emitir(back.montar_nota(CNPJ, 150, '01/2025'))
+        assert portal.stats()['rejeicoes'] == 1
+
+def test_conferir_gravacao(config, monkeypatch):
+    conferir_gravacao(f'<p>{MENSAGEM_SUCESSO}</p>')
+    with pytest.raises(NotaRejeitada):
+        conferir_gravacao(MENSAGEM_REJEICAO)
+    with pytest.raises(NotaNaoConfirmada):
+        conferir_gravacao('<p>Página inesperada</p>')
+
+    # Sem texto de recusa configurado nada é tratado como recusa
+    monkeypatch.setitem(config.HTTP, 'REJEICAO_MARKER', '')
+    with pytest.raises(NotaNaoConfirmada):
+        conferir_gravacao(MENSAGEM_REJEICAO)
+
+def test_erro_5xx_apos_o_envio_fica_a_verificar_e_nao_e_reenviado(config, planilha):
+    excel = planilha(2)
+    with MockPortal(atraso_tomador=0.0, falha_resposta=1.0) as portal:
+        df = _executar(portal, excel)
+        assert all(status.startswith(back.STATUS_VERIFICAR.format('')) for status in df['STATUS'])
+        assert len(portal.notas) == 2
+
+        # Nem o modo 'erros' nem o 'retomar' enviam a nota de novo
+        _executar(portal, excel, 'erros')
+        _executar(portal, excel, 'retomar')
+        assert len(portal.notas) == 2
+
+def test_sessao_expirada_e_reconectar(config):
+    with MockPortal(atraso_tomador=0.0, expirar_apos=1) as portal:
+        backend = HttpBackend(CAMPOS_ENDERECO, portal.url).login()
+        backend.emitir(back.montar_nota(CNPJ, 1, '01/2025'))
+        with pytest.raises(HttpSessionExpired):
+            backend.emitir(back.montar_nota(CNPJ, 2, '01/2025'))
+        backend.reconectar()
+        backend.emitir(back.montar_nota(CNPJ, 3, '01/2025'))
+        assert [nota['Valor'] for nota in portal.notas] == ['1.00', '3.00']
+
+def test_run_automation_emite_a_planilha_e_retoma_sem_repetir(portal, planilha):
+    excel = planilha(5)
+
+    df = _executar(portal, excel)
+
+    assert list(df['STATUS']) == [back.STATUS_EMITIDA] * 5
+    assert list(pd.read_excel(excel)['STATUS']) == [back.STATUS_EMITIDA] * 5
+    assert len(portal.notas) == 5
+
+    _executar(portal, excel, 'retomar')
+    assert len(portal.notas) == 5
+
+    # Na competência seguinte as notas do mês anterior não contam como emitidas
+    _executar(portal, excel, 'retomar', '02/2025')
+    assert len(portal.notas) == 10
+    assert set(pd.read_excel(excel)['COMPETENCIA']) == {'02/2025'}
+
+def test_run_automation_simulada_nao_conta_como_emitida(portal, planilha, config, monkeypatch):
+    excel = planilha(3)
+    monkeypatch.setattr(config, 'GRAVAR_NOTAS', False)
+
+    df = _executar(portal, excel)
+    assert list(df['STATUS']) == [back.STATUS_SIMULADA] * 3
+    assert portal.notas == []
+
+    monkeypatch.setattr(config, 'GRAVAR_NOTAS', True)
+    df = _executar(portal, excel, 'retomar')
+    assert list(df['STATUS']) == [back.STATUS_EMITIDA] * 3
+    assert len(portal.notas) == 3
+
+def test_timeout_apos_o_envio_nao_duplica_a_nota(portal, planilha, config, monkeypatch):
+    excel = planilha(3)
+    monkeypatch.setitem(config.HTTP, 'TIMEOUT', 1)
+
+    gravar = portal._gravar
+
+    def gravar_lento(token, campos):
+        # A segunda nota é gravada, mas a resposta chega depois do timeout
+        resultado = gravar(token, campos)
+        if len(portal.notas) == 2:
+            time.sleep(2)
+        return resultado
+
+    monkeypatch.setattr(portal, '_gravar', gravar_lento)
+
+    df = _executar(portal, excel)
+
+    status = list(df['STATUS'])
+    assert status[0] == status[2] == back.STATUS_EMITIDA
+    assert status[1].startswith(back.STATUS_VERIFICAR.format(''))
+    assert len(portal.notas) == 3
+    assert len({nota['Documento'] for nota in portal.notas}) == 3
@@ -0,0 +1,60 @@
+import pandas as pd
+from journal import StatusJournal, journal_path_for, write_excel_atomic
+
+def _planilha():
+    return pd.DataFrame({'CNPJ': ['111', '222', '333'], 'STATUS': ['', '', '']})
+
+def test_record_e_load_prevalece_o_ultimo_registro(tmp_path):
+    excel = str(tmp_path / 'clientes.xlsx')
+    with StatusJournal(excel, '01/2025') as journal:
+        journal.record(0, '111', 'Erro: timeout')
+        journal.record(0, '111', 'Nota Emitida')
+        journal.record(1, '222', 'Erro: portal')
+
+    assert journal.path == journal_path_for(excel) == str(tmp_path / 'clientes_status.jsonl')
+    assert StatusJournal(excel, '01/2025').load() == {0: ('111', 'Nota Emitida'), 1: ('222', 'Erro: portal')}
+
+def test_load_ignora_linha_truncada(tmp_path):
+    excel = str(tmp_path / 'clientes.xlsx')
+    with StatusJournal(excel, '01/2025') as journal:
+        journal.record(0, '111', 'Nota Emitida')
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"ts": "2025-01-01T00:00:00", "row": 1, "cn')
+
+    assert StatusJournal(excel, '01/2025').load() == {0: ('111', 'Nota Emitida')}
+
+def test_apply_so_usa_registros_da_mesma_competencia(tmp_path):
+    excel = str(tmp_path / 'clientes.xlsx')
+    with StatusJournal(excel, '01/2025') as journal:
+        journal.record(0, '111', 'Nota Emitida')
+    with StatusJournal(excel, '02/2025') as journal:
+        journal.record(1, '222', 'Nota Emitida')
+
+    df = _planilha()
+    assert StatusJournal(excel, '02/2025').apply(df) == 1
+    assert list(df['STATUS']) == ['', 'Nota Emitida', '']
+
+    df = _planilha()
+    assert StatusJournal(excel, '03/2025').apply(df) == 0
+    assert list(df['STATUS']) == ['', '', '']
+
+def test_apply_ignora_linha_com_cnpj_alterado(tmp_path):
+    excel = str(tmp_path / 'clientes.xlsx')
+    with StatusJournal(excel, '01/2025') as journal:
+        journal.record(0, '999', 'Nota Emitida')
+        journal.record(2, '333', 'Nota Emitida')
+
+    df = _planilha()
+    assert StatusJournal(excel, '01/2025').apply(df) == 1
+    assert list(df['STATUS']) == ['', '', 'Nota Emitida']
+
+def test_write_excel_atomic_substitui_a_planilha(tmp_path):
+    excel = tmp_path / 'clientes.xlsx'
+    _planilha().to_excel(excel, index=False)
+    df = _planilha()
+    df['STATUS'] = ['Nota Emitida', '', 'Erro: x']
+
+    write_excel_atomic(df, str(excel))
+
+    assert list(pd.read_excel(excel)['STATUS'].fillna('')) == ['Nota Emitida', '', 'Erro: x']
+    assert [p.name for p in tmp_path.iterdir()] == ['clientes.xlsx']
@@ -0,0 +1,52 @@
+import json
+import logging
+import pytest
+import logger_config
+
+@pytest.fixture
+def logger_assincrono(config, tmp_path, monkeypatch):
+    """Logger próprio no modo assíncrono, sem encerrar os listeners dos outros módulos"""
+    monkeypatch.setattr(logger_config, '_listeners', [])
+    monkeypatch.setitem(config.LOGGING, 'async', True)
+    monkeypatch.setitem(config.LOGGING, 'dir', str(tmp_path))
+    monkeypatch.setitem(config.LOGGING, 'file', 'teste.log')
+    monkeypatch.setitem(config.LOGGING, 'rotation', 'nenhuma')
+    logger = logger_config.setup_logger('nfe_teste_fila')
+    yield logger
+    logger_config.stop_logging()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+def test_stop_logging_descarrega_a_fila_e_fecha_os_arquivos(logger_assincrono, tmp_path, monkeypatch):
+    assert isinstance(logger_assincrono.handlers[0], logging.handlers.QueueHandler)
+    listener, = logger_config._listeners
+    for n in range(200):
+        logger_assincrono.info(f"registro {n}")
+
+    logger_config.stop_logging()
+
+    linhas = (tmp_path / 'teste.log').read_text(encoding='utf-8').splitlines()
+    assert len(linhas) == 200 and linhas[-1].endswith('registro 199')
+    assert logger_config._listeners == []
+    arquivo = next(h for h in listener.handlers if isinstance(h, logging.FileHandler))
+    assert arquivo.stream is None
+    # Chamado de novo (ex.: pelo atexit) não falha
+    logger_config.stop_logging()
+
+def test_formato_json_um_objeto_por_linha(config, tmp_path, monkeypatch):
+    monkeypatch.setattr(logger_config, '_listeners', [])
+    monkeypatch.setitem(config.LOGGING, 'async', False)
+    monkeypatch.setitem(config.LOGGING, 'json', True)
+    monkeypatch.setitem(config.LOGGING, 'dir', str(tmp_path))
+    monkeypatch.setitem(config.LOGGING, 'file', 'teste.log')
+    monkeypatch.setitem(config.LOGGING, 'rotation', 'nenhuma')
+    logger = logger_config.setup_logger('nfe_teste_json')
+    try:
+        logger.warning("Nota com 'aspas' e acentuação")
+    finally:
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+
+    entrada = json.loads((tmp_path / 'teste.log').read_text(encoding='utf-8'))
+    assert (entrada['level'], entrada['message']) == ('WARNING', "Nota com 'aspas' e acentuação")
@@ -0,0 +1,29 @@
+import pytest
+from config import Config
+from pacing import AdaptivePacer
+
+@pytest.fixture
+def pacer(monkeypatch):
+    monkeypatch.setitem(Config.ADAPTIVE, 'ENABLED', True)
+    pacer = AdaptivePacer()
+    for _ in range(Config.ADAPTIVE['MIN_AMOSTRAS']):
+        for etapa in ('form:documento', 'http:gravar', 'form:resultado'):
+            pacer.observar(etapa, 0.01)
+    return pacer
+
+def test_timeout_padrao_sem_amostras():
+    assert AdaptivePacer().timeout('form:documento', 15) == 15
+
+def test_timeout_ajustado_nunca_abaixo_de_uma_fracao_do_padrao(pacer):
+    assert pacer.timeout('form:documento', 15) == max(Config.ADAPTIVE['TIMEOUT_MIN'],
+                                                      15 * Config.ADAPTIVE['TIMEOUT_MIN_FATOR'])
+    assert pacer.timeout('form:documento', 180) == 180 * Config.ADAPTIVE['TIMEOUT_MIN_FATOR']
+
+def test_etapas_apos_o_envio_mantem_o_timeout_padrao(pacer):
+    assert pacer.timeout('http:gravar', 30) == 30
+    assert pacer.timeout('form:resultado', 180) == 180
+
+def test_reset_descarta_o_perfil_de_latencia(pacer):
+    pacer.reset()
+    assert pacer.timeout('form:documento', 15) == 15
+    assert pacer.summary()['etapas'] == {}
@@ -0,0 +1,79 @@
+import threading
+import pytest
+from config import Config
+from pipeline import NotePipeline
+
+@pytest.fixture(params=[True, False], ids=['pipeline', 'sequencial'])
+def modo(request, monkeypatch):
+    monkeypatch.setitem(Config.PIPELINE, 'ENABLED', request.param)
+    return request.param
+
+def test_processa_todos_os_itens_em_ordem(modo):
+    finalizados = []
+    pipeline = NotePipeline(
+        prepare=lambda item: item * 10,
+        submit=lambda item, payload: payload + 1,
+        finalize=lambda item, resultado: finalizados.append((item, resultado)),
+        queue_size=2,
+    )
+    pipeline.run(range(6))
+    assert finalizados == [(n, n * 10 + 1) for n in range(6)]
+
+def test_envio_roda_na_thread_atual(modo):
+    threads = set()
+
+    def submit(item, payload):
+        threads.add(threading.current_thread())
+        return payload
+
+    NotePipeline(lambda item: item, submit, lambda item, resultado: None).run([1, 2, 3])
+    assert threads == {threading.current_thread()}
+
+def test_erro_no_preparo_e_repassado_ao_envio(modo):
+    recebidos = []
+
+    def prepare(item):
+        if item == 2:
+            raise ValueError('linha inválida')
+        return item
+
+    def submit(item, payload):
+        recebidos.append((item, type(payload).__name__))
+        return None
+
+    NotePipeline(prepare, submit, lambda item, resultado: None).run([1, 2, 3])
+    assert recebidos == [(1, 'int'), (2, 'ValueError'), (3, 'int')]
+
+def test_extra_processa_itens_ate_retornar_none(modo):
+    extras = [5, 4]
+    finalizados = []
+    pipeline = NotePipeline(lambda item: item, lambda item, payload: payload,
+                            lambda item, resultado: finalizados.append(item))
+    pipeline.run([1, 2], extra=lambda: extras.pop() if extras else None)
+    assert finalizados == [1, 2, 4, 5]
+
+def test_itens_enviados_sao_finalizados_mesmo_com_falha_no_envio():
+    finalizados = []
+
+    def submit(item, payload):
+        if item == 3:
+            raise RuntimeError('navegador fechado')
+        return payload
+
+    pipeline = NotePipeline(lambda item: item, submit, lambda item, resultado: finalizados.append(item))
+    with pytest.raises(RuntimeError):
+        pipeline.run(range(1, 6))
+    assert finalizados == [1, 2]
+
+def test_erro_na_finalizacao_e_levantado_ao_final(monkeypatch):
+    monkeypatch.setitem(Config.PIPELINE, 'ENABLED', True)
+    finalizados = []
+
+    def finalize(item, resultado):
+        if item == 1:
+            raise OSError('disco cheio')
+        finalizados.append(item)
+
+    with pytest.raises(OSError):
+        NotePipeline(lambda item: item, lambda item, payload: payload, finalize).run([1, 2, 3])
+    assert finalizados == [2, 3]
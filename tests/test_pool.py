@@ -0,0 +1,102 @@
+import threading
+import back
+from control import RunControl
+from http_backend import HttpBackend
+from locators import CAMPOS_ENDERECO
+from pool import EmissionPool
+from retry import FALHA_TIMEOUT, NovaTentativa
+
+def _sessoes(portal, abertas):
+    def abrir(worker_id):
+        abertas.append(worker_id)
+        return HttpBackend(CAMPOS_ENDERECO, portal.url).login()
+    return abrir
+
+def _processar(backend, cnpj, razao, valor, tentativa):
+    return back.processar_empresa(backend, cnpj, razao, valor, '01/2025', tentativa)
+
+def test_pool_emite_cada_linha_uma_vez_com_varias_sessoes(portal, gerar_cnpjs):
+    cnpjs = gerar_cnpjs(6)
+    linhas = [(n, cnpj, f'EMPRESA {n}', 10 + n) for n, cnpj in enumerate(cnpjs)]
+    abertas, registrados = [], []
+
+    resultados = EmissionPool(_sessoes(portal, abertas), _processar, workers=3,
+                              on_result=lambda index, status: registrados.append(index)).run(linhas)
+
+    assert resultados == {n: back.STATUS_EMITIDA for n in range(6)}
+    assert sorted(registrados) == list(range(6))
+    assert sorted(abertas) == [1, 2, 3] and portal.stats()['logins'] == 3
+    assert sorted(nota['Documento'] for nota in portal.notas) == sorted(cnpjs)
+
+def test_pool_repete_falha_recuperavel_ao_final(config, monkeypatch):
+    monkeypatch.setitem(config.RETRY, 'MAX_TENTATIVAS', 2)
+    tentativas = []
+
+    def processar(backend, cnpj, razao, valor, tentativa):
+        tentativas.append((cnpj, tentativa))
+        if cnpj == 'a' and tentativa == 1:
+            raise NovaTentativa(FALHA_TIMEOUT, TimeoutError('lento'))
+        return back.STATUS_EMITIDA
+
+    resultados = EmissionPool(lambda worker_id: _Backend(), processar, workers=1).run(
+        [(0, 'a', 'A', 1), (1, 'b', 'B', 1)])
+
+    assert resultados == {0: back.STATUS_EMITIDA, 1: back.STATUS_EMITIDA}
+    assert tentativas == [('a', 1), ('b', 1), ('a', 2)]
+
+def test_pool_falha_inesperada_fica_na_linha_e_o_worker_continua(config):
+    def processar(backend, cnpj, razao, valor, tentativa):
+        if cnpj == 'a':
+            raise KeyError('campo')
+        return back.STATUS_EMITIDA
+
+    def registrar(index, status):
+        if index == 1:
+            raise OSError('disco cheio')
+
+    resultados = EmissionPool(lambda worker_id: _Backend(), processar, workers=1, on_result=registrar).run(
+        [(0, 'a', 'A', 1), (1, 'b', 'B', 1), (2, 'c', 'C', 1)])
+
+    assert resultados == {0: "Erro: 'campo'", 1: back.STATUS_EMITIDA, 2: back.STATUS_EMITIDA}
+
+def test_pool_sem_sessao_marca_as_linhas_com_erro(config):
+    def falhar(worker_id):
+        raise ConnectionError('portal fora do ar')
+
+    resultados = EmissionPool(falhar, _processar, workers=2).run([(0, 'a', 'A', 1), (1, 'b', 'B', 1)])
+    assert resultados == {0: 'Erro: nenhuma sessão disponível', 1: 'Erro: nenhuma sessão disponível'}
+
+def test_pool_cancelado_nao_processa_o_restante(config):
+    control = RunControl()
+    processadas = []
+
+    def processar(backend, cnpj, razao, valor, tentativa):
+        processadas.append(cnpj)
+        control.cancel()
+        return back.STATUS_EMITIDA
+
+    backend = _Backend()
+    resultados = EmissionPool(lambda worker_id: backend, processar, workers=1, control=control).run(
+        [(0, 'a', 'A', 1), (1, 'b', 'B', 1), (2, 'c', 'C', 1)])
+
+    assert processadas == ['a'] and resultados == {0: back.STATUS_EMITIDA}
+    assert backend.fechado.is_set()
+
+def test_run_automation_com_workers_usa_o_pool(portal, planilha):
+    excel = planilha(4)
+    abertas = []
+    df = back.run_automation(excel, '01/2025', None, None, 2, 'todos', backend_factory=_sessoes(portal, abertas))
+
+    assert list(df['STATUS']) == [back.STATUS_EMITIDA] * 4
+    assert len(abertas) == 2 and len(portal.notas) == 4
+
+class _Backend:
+    """Sessão falsa: só registra o encerramento"""
+
+    nome = 'falso'
+
+    def __init__(self):
+        self.fechado = threading.Event()
+
+    def close(self):
+        self.fechado.set()
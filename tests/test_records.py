@@ -0,0 +1,37 @@
+import pandas as pd
+from records import NoteRecord, StatusArray, montar_registros
+
+def test_montar_registros_desempacota_como_tupla():
+    pendentes = pd.DataFrame({'CNPJ': [11222333000181, 22], 'RAZAO SOCIAL': ['A', 'B'], 'VALOR': [1.5, 2.0]},
+                             index=[3, 7])
+    registros = montar_registros(pendentes)
+
+    assert [tuple(registro) for registro in registros] == [(3, '11222333000181', 'A', 1.5), (7, '22', 'B', 2.0)]
+    index, cnpj, razao, valor = registros[0]
+    assert isinstance(registros[0], NoteRecord) and registros[0].cnpj == cnpj == '11222333000181'
+
+def test_status_array_aplica_so_os_status_registrados():
+    df = pd.DataFrame({'CNPJ': ['1', '2', '3'], 'STATUS': ['antigo', 'antigo', 'antigo']}, index=[10, 20, 30])
+    statuses = StatusArray(df.index)
+    assert len(statuses) == 0
+    assert statuses[20] is None
+
+    statuses[30] = 'Nota Emitida'
+    statuses[10] = 'Erro: x'
+    assert len(statuses) == 2
+    assert statuses[30] == 'Nota Emitida'
+
+    assert statuses.merge(df) == 2
+    assert list(df['STATUS']) == ['Erro: x', 'antigo', 'Nota Emitida']
+
+def test_status_array_vazio_nao_altera_o_dataframe():
+    df = pd.DataFrame({'STATUS': ['a', 'b']})
+    assert StatusArray(df.index).merge(df) == 0
+    assert list(df['STATUS']) == ['a', 'b']
+
+def test_status_array_com_competencia_preenche_a_coluna():
+    df = pd.DataFrame({'STATUS': ['a', 'b'], 'COMPETENCIA': ['01/2025', '01/2025']})
+    statuses = StatusArray(df.index, '02/2025')
+    statuses[1] = 'Nota Emitida'
+    statuses.merge(df)
+    assert list(df['COMPETENCIA']) == ['01/2025', '02/2025']
@@ -0,0 +1,63 @@
+import pytest
+import requests
+from selenium.common.exceptions import InvalidSessionIdException, StaleElementReferenceException, TimeoutException
+from config import Config
+from control import AutomationCancelled, RunControl, bind
+from http_backend import HttpBackendError, HttpSessionExpired, NotaNaoConfirmada, NotaRejeitada
+from retry import (FALHA_ELEMENTO, FALHA_OUTRA, FALHA_REJEICAO, FALHA_SESSAO, FALHA_TIMEOUT, RetryQueue,
+                   classificar_falha, deve_tentar_novamente)
+
+def _http_error(causa):
+    try:
+        raise HttpBackendError('falha') from causa
+    except HttpBackendError as e:
+        return e
+
+@pytest.mark.parametrize('erro, classe', [
+    (TimeoutException(), FALHA_TIMEOUT),
+    (StaleElementReferenceException(), FALHA_ELEMENTO),
+    (InvalidSessionIdException(), FALHA_SESSAO),
+    (HttpSessionExpired('login'), FALHA_SESSAO),
+    (NotaRejeitada('recusada'), FALHA_REJEICAO),
+    (_http_error(requests.Timeout()), FALHA_TIMEOUT),
+    (_http_error(requests.ConnectionError()), FALHA_SESSAO),
+    (_http_error(requests.HTTPError('502 Server Error')), FALHA_OUTRA),
+    (NotaNaoConfirmada('sem confirmação'), FALHA_OUTRA),
+    (ValueError('outro'), FALHA_OUTRA),
+])
+def test_classificar_falha(erro, classe):
+    assert classificar_falha(erro) == classe
+
+def test_deve_tentar_novamente_so_falhas_recuperaveis(monkeypatch):
+    monkeypatch.setitem(Config.RETRY, 'MAX_TENTATIVAS', 3)
+    assert deve_tentar_novamente(FALHA_TIMEOUT, 1)
+    assert deve_tentar_novamente(FALHA_SESSAO, 2)
+    assert not deve_tentar_novamente(FALHA_TIMEOUT, 3)
+    assert not deve_tentar_novamente(FALHA_REJEICAO, 1)
+    assert not deve_tentar_novamente(FALHA_OUTRA, 1)
+
+def test_retry_queue_fifo_e_drain(monkeypatch):
+    monkeypatch.setitem(Config.RETRY, 'BACKOFF', 0)
+    fila = RetryQueue()
+    fila.push('a', 2, FALHA_TIMEOUT, 'erro a')
+    fila.push('b', 2, FALHA_SESSAO, 'erro b')
+    fila.push('c', 3, FALHA_TIMEOUT, 'erro c')
+    assert len(fila) == 3
+
+    assert fila.pop() == ('a', 2)
+    assert fila.drain() == [('b', 'erro b'), ('c', 'erro c')]
+    assert len(fila) == 0
+    assert fila.pop() is None
+
+def test_retry_queue_respeita_o_cancelamento(monkeypatch):
+    monkeypatch.setitem(Config.RETRY, 'BACKOFF', 30)
+    fila = RetryQueue()
+    fila.push('a', 2, FALHA_TIMEOUT, 'erro')
+    control = RunControl()
+    control.cancel()
+    bind(control)
+    try:
+        with pytest.raises(AutomationCancelled):
+            fila.pop()
+    finally:
+        bind(None)
@@ -0,0 +1,60 @@
+import shutil
+import pytest
+import back
+from http_backend import NotaRejeitada
+from mock_portal import MockPortal
+from session import is_logged_in, release_browser
+
+# Fluxo do navegador (login e emissão) contra o portal simulado; requer o Chrome instalado
+CHROME = next(filter(None, map(shutil.which, ('google-chrome', 'google-chrome-stable', 'chromium',
+                                              'chromium-browser', 'chrome'))), None)
+pytestmark = pytest.mark.skipif(CHROME is None, reason="Chrome não instalado")
+
+CNPJ = '11222333000181'
+
+@pytest.fixture
+def navegador(config, monkeypatch):
+    monkeypatch.setitem(config.HEADLESS, 'ENABLED', True)
+    monkeypatch.setitem(config.SESSION, 'KEEP_ALIVE', False)
+
+    def abrir(portal):
+        driver = back.initialize_driver(portal.url)
+        drivers.append(driver)
+        return driver
+
+    drivers = []
+    yield abrir
+    for driver in drivers:
+        release_browser(driver)
+
+def test_login(portal, navegador):
+    driver = navegador(portal)
+    assert not is_logged_in(driver, timeout=0.5)
+    back.login(driver)
+    assert is_logged_in(driver)
+    assert portal.stats()['logins'] == 1
+
+def test_emitir_nota_grava_cada_nota_uma_vez(portal, navegador):
+    driver = navegador(portal)
+    back.login(driver)
+    estado = {}
+    back.emitir_nota(driver, back.montar_nota(CNPJ, 150, '01/2025'), estado)
+    back.emitir_nota(driver, back.montar_nota('11444777000161', 75.5, '01/2025'), estado)
+
+    assert [(nota['Documento'], nota['Valor']) for nota in portal.notas] == [
+        (CNPJ, '150.00'), ('11444777000161', '75.50')]
+    assert portal.notas[0]['RuaServico'] == portal.notas[0]['RuaTomador']
+
+def test_emitir_nota_sem_gravar(portal, navegador, config, monkeypatch):
+    monkeypatch.setattr(config, 'GRAVAR_NOTAS', False)
+    driver = navegador(portal)
+    back.login(driver)
+    back.emitir_nota(driver, back.montar_nota(CNPJ, 150, '01/2025'))
+    assert portal.notas == []
+
+def test_emitir_nota_sem_confirmacao_levanta_nota_rejeitada(config, navegador):
+    with MockPortal(atraso_tomador=0.0, falha_gravar=1.0) as portal:
+        driver = navegador(portal)
+        back.login(driver)
+        with pytest.raises(NotaRejeitada):
+            back.emitir_nota(driver, back.montar_nota(CNPJ, 150, '01/2025'))
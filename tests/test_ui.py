@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+QtWidgets = pytest.importorskip('PyQt6.QtWidgets')
+
+import back
+import ui
+from control import RunControl
+
+@pytest.fixture(scope='module')
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+@pytest.fixture
+def janela(app):
+    janela = ui.NFEWindow()
+    yield janela
+    janela.cancel_timer.stop()
+
+class _Worker(ui.QThread):
+    """Automação falsa: roda até ``liberar`` e só então termina"""
+
+    finished = ui.pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.control = RunControl()
+        self.liberar = threading.Event()
+        self.encerrada_a_forca = False
+
+    def run(self):
+        self.liberar.wait(5)
+        self.finished.emit()
+
+    def terminate(self):
+        self.encerrada_a_forca = True
+        self.liberar.set()
+
+def _iniciar(janela, worker):
+    janela.worker = worker
+    worker.finished.connect(janela.automation_finished)
+    worker.start()
+
+def _processar_eventos(app, segundos):
+    fim = time.monotonic() + segundos
+    while time.monotonic() < fim:
+        app.processEvents()
+        time.sleep(0.01)
+
+def test_prazo_do_cancelamento_nao_encerra_a_execucao_seguinte(app, janela, monkeypatch):
+    monkeypatch.setitem(ui.Config.CONTROL, 'CANCEL_TIMEOUT', 0.2)
+    worker = _Worker()
+    _iniciar(janela, worker)
+    janela.stop_automation()
+    assert worker.control.cancelled and janela.cancel_timer.isActive()
+
+    # O cancelamento termina rápido e o usuário inicia outra execução antes do prazo
+    worker.liberar.set()
+    worker.wait()
+    app.processEvents()
+    assert not janela.cancel_timer.isActive()
+    nova = _Worker()
+    _iniciar(janela, nova)
+
+    _processar_eventos(app, 0.4)
+    assert not nova.encerrada_a_forca
+    nova.liberar.set()
+    nova.wait()
+
+def test_prazo_do_cancelamento_encerra_automacao_travada(app, janela, monkeypatch):
+    monkeypatch.setitem(ui.Config.CONTROL, 'CANCEL_TIMEOUT', 0.1)
+    worker = _Worker()
+    _iniciar(janela, worker)
+    janela.stop_automation()
+
+    _processar_eventos(app, 0.3)
+    assert worker.encerrada_a_forca
+
+class _Sessao:
+    def __init__(self):
+        self.fechada = threading.Event()
+
+    def close(self):
+        self.fechada.set()
+
+def test_release_prewarm_nao_aguarda_o_navegador_ainda_abrindo(app, janela, monkeypatch):
+    monkeypatch.setitem(ui.Config.CONTROL, 'PREWARM_TIMEOUT', 0.1)
+    sessao, abrir = _Sessao(), threading.Event()
+
+    def abrir_backend(**kwargs):
+        abrir.wait(5)
+        return sessao
+
+    monkeypatch.setattr(back, 'abrir_backend', abrir_backend)
+    janela.prewarm = ui.BrowserPrewarm()
+    janela.prewarm.start()
+
+    inicio = time.monotonic()
+    janela.release_prewarm()
+    assert time.monotonic() - inicio < 2
+
+    # Quando a abertura termina, a própria thread encerra a sessão descartada
+    abrir.set()
+    assert janela.prewarm.wait(5000)
+    assert sessao.fechada.is_set() and janela.prewarm.take() is None
+
+def test_release_prewarm_encerra_a_sessao_pronta(app, janela, monkeypatch):
+    sessao = _Sessao()
+    monkeypatch.setattr(back, 'abrir_backend', lambda **kwargs: sessao)
+    janela.prewarm = ui.BrowserPrewarm()
+    janela.prewarm.start()
+    janela.prewarm.wait()
+
+    janela.release_prewarm()
+    assert sessao.fechada.is_set() and janela.prewarm.take() is None
+
+def test_headless_escolhido_na_janela_vai_para_a_execucao_sem_alterar_a_configuracao(app, janela, monkeypatch):
+    monkeypatch.setitem(ui.Config.HEADLESS, 'ENABLED', False)
+    chamadas = []
+    monkeypatch.setattr(back, 'run_automation', lambda *args, **kwargs: chamadas.append(kwargs['headless']))
+    janela.excel_path = 'clientes.xlsx'
+    janela.competencia_input.setText('01/2025')
+    janela.headless_check.setChecked(True)
+
+    janela.start_automation()
+    assert janela.worker.wait(5000)
+    app.processEvents()
+
+    assert chamadas == [True]
+    assert ui.Config.HEADLESS['ENABLED'] is False
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from validators import (ValidationError, cnpj_digits, is_valid_cnpj, valid_cnpj_mask, validate_competencia,
+                        validate_dataframe)
+
+def test_cnpj_digits_remove_a_mascara():
+    assert list(cnpj_digits(['11.222.333/0001-81', 11222333000181])) == ['11222333000181'] * 2
+
+def test_cnpj_digits_celula_vazia_vira_texto_vazio():
+    assert list(cnpj_digits([np.nan, None])) == ['', '']
+
+def test_valid_cnpj_mask_confere_digitos_verificadores(gerar_cnpjs):
+    validos = gerar_cnpjs(20)
+    assert valid_cnpj_mask(validos).all()
+
+    invalidos = [
+        '11.222.333/0001-82',   # dígito verificador errado
+        '11111111111111',       # todos os dígitos iguais
+        '1122233300018',        # 13 dígitos
+        '',
+        np.nan,
+    ]
+    assert not valid_cnpj_mask(invalidos).any()
+
+def test_valid_cnpj_mask_mantem_a_ordem_e_o_indice():
+    mask = valid_cnpj_mask(pd.Series(['123', '11.222.333/0001-81'], index=[10, 20]))
+    assert list(mask.index) == [10, 20]
+    assert list(mask) == [False, True]
+    assert is_valid_cnpj('11.222.333/0001-81')
+
+def test_validate_dataframe_relata_erros_e_duplicados_por_linha(gerar_cnpjs):
+    cnpj = gerar_cnpjs(1)[0]
+    df = pd.DataFrame({
+        'CNPJ': [cnpj, '123', cnpj],
+        'RAZAO SOCIAL': ['A', 'B', 'C'],
+        'VALOR': [10.0, 'abc', None],
+    })
+    report = validate_dataframe(df)
+    erros = {(issue.linha, issue.mensagem) for issue in report.errors}
+    assert erros == {(2, 'CNPJ inválido'), (2, 'Valor inválido'), (3, 'Valor ausente')}
+    assert [(issue.linha, issue.coluna) for issue in report.warnings] == [(3, 'CNPJ')]
+
+def test_validate_competencia_obrigatoria():
+    assert validate_competencia(' 01/2025 ') == '01/2025'
+    with pytest.raises(ValidationError):
+        validate_competencia('  ')
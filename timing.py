@@ -0,0 +1,168 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from config import Config
+from logger_config import setup_logger
+
+# Configuração do logger
+logger = setup_logger()
+
+# Contexto vazio reaproveitado quando a instrumentação está desativada
+_NOOP = nullcontext()
+
+def _percentile(values, percent):
+    """Percentil pelo método do posto mais próximo (values já ordenados)"""
+    if not values:
+        return 0.0
+    rank = min(len(values) - 1, max(0, math.ceil(percent / 100 * len(values)) - 1))
+    return values[rank]
+
+class _Span:
+    """Mede a duração de uma etapa e a registra no Tracer ao sair do bloco"""
+
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._record(self.name, time.perf_counter() - self.start, exc_type is None)
+        return False
+
+class Tracer:
+    """Instrumentação por etapa da automação (spans) e relatório de desempenho
+
+    Com ``Config.METRICS['ENABLED']`` cada etapa gera um evento JSON por linha
+    em ``Config.METRICS['DIR']`` e, ao final, é gravado um resumo com p50/p95
+    por etapa, notas por minuto e tempo de espera versus tempo ativo. Desativado,
+    ``span`` devolve um contexto vazio e o custo é desprezível.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._errors = {}
+        self._events = None
+        self._started = None
+        self._run_id = None
+        self.notes = 0
+
+    def start_run(self):
+        """Inicia a coleta de uma execução"""
+        self.enabled = Config.METRICS['ENABLED']
+        self._durations = {}
+        self._errors = {}
+        self.notes = 0
+        self._started = time.perf_counter()
+        self._run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if self.enabled:
+            os.makedirs(Config.METRICS['DIR'], exist_ok=True)
+            path = os.path.join(Config.METRICS['DIR'], f'eventos_{self._run_id}.jsonl')
+            self._events = open(path, 'a', encoding='utf-8')
+
+    def span(self, name):
+        """Contexto que mede a etapa ``name``"""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name)
+
+    def count_note(self):
+        """Contabiliza uma nota concluída (para notas por minuto)"""
+        if self.enabled:
+            with self._lock:
+                self.notes += 1
+
+    def _record(self, name, elapsed, ok):
+        event = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'span': name,
+            'ms': round(elapsed * 1000, 1),
+            'ok': ok,
+            'thread': threading.current_thread().name,
+        }
+        with self._lock:
+            self._durations.setdefault(name, []).append(elapsed)
+            if not ok:
+                self._errors[name] = self._errors.get(name, 0) + 1
+            if self._events is not None:
+                self._events.write(json.dumps(event) + '\n')
+
+    def report(self, wait_summary=None, failures=None):
+        """Monta o resumo de desempenho da execução
+
+        ``failures`` é o resumo de falhas por classe (ver retry.RetryStats).
+        """
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        with self._lock:
+            steps = {}
+            for name, values in self._durations.items():
+                ordered = sorted(values)
+                steps[name] = {
+                    'qtd': len(ordered),
+                    'total_s': round(sum(ordered), 3),
+                    'p50_s': round(_percentile(ordered, 50), 3),
+                    'p95_s': round(_percentile(ordered, 95), 3),
+                    'erros': self._errors.get(name, 0),
+                }
+            notes = self.notes
+
+        waited = sum(total for _, total, _, _ in (wait_summary or {}).values())
+        return {
+            'execucao': self._run_id,
+            'duracao_s': round(elapsed, 3),
+            'notas': notes,
+            'notas_por_minuto': round(notes / elapsed * 60, 2) if elapsed else 0.0,
+            'tempo_espera_s': round(waited, 3),
+            'tempo_ativo_s': round(max(elapsed - waited, 0.0), 3),
+            'etapas': steps,
+            'falhas': failures or {},
+        }
+
+    def finish_run(self, wait_summary=None, failures=None):
+        """Grava o relatório de desempenho e encerra a coleta"""
+        if not self.enabled:
+            return None
+        report = self.report(wait_summary, failures)
+        with self._lock:
+            if self._events is not None:
+                self._events.close()
+                self._events = None
+        path = os.path.join(Config.METRICS['DIR'], f'desempenho_{self._run_id}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"Desempenho: {report['notas']} notas em {report['duracao_s']:.1f}s "
+                    f"({report['notas_por_minuto']} notas/min), espera {report['tempo_espera_s']:.1f}s, "
+                    f"ativo {report['tempo_ativo_s']:.1f}s")
+        for name, step in sorted(report['etapas'].items(), key=lambda item: -item[1]['total_s']):
+            logger.info(f"  {name}: p50 {step['p50_s']:.3f}s / p95 {step['p95_s']:.3f}s ({step['qtd']}x)")
+        logger.info(f"Relatório de desempenho gravado em {path}")
+        self.enabled = False
+        return report
+
+def record_startup(etapa, segundos):
+    """Registra um marco da inicialização da interface (segundos desde o início do processo)
+
+    Vai sempre para o log; com ``Config.METRICS['ENABLED']`` também é acrescentado
+    a ``inicializacao.jsonl``, para acompanhar o tempo de abertura entre versões.
+    """
+    logger.info(f"Inicialização: {etapa} em {segundos:.2f}s")
+    if not Config.METRICS['ENABLED']:
+        return
+    event = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'etapa': etapa, 's': round(segundos, 3)}
+    os.makedirs(Config.METRICS['DIR'], exist_ok=True)
+    with open(os.path.join(Config.METRICS['DIR'], 'inicializacao.jsonl'), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+# Instrumentação global da execução
+tracer = Tracer()
@@ -1,27 +1,207 @@
+import threading
+import time
+
+# Início do processo da interface, referência das métricas de inicialização
+_STARTED = time.perf_counter()
+
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                             QHBoxLayout, QPushButton, QLabel, QFileDialog,
-                            QProgressBar, QTableWidget, QTableWidgetItem, QLineEdit)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+                            QProgressBar, QTableView, QLineEdit, QComboBox, QCheckBox)
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal, QAbstractTableModel, QModelIndex
 from PyQt6.QtGui import QFont, QIcon
 import sys
-import pandas as pd
-import back
+import math
+from config import Config
+from control import RunControl
+from logger_config import setup_logger
+from timing import record_startup
+
+# Configuração do logger
+logger = setup_logger()
+
+# Os módulos da automação (back, dataset: Selenium, pandas) são importados sob
+# demanda, em threads de segundo plano, para a janela aparecer antes
+
+class DataFrameModel(QAbstractTableModel):
+    """Modelo de tabela ligado às colunas do DataFrame, com renderização sob demanda
+
+    Guarda apenas um array por coluna; o texto de cada célula só é montado
+    quando a view pede para exibi-la. A coluna STATUS pode ser atualizada
+    linha a linha durante a automação.
+    """
+
+    # Linhas usadas para estimar a largura das colunas
+    SAMPLE_ROWS = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._headers = []
+        self._columns = []
+        self._positions = {}
+        self._status_column = None
+
+    def set_dataframe(self, df):
+        self.beginResetModel()
+        self._headers = [str(column) for column in df.columns]
+        self._columns = [df[column].to_numpy(dtype=object, copy=True) for column in df.columns]
+        if 'STATUS' not in self._headers:
+            self._headers.append('STATUS')
+            self._columns.append([''] * len(df))
+        self._status_column = self._headers.index('STATUS')
+        self._columns[self._status_column] = list(self._columns[self._status_column])
+        self._positions = {label: position for position, label in enumerate(df.index)}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() or not self._columns else len(self._columns[0])
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return self.cell_text(index.row(), index.column())
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self._headers[section]
+        return str(section + 1)
+
+    def cell_text(self, row, column):
+        value = self._columns[column][row]
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return ''
+        return str(value)
+
+    def update_status(self, label, status):
+        """Atualiza o STATUS de uma linha (pelo índice do DataFrame) e repinta só essa célula"""
+        row = self._positions.get(label)
+        if row is None:
+            return
+        self._columns[self._status_column][row] = status
+        cell = self.index(row, self._status_column)
+        self.dataChanged.emit(cell, cell, [Qt.ItemDataRole.DisplayRole])
+
+    def sample_texts(self, column):
+        """Textos do cabeçalho e de uma amostra de linhas, para dimensionar a coluna"""
+        rows = self.rowCount()
+        step = max(1, rows // self.SAMPLE_ROWS)
+        return [self._headers[column]] + [self.cell_text(row, column) for row in range(0, rows, step)]
+
+class ModuleLoader(QThread):
+    """Importa os módulos da automação em segundo plano, depois que a janela aparece"""
+    loaded = pyqtSignal(float)
+    failed = pyqtSignal(str)
+
+    def run(self):
+        try:
+            import back  # noqa: F401
+            self.loaded.emit(time.perf_counter() - _STARTED)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+class BrowserPrewarm(QThread):
+    """Abre a sessão de emissão já logada enquanto o usuário escolhe a planilha"""
+    ready = pyqtSignal(float)
+
+    def __init__(self, headless=None):
+        super().__init__()
+        self.headless = Config.HEADLESS['ENABLED'] if headless is None else headless
+        self.backend = None
+        self.descartada = False
+        self._lock = threading.Lock()
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            import back
+            backend = back.abrir_backend(headless=self.headless)
+            with self._lock:
+                descartada = self.descartada
+                if not descartada:
+                    self.backend = backend
+            if descartada:
+                # Janela fechada durante o preaquecimento: encerra a sessão nesta thread
+                backend.close()
+                return
+            self.ready.emit(time.perf_counter() - start)
+        except Exception as e:
+            logger.warning(f"Não foi possível preaquecer o navegador: {str(e)}")
+
+    def discard(self):
+        """Descarta a sessão sem aguardar a abertura: se ainda estiver abrindo, ela é encerrada pela própria thread"""
+        with self._lock:
+            self.descartada = True
+            backend, self.backend = self.backend, None
+        if backend is not None:
+            backend.close()
+
+    def take(self):
+        """Aguarda o preaquecimento e entrega a sessão uma única vez (None se falhou)"""
+        self.wait()
+        backend, self.backend = self.backend, None
+        return backend
+
+class DatasetLoader(QThread):
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, excel_path, dataset=None):
+        super().__init__()
+        self.excel_path = excel_path
+        self.dataset = dataset
+
+    def run(self):
+        try:
+            if self.dataset is None or self.dataset.path != self.excel_path:
+                from dataset import Dataset
+                self.dataset = Dataset(self.excel_path)
+            self.loaded.emit(self.dataset.ensure_loaded())
+        except Exception as e:
+            self.failed.emit(str(e))
 
 class AutomationWorker(QThread):
     progress = pyqtSignal(int)
     status = pyqtSignal(str)
+    row_status = pyqtSignal(object, str)
     finished = pyqtSignal()
 
-    def __init__(self, excel_path, competencia):
+    def __init__(self, excel_path, competencia, modo=None, dataset=None, prewarm=None, headless=None):
         super().__init__()
         self.excel_path = excel_path
         self.competencia = competencia
+        self.modo = modo
+        self.dataset = dataset
+        self.prewarm = prewarm
+        self.headless = Config.HEADLESS['ENABLED'] if headless is None else headless
+        self.control = RunControl()
 
     def run(self):
+        backend = None
         try:
+            import back
+
+            # Sessão aberta durante a escolha da planilha, se ainda compatível com as opções
+            if self.prewarm is not None:
+                self.status.emit("Aguardando o navegador...")
+                backend = self.prewarm.take()
+                if backend is not None and self.prewarm.headless != self.headless:
+                    backend.close()
+                    backend = None
+
             # Chamar a função de automação do back.py
-            back.run_automation(self.excel_path, self.competencia, self.progress, self.status)
+            back.run_automation(self.excel_path, self.competencia, self.progress, self.status,
+                                modo=self.modo, dataset=self.dataset, row_callback=self.row_status,
+                                control=self.control, backend=backend, headless=self.headless)
         finally:
+            if backend is not None:
+                try:
+                    backend.close()
+                except Exception as e:
+                    logger.warning(f"Erro ao encerrar sessão: {str(e)}")
             self.finished.emit()
 
 class NFEWindow(QMainWindow):
@@ -30,6 +210,13 @@ class NFEWindow(QMainWindow):
         self.setWindowTitle("Automação B/PALMA")
         self.setMinimumSize(800, 600)
         self.excel_path = None
+        self.dataset = None
+        self.prewarm = None
+
+        # Prazo do cancelamento; parado quando a automação cancelada termina
+        self.cancel_timer = QTimer(self)
+        self.cancel_timer.setSingleShot(True)
+        self.cancel_timer.timeout.connect(self.force_stop)
 
         # Main widget and layout
         main_widget = QWidget()
@@ -66,6 +253,24 @@ class NFEWindow(QMainWindow):
         competencia_layout.addWidget(self.competencia_input)
         layout.addWidget(competencia_widget)
 
+        # Execution mode area
+        modo_widget = QWidget()
+        modo_layout = QHBoxLayout(modo_widget)
+
+        modo_label = QLabel("Modo:")
+        self.modo_combo = QComboBox()
+        self.modo_combo.addItem("Processar todas as linhas", "todos")
+        self.modo_combo.addItem("Retomar (pular notas emitidas)", "retomar")
+        self.modo_combo.addItem("Reprocessar somente erros", "erros")
+
+        self.headless_check = QCheckBox("Navegador sem janela (headless)")
+        self.headless_check.setChecked(Config.HEADLESS['ENABLED'])
+
+        modo_layout.addWidget(modo_label)
+        modo_layout.addWidget(self.modo_combo)
+        modo_layout.addWidget(self.headless_check)
+        layout.addWidget(modo_widget)
+
         # Progress area
         self.progress_bar = QProgressBar()
         self.progress_bar.setObjectName("progressBar")
@@ -76,8 +281,11 @@ class NFEWindow(QMainWindow):
         layout.addWidget(self.status_label)
 
         # Table for showing data
-        self.table = QTableWidget()
+        self.table_model = DataFrameModel(self)
+        self.table = QTableView()
         self.table.setObjectName("dataTable")
+        self.table.setModel(self.table_model)
+        self.table.verticalHeader().setDefaultSectionSize(24)
         layout.addWidget(self.table)
 
         # Control buttons
@@ -92,7 +300,12 @@ class NFEWindow(QMainWindow):
         self.stop_btn.setEnabled(False)
         self.stop_btn.clicked.connect(self.stop_automation)
 
+        self.pause_btn = QPushButton("Pausar")
+        self.pause_btn.setEnabled(False)
+        self.pause_btn.clicked.connect(self.toggle_pause)
+
         button_layout.addWidget(self.start_btn)
+        button_layout.addWidget(self.pause_btn)
         button_layout.addWidget(self.stop_btn)
         layout.addWidget(button_widget)
 
@@ -155,7 +368,7 @@ class NFEWindow(QMainWindow):
                 border-radius: 5px;
             }
 
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
 
@@ -167,7 +380,30 @@ class NFEWindow(QMainWindow):
             }
         """)
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not hasattr(self, 'module_loader'):
+            # Primeiro ciclo de eventos após exibir a janela: mede e só então carrega a automação
+            QTimer.singleShot(0, self.window_ready)
+
+    def window_ready(self):
+        record_startup('janela', time.perf_counter() - _STARTED)
+        self.module_loader = ModuleLoader()
+        self.module_loader.loaded.connect(lambda elapsed: record_startup('modulos', elapsed))
+        self.module_loader.failed.connect(lambda error: self.status_label.setText(f"Erro ao carregar: {error}"))
+        self.module_loader.start()
+
+    def start_prewarm(self):
+        # Um navegador por vez; no modo paralelo cada worker abre a própria sessão
+        if (self.prewarm is not None or not Config.UI['PREAQUECER_NAVEGADOR']
+                or Config.PARALLEL_WORKERS > 1):
+            return
+        self.prewarm = BrowserPrewarm(self.headless_check.isChecked())
+        self.prewarm.ready.connect(lambda elapsed: record_startup('navegador', elapsed))
+        self.prewarm.start()
+
     def select_file(self):
+        self.start_prewarm()
         file_path, _ = QFileDialog.getOpenFileName(
             self,
             "Selecionar Planilha Excel",
@@ -178,54 +414,135 @@ class NFEWindow(QMainWindow):
         if file_path:
             self.excel_path = file_path
             self.file_label.setText(file_path.split('/')[-1])
-            self.start_btn.setEnabled(True)
+            # Habilitado só quando a planilha selecionada terminar de carregar (show_data)
+            self.start_btn.setEnabled(False)
             self.load_data()
 
     def load_data(self):
+        # Lê e valida a planilha em segundo plano; o mesmo Dataset é usado pela automação
+        self.status_label.setText("Carregando planilha...")
+        self.loader = DatasetLoader(self.excel_path, self.dataset)
+        self.loader.loaded.connect(self.show_data)
+        self.loader.failed.connect(lambda error: self.status_label.setText(f"Erro ao carregar arquivo: {error}"))
+        self.loader.start()
+
+    def show_data(self, dataset):
+        if dataset.path != self.excel_path:
+            # Carregamento de uma planilha selecionada antes da atual
+            return
+        self.dataset = dataset
+        if not (hasattr(self, 'worker') and self.worker.isRunning()):
+            self.start_btn.setEnabled(True)
         try:
-            df = pd.read_excel(self.excel_path)
-            self.table.setRowCount(len(df))
-            self.table.setColumnCount(len(df.columns))
-            self.table.setHorizontalHeaderLabels(df.columns)
-
-            for i in range(len(df)):
-                for j in range(len(df.columns)):
-                    item = QTableWidgetItem(str(df.iloc[i, j]))
-                    self.table.setItem(i, j, item)
-
-            self.table.resizeColumnsToContents()
+            df = dataset.df
+            if dataset.error is not None:
+                report = dataset.error.report
+                if report is not None:
+                    self.status_label.setText(f"Planilha com {len(report.errors)} erro(s) de validação")
+                else:
+                    self.status_label.setText(str(dataset.error))
+            else:
+                self.status_label.setText(f"Planilha carregada: {len(df)} linhas")
+            self.table_model.set_dataframe(df)
+            self.resize_columns()
 
         except Exception as e:
             self.status_label.setText(f"Erro ao carregar arquivo: {str(e)}")
 
+    def resize_columns(self):
+        # Largura estimada por amostragem, sem medir todas as linhas
+        metrics = self.table.fontMetrics()
+        for column in range(self.table_model.columnCount()):
+            texts = self.table_model.sample_texts(column)
+            width = max(metrics.horizontalAdvance(text) for text in texts) + 24
+            self.table.setColumnWidth(column, min(width, 400))
+
     def start_automation(self):
         competencia = self.competencia_input.text()
-        self.worker = AutomationWorker(self.excel_path, competencia)
+        modo = self.modo_combo.currentData()
+        self.worker = AutomationWorker(self.excel_path, competencia, modo, self.dataset, self.prewarm,
+                                       self.headless_check.isChecked())
+        self.prewarm = None
         self.worker.progress.connect(self.progress_bar.setValue)
         self.worker.status.connect(self.status_label.setText)
+        self.worker.row_status.connect(self.table_model.update_status)
         self.worker.finished.connect(self.automation_finished)
 
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
+        self.pause_btn.setEnabled(True)
+        self.pause_btn.setText("Pausar")
         self.worker.start()
 
+    def toggle_pause(self):
+        if not hasattr(self, 'worker'):
+            return
+        if self.worker.control.paused:
+            self.worker.control.resume()
+            self.pause_btn.setText("Pausar")
+            self.status_label.setText("Retomando automação...")
+        else:
+            self.worker.control.pause()
+            self.pause_btn.setText("Continuar")
+            self.status_label.setText("Pausando após a nota atual...")
+
     def stop_automation(self):
-        if hasattr(self, 'worker'):
+        if hasattr(self, 'worker') and self.worker.isRunning():
+            # Cancelamento cooperativo: a automação termina a etapa atual,
+            # grava os status e fecha o navegador
+            self.worker.control.cancel()
+            self.stop_btn.setEnabled(False)
+            self.pause_btn.setEnabled(False)
+            self.status_label.setText("Cancelando...")
+            self.cancel_timer.start(int(Config.CONTROL['CANCEL_TIMEOUT'] * 1000))
+
+    def force_stop(self):
+        # Último recurso caso a automação não responda ao cancelamento no prazo
+        if hasattr(self, 'worker') and self.worker.isRunning():
             self.worker.terminate()
             self.worker.wait()
             self.automation_finished()
 
     def automation_finished(self):
+        self.cancel_timer.stop()
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
-        self.status_label.setText("Automação finalizada")
+        self.pause_btn.setEnabled(False)
+        # Atualiza a pré-visualização com os status gravados
+        if self.dataset is not None and self.dataset.df is not None:
+            self.show_data(self.dataset)
+
+        if self.worker.control.cancelled:
+            self.status_label.setText("Automação cancelada")
+        else:
+            self.status_label.setText("Automação finalizada")
         self.progress_bar.setValue(0)
 
+    def closeEvent(self, event):
+        # A janela fecha sem aguardar o preaquecimento; a sessão não usada é
+        # encerrada aqui (já aberta) ou pela própria thread (ainda abrindo)
+        if self.prewarm is not None:
+            self.prewarm.discard()
+        super().closeEvent(event)
+
+    def release_prewarm(self):
+        """Encerra a sessão preaquecida e não usada (chamar com a janela já fechada)
+
+        Não bloqueia a saída: uma sessão ainda abrindo é encerrada pela própria
+        thread, aguardada no máximo ``Config.CONTROL['PREWARM_TIMEOUT']`` segundos.
+        """
+        if self.prewarm is not None:
+            self.prewarm.discard()
+            if not self.prewarm.wait(int(Config.CONTROL['PREWARM_TIMEOUT'] * 1000)):
+                logger.warning("Navegador preaquecido ainda abrindo; saindo sem aguardar")
+
 def main():
     app = QApplication(sys.argv)
     window = NFEWindow()
     window.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    window.release_prewarm()
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
@@ -1,26 +1,81 @@
 import pandas as pd
+import numpy as np
 import os
-import re
+from collections import namedtuple
 from datetime import datetime
 from config import Config
 from logger_config import setup_logger
 
 logger = setup_logger()
 
+# Pesos do cálculo dos dígitos verificadores do CNPJ
+_CNPJ_PESOS_DV1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+_CNPJ_PESOS_DV2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
+# Problema encontrado em uma linha da planilha (linha começa em 1, como nas mensagens)
+RowIssue = namedtuple('RowIssue', ['linha', 'coluna', 'valor', 'mensagem', 'bloqueante'])
+
+class ValidationReport:
+    """Relatório estruturado da validação, com um registro por problema encontrado"""
+
+    def __init__(self, issues=None):
+        self.issues = list(issues or [])
+
+    @property
+    def errors(self):
+        return [issue for issue in self.issues if issue.bloqueante]
+
+    @property
+    def warnings(self):
+        return [issue for issue in self.issues if not issue.bloqueante]
+
+    def extend(self, issues):
+        self.issues.extend(issues)
+
+    def to_dataframe(self):
+        """Retorna os problemas como DataFrame (útil para exportar ou exibir)"""
+        return pd.DataFrame(self.issues, columns=RowIssue._fields)
+
+    def __bool__(self):
+        return bool(self.errors)
+
 class ValidationError(Exception):
     """Exceção personalizada para erros de validação"""
-    pass
+
+    def __init__(self, message, report=None):
+        super().__init__(message)
+        self.report = report
+
+def read_excel_header(file_path):
+    """Lê apenas a linha de cabeçalho de uma planilha .xlsx (modo somente leitura)"""
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(max_row=1, values_only=True):
+            return [column for column in row if column is not None]
+        return []
+    finally:
+        workbook.close()
 
 def validate_excel_file(file_path):
     """Valida se o arquivo Excel existe e é válido"""
     if not os.path.exists(file_path):
         raise ValidationError(f"Arquivo não encontrado: {file_path}")
-    
+
     if not file_path.lower().endswith(('.xlsx', '.xls')):
         raise ValidationError("Arquivo deve ser do tipo Excel (.xlsx ou .xls)")
-    
+
+    # Em .xlsx a estrutura é conferida pelo cabeçalho antes de ler a planilha inteira
+    if file_path.lower().endswith('.xlsx'):
+        try:
+            header = read_excel_header(file_path)
+        except Exception as e:
+            raise ValidationError(f"Erro ao ler arquivo Excel: {str(e)}")
+        validate_excel_structure(pd.DataFrame(columns=header))
+
     try:
-        df = pd.read_excel(file_path)
+        # Competência dos status lida como texto (ex.: '012025' não vira número)
+        df = pd.read_excel(file_path, dtype={'COMPETENCIA': str})
         return df
     except Exception as e:
         raise ValidationError(f"Erro ao ler arquivo Excel: {str(e)}")
@@ -38,44 +93,99 @@ def validate_excel_structure(df):
     
     logger.info(f"Estrutura do Excel validada. Colunas encontradas: {list(df.columns)}")
 
-def validate_data_types(df):
-    """Valida os tipos de dados das colunas"""
-    errors = []
-    
-    # Valida CNPJ
+def cnpj_digits(values):
+    """Remove os caracteres especiais de uma série de CNPJs (operação vetorizada)"""
+    return pd.Series(values).fillna('').astype(str).str.replace(r'[^0-9]', '', regex=True)
+
+def valid_cnpj_mask(values):
+    """Retorna uma máscara booleana dos CNPJs válidos, com dígitos verificadores
+
+    O cálculo é feito sobre uma matriz (n x 14) de dígitos, sem laço Python
+    por linha.
+    """
+    digits = cnpj_digits(values)
+    has_14 = (digits.str.len() == 14).to_numpy()
+    mask = has_14.copy()
+
+    if has_14.any():
+        candidates = digits.to_numpy()[has_14]
+        matrix = (np.frombuffer(''.join(candidates).encode('ascii'), dtype=np.uint8)
+                  .reshape(-1, 14).astype(np.int64) - 48)
+
+        # Todos os dígitos iguais não é um CNPJ válido
+        not_repeated = (matrix != matrix[:, :1]).any(axis=1)
+
+        resto1 = (matrix[:, :12] * _CNPJ_PESOS_DV1).sum(axis=1) % 11
+        dv1 = np.where(resto1 < 2, 0, 11 - resto1)
+        resto2 = (matrix[:, :13] * _CNPJ_PESOS_DV2).sum(axis=1) % 11
+        dv2 = np.where(resto2 < 2, 0, 11 - resto2)
+
+        mask[has_14] = not_repeated & (matrix[:, 12] == dv1) & (matrix[:, 13] == dv2)
+    return pd.Series(mask, index=digits.index)
+
+def _issues_from_mask(df, mask, column, message, bloqueante=True):
+    """Converte as linhas marcadas em uma lista de RowIssue"""
+    positions = np.flatnonzero(mask.to_numpy())
+    values = df[column].to_numpy()
+    return [
+        RowIssue(int(pos) + 1, column, values[pos], message, bloqueante)
+        for pos in positions
+    ]
+
+def validate_dataframe(df):
+    """Valida CNPJ e VALOR de um DataFrame e retorna um ValidationReport"""
+    report = ValidationReport()
+
     if 'CNPJ' in df.columns:
-        df['CNPJ'] = df['CNPJ'].astype(str)
-        for idx, cnpj in enumerate(df['CNPJ']):
-            if not is_valid_cnpj(cnpj):
-                errors.append(f"CNPJ inválido na linha {idx + 1}: {cnpj}")
-    
-    # Valida VALOR
+        invalid = ~valid_cnpj_mask(df['CNPJ']).to_numpy()
+        report.extend(_issues_from_mask(df, pd.Series(invalid), 'CNPJ', 'CNPJ inválido'))
+
+        # CNPJs duplicados (não bloqueante: a política de duplicados é decidida na emissão)
+        digits = cnpj_digits(df['CNPJ']).reset_index(drop=True)
+        valid = pd.Series(~invalid)
+        linhas = pd.Series(np.arange(len(df)) + 1)
+        first = linhas.groupby(digits).transform('first')
+        duplicated = (valid & (first != linhas)).to_numpy()
+
+        values = df['CNPJ'].to_numpy()
+        report.extend(
+            RowIssue(int(linhas[pos]), 'CNPJ', values[pos],
+                     f'CNPJ duplicado (primeira ocorrência na linha {first[pos]})', False)
+            for pos in np.flatnonzero(duplicated)
+        )
+
     if 'VALOR' in df.columns:
-        for idx, valor in enumerate(df['VALOR']):
-            try:
-                float(valor)
-            except (ValueError, TypeError):
-                errors.append(f"Valor inválido na linha {idx + 1}: {valor}")
-    
-    if errors:
-        raise ValidationError(f"Erros de validação:\n" + "\n".join(errors))
-    
+        numeric = pd.to_numeric(df['VALOR'], errors='coerce')
+        missing = df['VALOR'].isna()
+        report.extend(_issues_from_mask(df, numeric.isna() & ~missing, 'VALOR', 'Valor inválido'))
+        report.extend(_issues_from_mask(df, missing, 'VALOR', 'Valor ausente'))
+
+    return report
+
+def format_report(report):
+    """Formata os erros bloqueantes no texto usado nas mensagens de validação"""
+    errors = sorted(report.errors, key=lambda issue: issue.linha)
+    return "\n".join(f"{issue.mensagem} na linha {issue.linha}: {issue.valor}" for issue in errors)
+
+def validate_data_types(df):
+    """Valida os tipos de dados das colunas
+
+    A coluna CNPJ não é convertida: a validação trabalha sobre os dígitos
+    (``cnpj_digits``) e a planilha é gravada com os tipos originais.
+    """
+    report = validate_dataframe(df)
+    for warning in report.warnings:
+        logger.warning(f"{warning.mensagem} na linha {warning.linha}: {warning.valor}")
+
+    if report.errors:
+        raise ValidationError(f"Erros de validação:\n" + format_report(report), report)
+
     logger.info("Tipos de dados validados com sucesso")
+    return report
 
 def is_valid_cnpj(cnpj):
-    """Valida formato básico do CNPJ"""
-    # Remove caracteres especiais
-    cnpj_clean = re.sub(r'[^\d]', '', str(cnpj))
-    
-    # Verifica se tem 14 dígitos
-    if len(cnpj_clean) != 14:
-        return False
-    
-    # Verifica se não são todos iguais
-    if len(set(cnpj_clean)) == 1:
-        return False
-    
-    return True
+    """Valida o CNPJ, incluindo os dígitos verificadores"""
+    return bool(valid_cnpj_mask([cnpj]).iloc[0])
 
 def validate_competencia(competencia):
     """Valida se a competência foi informada"""
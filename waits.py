@@ -0,0 +1,171 @@
+import threading
+import time
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from config import Config
+from control import checkpoint
+from pacing import pacer
+from logger_config import setup_logger
+
+# Configuração do logger
+logger = setup_logger()
+
+class WaitStats:
+    """Registra quanto tempo cada etapa realmente esperou pelo portal"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = {}
+
+    def record(self, step, elapsed):
+        with self._lock:
+            self._waits.setdefault(step, []).append(elapsed)
+
+    def reset(self):
+        with self._lock:
+            self._waits.clear()
+
+    def summary(self):
+        """Retorna {etapa: (quantidade, total, média, máximo)} em segundos"""
+        with self._lock:
+            return {
+                step: (len(values), sum(values), sum(values) / len(values), max(values))
+                for step, values in self._waits.items()
+            }
+
+    def log_summary(self):
+        """Escreve no log o tempo de espera acumulado por etapa"""
+        summary = self.summary()
+        if not summary:
+            return
+        logger.info("Tempo de espera por etapa (qtd / total / média / máx):")
+        for step, (count, total, mean, peak) in sorted(summary.items(), key=lambda item: -item[1][1]):
+            logger.info(f"  {step}: {count} / {total:.2f}s / {mean:.2f}s / {peak:.2f}s")
+
+# Estatísticas globais de espera da sessão
+wait_stats = WaitStats()
+
+# Localizadores alternativos já avisados no log (um aviso por localizador)
+_fallbacks_warned = set()
+
+def warn_fallback(locators, position):
+    """Avisa, uma única vez, que o localizador preferido falhou e um alternativo foi usado"""
+    key = (locators[0], locators[position])
+    if key in _fallbacks_warned:
+        return
+    _fallbacks_warned.add(key)
+    logger.warning(f"Localizador '{locators[0][1]}' não encontrou o elemento; usando '{locators[position][1]}' "
+                   f"(atualize locators.py)")
+
+def _locators(locator):
+    """Aceita um localizador (By, valor) ou uma sequência deles, em ordem de preferência"""
+    return (locator,) if isinstance(locator[0], str) else tuple(locator)
+
+def _first_of(condition, locator):
+    """Condição satisfeita pelo primeiro localizador que encontrar o elemento"""
+    locators = _locators(locator)
+    if len(locators) == 1:
+        return condition(locators[0])
+    conditions = [condition(item) for item in locators]
+
+    def check(driver):
+        for position, item in enumerate(conditions):
+            try:
+                result = item(driver)
+            except NoSuchElementException:
+                continue
+            if result:
+                if position:
+                    warn_fallback(locators, position)
+                return result
+        return False
+    return check
+
+def _until(driver, condition, timeout, step):
+    """Executa um WebDriverWait com polling curto e registra o tempo esperado
+
+    A cada verificação também consulta o controle de execução, para que um
+    cancelamento não precise esperar o timeout da etapa. O timeout é ajustado
+    à latência já observada na etapa (ver pacing.AdaptivePacer).
+    """
+    def cancellable(d):
+        checkpoint()
+        return condition(d)
+
+    timeout = pacer.timeout(step, timeout)
+    start = time.perf_counter()
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=Config.TIMEOUTS['POLL']).until(cancellable)
+    finally:
+        elapsed = time.perf_counter() - start
+        wait_stats.record(step, elapsed)
+        pacer.observar(step, elapsed)
+
+# Os localizadores abaixo podem ser um (By, valor) ou uma sequência de alternativas (ver locators.py)
+
+def wait_clickable(driver, locator, timeout=None, step=None):
+    """Aguarda até o elemento estar visível e habilitado e o retorna"""
+    timeout = timeout or Config.TIMEOUTS['ELEMENT']
+    condition = _first_of(EC.element_to_be_clickable, locator)
+    return _until(driver, condition, timeout, step or _locators(locator)[0][1])
+
+def wait_present(driver, locator, timeout=None, step=None):
+    """Aguarda até o elemento existir no DOM e o retorna"""
+    timeout = timeout or Config.TIMEOUTS['ELEMENT']
+    condition = _first_of(EC.presence_of_element_located, locator)
+    return _until(driver, condition, timeout, step or _locators(locator)[0][1])
+
+def wait_frame(driver, locator, timeout=None, step=None):
+    """Aguarda o iframe ficar disponível, entra nele e espera o documento carregar"""
+    timeout = timeout or Config.TIMEOUTS['ELEMENT']
+    step = step or f"frame:{_locators(locator)[0][1]}"
+    _until(driver, _first_of(EC.frame_to_be_available_and_switch_to_it, locator), timeout, step)
+    wait_document_ready(driver, timeout, step=f"{step}:ready")
+
+def wait_stale(driver, element, timeout=None, step='stale'):
+    """Aguarda o elemento sair do DOM (ex.: a página foi recarregada após um envio)"""
+    timeout = timeout or Config.TIMEOUTS['PAGE_LOAD']
+    return _until(driver, EC.staleness_of(element), timeout, step)
+
+def wait_document_ready(driver, timeout=None, step='document_ready'):
+    """Aguarda o documento atual terminar de carregar"""
+    timeout = timeout or Config.TIMEOUTS['PAGE_LOAD']
+    return _until(
+        driver,
+        lambda d: d.execute_script("return document.readyState") == 'complete',
+        timeout,
+        step,
+    )
+
+def wait_value_settled(driver, element, timeout=None, step='value_settled', allow_empty=False):
+    """Aguarda o valor de um campo parar de mudar (ex.: preenchimento automático)
+
+    O valor é considerado estável quando permanece igual por
+    ``Config.TIMEOUTS['SETTLE']`` segundos. Retorna o valor final; em caso de
+    timeout retorna o último valor lido em vez de falhar, pois o campo pode
+    legitimamente ficar vazio.
+    """
+    timeout = timeout or Config.TIMEOUTS['ELEMENT']
+    settle = Config.TIMEOUTS['SETTLE']
+    state = {'value': None, 'since': time.perf_counter()}
+
+    def settled(_driver):
+        try:
+            value = element.get_attribute('value')
+        except StaleElementReferenceException:
+            return False
+        now = time.perf_counter()
+        if value != state['value']:
+            state['value'] = value
+            state['since'] = now
+            return False
+        if not value and not allow_empty:
+            return False
+        return now - state['since'] >= settle
+
+    try:
+        _until(driver, settled, timeout, step)
+    except TimeoutException:
+        logger.warning(f"Valor do campo não estabilizou em {timeout}s ({step}): '{state['value']}'")
+    return state['value'] or ''